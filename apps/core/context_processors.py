@@ -0,0 +1,5 @@
+from django.conf import settings
+
+
+def static_bundles(request):
+    return {'use_static_bundles': settings.STATIC_BUILD}
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import random
+import re
+import ssl
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+CSRF_INPUT_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+DEFAULT_MIX = {'browse': 70, 'comment': 10, 'vote': 15, 'import': 5}
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def header(self, name, default=None):
+        return next((value for key, value in self.headers if key == name), default)
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+
+# Request latencies and errors per request name, e.g. "GET movies:detail"
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, name, latency, error=None):
+        self.latencies[name].append(latency)
+        if error:
+            self.errors[name][error] += 1
+
+    @staticmethod
+    def percentile(ordered, q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+    def report(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        lines = [f"{'request':<28} {'count':>7} {'req/s':>7} {'errors':>7} {'p50 ms':>8} {'p90 ms':>8} "
+                 f"{'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+        rows = sorted(self.latencies.items()) + [('TOTAL', [value for values in self.latencies.values()
+                                                            for value in values])]
+        for name, latencies in rows:
+            ordered = sorted(latencies)
+            errors = (sum(sum(errors.values()) for errors in self.errors.values()) if name == 'TOTAL'
+                      else sum(self.errors[name].values()))
+            lines.append(
+                f"{name:<28} {len(ordered):>7} {len(ordered) / elapsed:>7.1f} {errors / max(1, len(ordered)):>7.1%} "
+                + " ".join(f"{self.percentile(ordered, q) * 1000:>8.1f}" for q in (0.5, 0.9, 0.95, 0.99))
+                + f" {(ordered[-1] if ordered else 0) * 1000:>8.1f}"
+            )
+        for name, errors in sorted(self.errors.items()):
+            for error, count in sorted(errors.items()):
+                lines.append(f"  {name}: {count} x {error}")
+        lines.append(f"Duration {elapsed:.1f}s")
+        return "\n".join(lines)
+
+
+# Minimal asyncio HTTP/1.1 client: one keep-alive connection and a cookie jar per virtual user, no redirects
+class HttpClient:
+    def __init__(self, base_url, stats, timeout=30):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.https else 80)
+        self.host_header = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.stats = stats
+        self.timeout = timeout
+        self.cookies = {}
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def connect(self):
+        context = ssl.create_default_context() if self.https else None
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=context)
+
+    # `check` can reject a response with an expected status, e.g. a JSON body reporting failure
+    async def request(self, name, method, path, form=None, json_body=None, headers=None, expect=(200,), check=None):
+        body = b""
+        request_headers = {'Host': self.host_header, 'Accept': 'text/html,application/json', 'User-Agent': 'loadgen'}
+        if form is not None:
+            body = urlencode(form).encode()
+            request_headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif json_body is not None:
+            body = json.dumps(json_body).encode()
+            request_headers['Content-Type'] = 'application/json'
+        if body or method == 'POST':
+            request_headers['Content-Length'] = str(len(body))
+        if self.cookies:
+            request_headers['Cookie'] = "; ".join(f"{key}={value}" for key, value in self.cookies.items())
+        request_headers.update(headers or {})
+        head = f"{method} {self.prefix}{path} HTTP/1.1\r\n" + "".join(
+            f"{key}: {value}\r\n" for key, value in request_headers.items()
+        ) + "\r\n"
+
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self.send(head.encode() + body), self.timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+            await self.close()
+            self.stats.record(name, time.perf_counter() - started, type(exc).__name__)
+            return None
+        latency = time.perf_counter() - started
+
+        for key, value in response.headers:
+            if key == 'set-cookie':
+                self.store_cookie(value)
+        error = None
+        if response.status not in expect:
+            error = f"HTTP {response.status}"
+        elif check is not None:
+            try:
+                error = check(response)
+            except ValueError:
+                error = "unexpected body"
+        self.stats.record(name, latency, error)
+        return response
+
+    async def send(self, payload):
+        # A kept-alive connection the server already closed fails on first use, retry once on a fresh one
+        for attempt in range(2):
+            reused = self.writer is not None
+            if not reused:
+                await self.connect()
+            try:
+                self.writer.write(payload)
+                await self.writer.drain()
+                return await self.read_response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if not reused or attempt:
+                    raise
+
+    async def read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        version, status = status_line.decode('latin-1').split(" ", 2)[:2]
+        headers = []
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').rstrip("\r\n")
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            headers.append((key.strip().lower(), value.strip()))
+        response = Response(int(status), headers, b"")
+
+        if response.header('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await self.reader.readline()) not in (b"\r\n", b""):
+                        pass
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            response.body = b"".join(chunks)
+        elif response.header('content-length') is not None:
+            response.body = await self.reader.readexactly(int(response.header('content-length')))
+        elif response.status not in (204, 304):
+            response.body = await self.reader.read()
+            await self.close()
+            return response
+
+        if response.header('connection', '').lower() == 'close' or version == 'HTTP/1.0':
+            await self.close()
+        return response
+
+    def store_cookie(self, header):
+        pair, _, attributes = header.partition(";")
+        key, _, value = pair.strip().partition("=")
+        expired = 'max-age=0' in attributes.lower().replace(" ", "")
+        if expired or value in ('', '""'):
+            self.cookies.pop(key, None)
+        else:
+            self.cookies[key] = value
+
+
+# Movies, comments and accounts the scenarios pick from, loaded from the database the server uses
+class Targets:
+    def __init__(self, movies, comments, members, moderator, password):
+        self.movies = movies
+        self.comments = comments
+        self.members = members
+        self.moderator = moderator
+        self.password = password
+
+
+class VirtualUser:
+    def __init__(self, number, base_url, targets, stats, rng, vote_burst, think):
+        self.targets = targets
+        self.stats = stats
+        self.rng = rng
+        self.vote_burst = vote_burst
+        self.think = think
+        self.client = HttpClient(base_url, stats)
+        self.moderator_client = HttpClient(base_url, stats)
+        self.email = targets.members[number % len(targets.members)] if targets.members else None
+        self.logged_in = self.moderator_logged_in = False
+
+    async def close(self):
+        await self.client.close()
+        await self.moderator_client.close()
+
+    async def pause(self):
+        if self.think:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think))
+
+    @staticmethod
+    def form_token(response):
+        match = CSRF_INPUT_RE.search(response.text) if response else None
+        return match.group(1) if match else ""
+
+    async def login(self, client, email):
+        page = await client.request("GET users:login", 'GET', "/users/login/")
+        response = await client.request(
+            "POST users:login", 'POST', "/users/login/",
+            form={'username': email, 'password': self.targets.password, 'csrfmiddlewaretoken': self.form_token(page)},
+            expect=(302,),
+        )
+        return response is not None and response.status == 302
+
+    async def browse(self):
+        query = self.rng.choice(["", "?sort=rating&order=desc", "?sort=date&order=desc", "?sort=trending"])
+        await self.client.request("GET movies:list", 'GET', f"/{query}")
+        for _ in range(self.rng.randint(1, 3)):
+            await self.pause()
+            _, slug = self.rng.choice(self.targets.movies)
+            await self.client.request("GET movies:detail", 'GET', f"/{slug}/")
+
+    async def comment(self):
+        if not self.logged_in:
+            self.logged_in = await self.login(self.client, self.email)
+        movie_id, slug = self.rng.choice(self.targets.movies)
+        page = await self.client.request("GET movies:detail", 'GET', f"/{slug}/")
+        await self.pause()
+        await self.client.request(
+            "POST movies:comment_create", 'POST', f"/{movie_id}/comment/",
+            form={'text': f"Load test comment {self.rng.random():.6f}", 'user_rating': self.rng.randint(1, 10),
+                  'csrfmiddlewaretoken': self.form_token(page)},
+            expect=(302,),
+        )
+
+    # Rapid likes/dislikes on one thread, the way a user clicks through a popular discussion
+    async def vote(self):
+        if not self.logged_in:
+            self.logged_in = await self.login(self.client, self.email)
+        movie_id = self.rng.choice(list(self.targets.comments))
+        comment_ids = self.targets.comments[movie_id]
+        for _ in range(self.vote_burst):
+            await self.client.request(
+                "POST movies:vote", 'POST', "/vote/",
+                json_body={'comment_id': self.rng.choice(comment_ids), 'vote_type': self.rng.choice(['like', 'dislike'])},
+                headers={'X-CSRFToken': self.client.cookies.get('csrftoken', ''), 'X-Requested-With': 'XMLHttpRequest'},
+                check=lambda response: None if json.loads(response.body).get('success') else "success=false",
+            )
+
+    async def import_movie(self):
+        client = self.moderator_client
+        if not self.moderator_logged_in:
+            self.moderator_logged_in = await self.login(client, self.targets.moderator)
+        page = await client.request("GET movies:find", 'GET', "/find/")
+        await client.request("POST movies:find", 'POST', "/find/",
+                             form={'title': "stub", 'csrfmiddlewaretoken': self.form_token(page)})
+        await self.pause()
+        tmdb_id = self.rng.randint(1, 10_000_000)
+        # Failed imports redirect back to the search page with an error message
+        await client.request(
+            "GET movies:import", 'GET', f"/import/{tmdb_id}/", expect=(302,),
+            check=lambda response: "import failed" if '/find/' in response.header('location', '') else None,
+        )
+
+    async def run(self, mix, deadline):
+        scenarios = {'browse': self.browse, 'comment': self.comment, 'vote': self.vote, 'import': self.import_movie}
+        if not self.targets.members:
+            mix = {name: weight for name, weight in mix.items() if name not in ('comment', 'vote')}
+        if not self.targets.comments:
+            mix = {name: weight for name, weight in mix.items() if name != 'vote'}
+        if not self.targets.moderator:
+            mix = {name: weight for name, weight in mix.items() if name != 'import'}
+        names, weights = list(mix), list(mix.values())
+        try:
+            while time.perf_counter() < deadline:
+                await scenarios[self.rng.choices(names, weights)[0]]()
+                await self.pause()
+        finally:
+            await self.close()
+
+
+async def run_load(base_url, targets, users, duration, mix, vote_burst=10, think=0.5, seed=0):
+    stats = Stats()
+    deadline = time.perf_counter() + duration
+    virtual_users = [
+        VirtualUser(number, base_url, targets, stats, random.Random(seed + number), vote_burst, think)
+        for number in range(users)
+    ]
+    await asyncio.gather(*(user.run(mix, deadline) for user in virtual_users))
+    stats.finished = time.perf_counter()
+    return stats
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise ValueError(f"Unknown scenario '{name.strip()}', choose from {', '.join(DEFAULT_MIX)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
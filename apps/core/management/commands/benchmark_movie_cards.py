@@ -0,0 +1,78 @@
+import statistics
+import time
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from apps.movies.models import Movie
+
+
+def value_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    return 8
+
+
+class Command(BaseCommand):
+    help = ("Compare full Movie rows with the card projection (Movie.objects.cards()) on the listing pages: "
+            "bytes of column data fetched from the database, fetch time and template render time. Bytes are "
+            "the size of the loaded values, close to what the database sends.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument('--limit', type=int, default=1000, help="Movies on the list page, 0 for all.")
+        parser.add_argument('--query', default="movie", help="Search term for the search page.")
+
+    def handle(self, *args, **options):
+        if not Movie.objects.exists():
+            raise CommandError("No movies found, run seed_benchmark_data first.")
+
+        limit = options['limit'] or None
+        query = options['query']
+        carousel_ids = list(Movie.objects.order_by('?').values_list('pk', flat=True)[:3])
+        # (page, template, context name, queryset, extra card fields)
+        pages = [
+            ('movies:list', 'movies/movie_list.html', 'all_movies', Movie.objects.order_by('title')[:limit], ()),
+            ('movies:search', 'movies/movie_search.html', 'search_results',
+             Movie.objects.filter(Q(title__icontains=query) | Q(genres__icontains=query)).order_by('title'), ()),
+            ('carousel', 'movies/movie_list.html', 'random_movies', Movie.objects.filter(pk__in=carousel_ids),
+             ('director', 'writers')),
+        ]
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        self.stdout.write(f"{'page':<16} {'rows':>6} {'full KiB':>9} {'card KiB':>9} {'full fetch ms':>14} "
+                          f"{'card fetch ms':>14} {'full render ms':>15} {'card render ms':>15}")
+        for page, template, name, queryset, extra in pages:
+            full = self.measure(queryset.all(), template, name, request, options['iterations'])
+            cards = self.measure(queryset.cards(*extra), template, name, request, options['iterations'])
+            self.stdout.write(
+                f"{page:<16} {full['rows']:>6} {full['bytes'] / 1024:>9.1f} {cards['bytes'] / 1024:>9.1f} "
+                f"{full['fetch_ms']:>14.1f} {cards['fetch_ms']:>14.1f} {full['render_ms']:>15.1f} "
+                f"{cards['render_ms']:>15.1f}"
+            )
+
+    # Median fetch and render time, bytes counted over the fields each instance actually loaded
+    def measure(self, queryset, template, name, request, iterations):
+        fetches, renders = [], []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            movies = list(queryset.all())
+            fetches.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            render_to_string(template, {name: movies}, request=request)
+            renders.append(time.perf_counter() - started)
+
+        loaded = [field.attname for field in Movie._meta.concrete_fields]
+        size = sum(value_size(movie.__dict__[attname]) for movie in movies for attname in loaded
+                   if attname in movie.__dict__)
+        return {
+            'rows': len(movies),
+            'bytes': size,
+            'fetch_ms': statistics.median(fetches) * 1000,
+            'render_ms': statistics.median(renders) * 1000,
+        }
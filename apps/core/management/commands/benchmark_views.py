@@ -0,0 +1,165 @@
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from apps.movies.models import Movie, Comment
+from apps.users.avatars import avatar_digest
+from apps.users.models import User
+from .seed_benchmark_data import ADMIN_EMAIL
+
+# Latency and memory below these are noise, not regressions
+LATENCY_FLOOR_MS = 2.0
+MEMORY_FLOOR_KIB = 64
+
+
+class Command(BaseCommand):
+    help = ("Measure query count, p50/p95 latency and peak memory of every view in apps/movies/urls.py and "
+            "apps/users/urls.py against the current database (see seed_benchmark_data). Compares with a stored "
+            "baseline and fails on regressions, --update-baseline records a new one. Every request runs in a "
+            "rolled back transaction, so POST views leave no trace.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--baseline', help="Baseline JSON file, defaults to benchmarks/views-<database>.json.")
+        parser.add_argument('--update-baseline', action='store_true')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help="Allowed relative p95 latency and memory increase over the baseline.")
+        parser.add_argument('--only', nargs='+', default=[], help="Only run views whose label contains one of these.")
+
+    def handle(self, *args, **options):
+        try:
+            admin = User.objects.get(email=ADMIN_EMAIL)
+        except User.DoesNotExist:
+            raise CommandError("No benchmark data found, run seed_benchmark_data first.")
+
+        specs = self.build_specs(admin)
+        if options['only']:
+            specs = [spec for spec in specs if any(part in spec[0] for part in options['only'])]
+
+        self.stdout.write(f"{'view':<32} {'status':>6} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8} {'peak KiB':>9}")
+        results = {}
+        for label, method, url, data, user in specs:
+            result = self.measure(method, url, data, user, options['iterations'])
+            results[label] = result
+            self.stdout.write(f"{label:<32} {result['status']:>6} {result['queries']:>7} {result['p50_ms']:>8.1f} "
+                              f"{result['p95_ms']:>8.1f} {result['peak_kib']:>9.0f}")
+
+        path = Path(options['baseline'] or settings.BASE_DIR / 'benchmarks' / f'views-{connection.vendor}.json')
+        if options['update_baseline'] or not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({'database': connection.vendor, 'views': results}, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {path}"))
+            return
+
+        baseline = json.loads(path.read_text())
+        if baseline.get('database') != connection.vendor:
+            raise CommandError(f"{path} was recorded on {baseline.get('database')}, not {connection.vendor}.")
+        regressions = self.compare(baseline['views'], results, options['threshold'])
+        if regressions:
+            raise CommandError("Regressions against {}:\n  {}".format(path, "\n  ".join(regressions)))
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {path}"))
+
+    # (label, method, url, data, user) for every route, using the busiest movie and comment as fixtures
+    def build_specs(self, admin):
+        movie = Movie.objects.annotate(comment_count=Count('comments')).order_by('-comment_count').first()
+        if movie is None:
+            raise CommandError("No movies found, run seed_benchmark_data first.")
+        comment = Comment.objects.filter(movie=movie, parent__isnull=True).order_by('-likes_count').first()
+        member = User.objects.exclude(pk=admin.pk).order_by('pk').first()
+        vote = {'comment_id': comment.id, 'vote_type': 'like'}
+
+        return [
+            ('movies:list', 'GET', reverse('movies:list'), None, None),
+            ('movies:list?sort=rating', 'GET', reverse('movies:list') + '?sort=rating&order=desc', None, None),
+            ('movies:list?genre', 'GET', reverse('movies:list') + '?genre=drama', None, None),
+            ('movies:list?search', 'GET', reverse('movies:list') + '?search=Movie 00012', None, None),
+            ('movies:list (logged in)', 'GET', reverse('movies:list'), None, member),
+            ('movies:search', 'GET', reverse('movies:search') + '?query=drama', None, None),
+            ('movies:detail', 'GET', reverse('movies:detail', args=[movie.slug]), None, None),
+            ('movies:detail?comments=top', 'GET', reverse('movies:detail', args=[movie.slug]) + '?comments=top',
+             None, member),
+            ('movies:create', 'GET', reverse('movies:create'), None, admin),
+            ('movies:update', 'GET', reverse('movies:update', args=[movie.slug]), None, admin),
+            ('movies:delete', 'POST', reverse('movies:delete', args=[movie.slug]), {}, admin),
+            ('movies:find', 'GET', reverse('movies:find'), None, admin),
+            ('movies:comment_create', 'POST', reverse('movies:comment_create', args=[movie.id]),
+             {'text': "Benchmark comment", 'user_rating': '7'}, member),
+            ('movies:comment_edit', 'POST', reverse('movies:comment_edit', args=[comment.id]),
+             json.dumps({'text': "Edited benchmark comment"}), comment.author),
+            ('movies:comment_delete', 'POST', reverse('movies:comment_delete', args=[comment.id]), {}, admin),
+            ('movies:vote', 'POST', reverse('movies:vote'), json.dumps(vote), member),
+            ('users:register', 'GET', reverse('users:register'), None, None),
+            ('users:login', 'GET', reverse('users:login'), None, None),
+            ('users:logout', 'POST', reverse('users:logout'), {}, member),
+            ('users:list', 'GET', reverse('users:list'), None, admin),
+            ('users:profile', 'GET', reverse('users:profile', args=[member.id]), None, admin),
+            ('users:profile (own)', 'GET', reverse('users:profile', args=[member.id]), None, member),
+            ('users:assign_role', 'POST', reverse('users:assign_role', args=[member.id, 'moderator']), {}, admin),
+            ('users:delete', 'POST', reverse('users:delete', args=[member.id]), {}, admin),
+            ('users:avatar', 'GET', reverse('users:avatar', args=[member.id, avatar_digest(member.name)]),
+             None, None),
+        ]
+
+    def request(self, client, method, url, data):
+        if method == 'GET':
+            return client.get(url)
+        if isinstance(data, str):
+            return client.post(url, data, content_type='application/json')
+        return client.post(url, data)
+
+    def measure(self, method, url, data, user, iterations):
+        host = next((host for host in settings.ALLOWED_HOSTS if host and host != '*'), 'localhost')
+        timings, queries, peak, status = [], 0, 0, None
+        # Run 0 warms caches, run 1 traces memory (tracemalloc slows everything down), the rest are timed
+        for run in range(iterations + 2):
+            client = Client(HTTP_HOST=host)
+            if user is not None:
+                client.force_login(user)
+            with transaction.atomic():
+                if run == 1:
+                    tracemalloc.start()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = self.request(client, method, url, data)
+                    elapsed = (time.perf_counter() - started) * 1000
+                if run == 1:
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                transaction.set_rollback(True)
+            if run > 1:
+                timings.append(elapsed)
+                queries = max(queries, len(captured))
+            status = response.status_code
+
+        quantiles = statistics.quantiles(timings, n=20, method='inclusive') if len(timings) > 1 else timings * 19
+        return {
+            'status': status,
+            'queries': queries,
+            'p50_ms': statistics.median(timings),
+            'p95_ms': quantiles[18],
+            'peak_kib': peak / 1024,
+        }
+
+    def compare(self, baseline, results, threshold):
+        regressions = []
+        for label, result in results.items():
+            before = baseline.get(label)
+            if before is None:
+                continue
+            if result['status'] != before['status']:
+                regressions.append(f"{label}: status {before['status']} -> {result['status']}")
+            if result['queries'] > before['queries']:
+                regressions.append(f"{label}: {before['queries']} -> {result['queries']} queries")
+            if result['p95_ms'] > before['p95_ms'] * (1 + threshold) + LATENCY_FLOOR_MS:
+                regressions.append(f"{label}: p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms")
+            if result['peak_kib'] > before['peak_kib'] * (1 + threshold) + MEMORY_FLOOR_KIB:
+                regressions.append(f"{label}: peak memory {before['peak_kib']:.0f} -> {result['peak_kib']:.0f} KiB")
+        return regressions
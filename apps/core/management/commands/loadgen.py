@@ -0,0 +1,72 @@
+import asyncio
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.loadgen import DEFAULT_MIX, Targets, parse_mix, run_load
+from apps.core.stub_tmdb import start_stub_tmdb
+from apps.movies.models import Movie, Comment
+from apps.users.models import User
+from .seed_benchmark_data import ADMIN_EMAIL, BENCH_EMAIL_DOMAIN
+
+SAMPLE_MOVIES = 2000
+SAMPLE_COMMENTS = 20
+
+
+class Command(BaseCommand):
+    help = ("Replay a realistic traffic mix against a running server (runserver, gunicorn or uvicorn) and report "
+            "throughput, latency percentiles and error rates. Movies, comments and the seed_benchmark_data accounts "
+            "are read from the database the server uses. For imports, start the server with "
+            "TMDB_API_URL=http://127.0.0.1:<stub port>/3 and pass --stub-tmdb-port.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL of the server under test.")
+        parser.add_argument('--users', type=int, default=20, help="Concurrent virtual users.")
+        parser.add_argument('--duration', type=float, default=60, help="Seconds to run.")
+        parser.add_argument('--mix', default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+                            help="Relative scenario weights, e.g. browse=70,comment=10,vote=15,import=5.")
+        parser.add_argument('--think', type=float, default=0.5, help="Mean think time between actions in seconds.")
+        parser.add_argument('--vote-burst', type=int, default=10, help="Votes per vote scenario.")
+        parser.add_argument('--password', default='benchmark', help="Password of the benchmark accounts.")
+        parser.add_argument('--stub-tmdb-port', type=int, default=0, help="Serve a stub TMDb API on this port.")
+        parser.add_argument('--stub-tmdb-latency', type=float, default=0.05, help="Stub TMDb response delay (s).")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        targets = self.load_targets(options['password'])
+        if not targets.movies:
+            raise CommandError("No movies to browse, run seed_benchmark_data first.")
+        if 'import' in mix and not options['stub_tmdb_port']:
+            self.stdout.write(self.style.WARNING("Imports will call the TMDb API configured on the server."))
+
+        stub = None
+        if options['stub_tmdb_port']:
+            stub = start_stub_tmdb(options['stub_tmdb_port'], latency=options['stub_tmdb_latency'])
+            self.stdout.write(f"Stub TMDb listening on http://127.0.0.1:{options['stub_tmdb_port']}/3")
+
+        self.stdout.write(f"{options['users']} users for {options['duration']:.0f}s against {options['url']}, "
+                          f"mix {mix}")
+        try:
+            stats = asyncio.run(run_load(
+                options['url'], targets, options['users'], options['duration'], mix,
+                vote_burst=options['vote_burst'], think=options['think'], seed=options['seed'],
+            ))
+        finally:
+            if stub is not None:
+                stub.shutdown()
+        self.stdout.write(stats.report())
+
+    def load_targets(self, password):
+        movies = list(Movie.objects.order_by('-hot_score', 'id').values_list('id', 'slug')[:SAMPLE_MOVIES])
+        comments = {}
+        for movie_id, _ in movies[:SAMPLE_MOVIES // 10]:
+            comment_ids = list(Comment.objects.filter(movie_id=movie_id).order_by('-id').values_list(
+                'id', flat=True)[:SAMPLE_COMMENTS])
+            if comment_ids:
+                comments[movie_id] = comment_ids
+        members = list(User.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}").exclude(
+            email=ADMIN_EMAIL).order_by('id').values_list('email', flat=True)[:1000])
+        moderator = ADMIN_EMAIL if User.objects.filter(email=ADMIN_EMAIL).exists() else None
+        return Targets(movies, comments, members, moderator, password)
@@ -0,0 +1,64 @@
+import re
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.utils.cache import get_max_age
+
+ASSET_RE = re.compile(r"""(?:href|src)=["']([^"']+)["']""")
+# A browser reuses anything cacheable for at least a day without asking the server again
+FRESH_FOR = 60 * 60 * 24
+
+
+class Command(BaseCommand):
+    help = ("Measure requests and bytes transferred for a cold and a warm load of a page and its local static "
+            "assets, as a browser accepting brotli/gzip would see them. Run collectstatic first.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/', help="Page to load.")
+
+    def handle(self, *args, **options):
+        host = next((host for host in settings.ALLOWED_HOSTS if host and host != '*'), 'localhost')
+        client = Client(HTTP_HOST=host, HTTP_ACCEPT_ENCODING='br, gzip')
+        static_prefix = settings.STATIC_URL
+
+        page = client.get(options['path'])
+        html = page.content.decode('utf-8')
+        assets = sorted({url for url in ASSET_RE.findall(html) if url.startswith(static_prefix)})
+
+        cold = [('page', len(page.content))]
+        warm = [('page', len(page.content))]
+        self.stdout.write(f"{'asset':<60} {'encoding':>8} {'cold B':>9} {'warm B':>7}  cache-control")
+
+        for url in assets:
+            response = client.get(url)
+            size = self.body_size(response)
+            cold.append((url, size))
+
+            max_age = get_max_age(response) or 0
+            warm_size = '-'
+            if max_age < FRESH_FOR:
+                # Stale after a visit: the browser revalidates with the validators it was given
+                validators = {}
+                if response.has_header('ETag'):
+                    validators['HTTP_IF_NONE_MATCH'] = response['ETag']
+                if response.has_header('Last-Modified'):
+                    validators['HTTP_IF_MODIFIED_SINCE'] = response['Last-Modified']
+                revalidated = client.get(url, **validators)
+                warm_size = self.body_size(revalidated)
+                warm.append((url, warm_size))
+
+            self.stdout.write(
+                f"{url[-60:]:<60} {response.get('Content-Encoding', 'none'):>8} {size:>9} {warm_size:>7}  "
+                f"{response.get('Cache-Control', '')}"
+            )
+
+        self.stdout.write("")
+        self.stdout.write(f"Static build mode: {settings.STATIC_BUILD}")
+        self.stdout.write(f"Cold load: {len(cold)} requests, {sum(size for _, size in cold)} bytes")
+        self.stdout.write(f"Warm load: {len(warm)} requests, {sum(size for _, size in warm)} bytes")
+
+    @staticmethod
+    def body_size(response):
+        if response.streaming:
+            return sum(len(chunk) for chunk in response.streaming_content)
+        return len(response.content)
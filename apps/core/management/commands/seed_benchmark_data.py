@@ -0,0 +1,165 @@
+import random
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from apps.movies import trending
+from apps.movies.models import Movie, Comment, Vote, Genre, Person, MovieGenre, MovieCredit, make_teaser
+from apps.movies.rendering import render_comment_html
+from apps.users.models import User, RoleEnum
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family", "Fantasy", "History",
+    "Horror", "Music", "Mystery", "Romance", "Science Fiction", "Thriller", "War", "Western",
+]
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et "
+         "dolore magna aliqua ut enim ad minim veniam quis nostrud exercitation ullamco laboris").split()
+BENCH_EMAIL_DOMAIN = "bench.example.com"
+ADMIN_EMAIL = f"admin@{BENCH_EMAIL_DOMAIN}"
+REPLY_SHARE = 0.2
+LIKE_SHARE = 0.7
+HOT_SHARE = 0.1
+
+
+class Command(BaseCommand):
+    help = ("Fill the database with a large synthetic catalogue for benchmark_views: users, movies with genres and "
+            "credits, comments with replies and votes, all written with bulk_create.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=50_000)
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--votes', type=int, default=5_000_000, help="Approximate, votes per comment are random.")
+        parser.add_argument('--users', type=int, default=20_000)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--force', action='store_true', help="Seed even if the database already has movies.")
+
+    def handle(self, *args, **options):
+        if Movie.objects.exists() and not options['force']:
+            raise CommandError("The database already contains movies, use --force to add benchmark data anyway.")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+
+        user_ids = self.seed_users(options['users'])
+        movie_ids = self.seed_movies(options['movies'])
+        self.seed_comments(movie_ids, user_ids, options['comments'], options['votes'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(user_ids)} users, {len(movie_ids)} movies, {Comment.objects.count()} comments and "
+            f"{Vote.objects.count()} votes. Log in as {ADMIN_EMAIL} / benchmark."
+        ))
+
+    def text(self, words):
+        return " ".join(self.rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+    # Hot score of a row with a few events in the last two trending windows for HOT_SHARE of the rows, on the
+    # same log scale as trending.bump so seeded rows rank among the ones bumped while benchmarking
+    def hot_score(self):
+        if self.rng.random() >= HOT_SHARE:
+            return 0.0
+        when = self.now - self.rng.uniform(0, 2) * trending.TRENDING_WINDOW
+        return trending.event_score(self.rng.randint(1, 20) * trending.COMMENT_WEIGHT, when)
+
+    def seed_users(self, count):
+        password = make_password("benchmark")
+        users = [User(email=ADMIN_EMAIL, name="Benchmark Admin", password=password, role=RoleEnum.ADMIN,
+                      is_staff=True)]
+        users.extend(User(email=f"user{i}@{BENCH_EMAIL_DOMAIN}", name=f"Bench User {i}", password=password)
+                     for i in range(count))
+        User.objects.bulk_create(users, batch_size=self.batch_size, ignore_conflicts=True)
+        self.stdout.write(f"Users: {len(users)}")
+        return list(User.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}").values_list('id', flat=True))
+
+    def seed_movies(self, count):
+        Genre.objects.bulk_create([Genre(name=name, slug=name.lower().replace(" ", "-")) for name in GENRES],
+                                  ignore_conflicts=True)
+        genres = dict(Genre.objects.filter(name__in=GENRES).values_list('name', 'id'))
+        people_count = max(1, count // 5)
+        Person.objects.bulk_create(
+            [Person(name=f"Bench Person {i}", slug=f"bench-person-{i}") for i in range(people_count)],
+            batch_size=self.batch_size, ignore_conflicts=True
+        )
+        people = dict(Person.objects.filter(slug__startswith="bench-person-").values_list('name', 'id'))
+        person_names = list(people)
+
+        for start in range(0, count, self.batch_size):
+            movies, taxonomy = [], []
+            for i in range(start, min(count, start + self.batch_size)):
+                year = self.rng.randint(1920, 2025)
+                movie_genres = self.rng.sample(GENRES, self.rng.randint(1, 3))
+                director = self.rng.choice(person_names)
+                writers = self.rng.sample(person_names, min(len(person_names), self.rng.randint(1, 2)))
+                body = self.text(60)
+                movies.append(Movie(
+                    title=f"Benchmark Movie {i:07d}", slug=f"benchmark-movie-{i:07d}",
+                    date=str(year), year=year, body=body, teaser=make_teaser(body),
+                    rating=round(self.rng.uniform(1, 10), 1),
+                    director=director, writers=", ".join(writers), genres=", ".join(movie_genres),
+                    hot_score=self.hot_score(),
+                ))
+                taxonomy.append((movie_genres, director, writers))
+
+            with transaction.atomic():
+                Movie.objects.bulk_create(movies)
+                MovieGenre.objects.bulk_create([
+                    MovieGenre(movie_id=movie.id, genre_id=genres[name])
+                    for movie, (names, _, _) in zip(movies, taxonomy) for name in names
+                ])
+                MovieCredit.objects.bulk_create([
+                    MovieCredit(movie_id=movie.id, person_id=people[name], role=role)
+                    for movie, (_, director, writers) in zip(movies, taxonomy)
+                    for role, names in (('director', [director]), ('writer', writers)) for name in names
+                ], ignore_conflicts=True)
+            self.stdout.write(f"Movies: {start + len(movies)}/{count}")
+
+        return list(Movie.objects.filter(slug__startswith="benchmark-movie-").values_list('id', flat=True))
+
+    # Comments follow a skewed popularity so a few movies carry long threads, like the real site
+    def seed_comments(self, movie_ids, user_ids, count, votes):
+        cum_weights, total = [], 0.0
+        for rank in range(len(movie_ids)):
+            total += 1 / (rank + 1) ** 0.8
+            cum_weights.append(total)
+        mean_votes = votes / count if count else 0
+        roots = []
+        created = 0
+
+        while created < count:
+            size = min(self.batch_size, count - created)
+            comments, vote_counts = [], []
+            for movie_id in self.rng.choices(movie_ids, cum_weights=cum_weights, k=size):
+                parent = self.rng.choice(roots) if roots and self.rng.random() < REPLY_SHARE else None
+                text = self.text(self.rng.randint(5, 60))
+                vote_count = min(len(user_ids), int(self.rng.expovariate(1 / mean_votes))) if mean_votes else 0
+                likes = sum(self.rng.random() < LIKE_SHARE for _ in range(vote_count))
+                comments.append(Comment(
+                    movie_id=parent[1] if parent else movie_id, parent_id=parent[0] if parent else None,
+                    author_id=self.rng.choice(user_ids), text=text, text_html=render_comment_html(text),
+                    user_rating=None if parent else self.rng.randint(1, 10),
+                    likes_count=likes, dislikes_count=vote_count - likes, hot_score=self.hot_score(),
+                ))
+                vote_counts.append((vote_count, likes))
+
+            with transaction.atomic():
+                Comment.objects.bulk_create(comments)
+                for comment in comments:
+                    comment.path = Comment.build_path(
+                        comment.id, Comment.build_path(comment.parent_id) if comment.parent_id else "")
+                Comment.objects.bulk_update(comments, ['path'], batch_size=self.batch_size)
+                # Consecutive users starting at a random offset, so (user, comment) stays unique
+                comment_votes = [
+                    Vote(user_id=user_ids[(offset + j) % len(user_ids)], comment_id=comment.id,
+                         vote_type='like' if j < likes else 'dislike')
+                    for comment, (vote_count, likes), offset in zip(
+                        comments, vote_counts, (self.rng.randrange(len(user_ids)) for _ in comments)
+                    )
+                    for j in range(vote_count)
+                ]
+                Vote.objects.bulk_create(comment_votes, batch_size=self.batch_size)
+
+            roots.extend((comment.id, comment.movie_id) for comment in comments if comment.parent_id is None)
+            created += size
+            self.stdout.write(f"Comments: {created}/{count}")
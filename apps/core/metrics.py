@@ -0,0 +1,128 @@
+import threading
+from django.db import connections
+from apps.core.middleware import REQUEST_HISTOGRAMS
+
+PREFIX = 'myfilmsay_'
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+# Monotonic counter sharded per thread: each thread only ever writes its own dict, so increments take no lock
+# and worker threads never contend. Shards are summed when the endpoint is scraped.
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = PREFIX + name + "_total"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.local = threading.local()
+        self.shards = []
+        self.lock = threading.Lock()
+
+    def shard(self):
+        values = getattr(self.local, 'values', None)
+        if values is None:
+            values = self.local.values = {}
+            with self.lock:
+                self.shards.append(values)
+        return values
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        values = self.shard()
+        values[key] = values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            shards = list(self.shards)
+        totals = {}
+        for values in shards:
+            for key, value in values.copy().items():
+                totals[key] = totals.get(key, 0) + value
+        for key, value in sorted(totals.items()):
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+# Gauge read from a callback at scrape time, the callback yields (labels, value) pairs
+class Gauge:
+    type = 'gauge'
+
+    def __init__(self, name, documentation, callback):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.callback = callback
+
+    def samples(self):
+        for labels, value in self.callback():
+            yield self.name, labels, value
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    # Returns the already registered metric on repeated registration, so module reloads keep their counts
+    def register(self, metric):
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, callback):
+    return REGISTRY.register(Gauge(name, documentation, callback))
+
+
+# Request histograms collected by PerformanceMiddleware, empty unless PERF_INSTRUMENTATION is enabled
+class RequestHistogramMetric:
+    type = 'histogram'
+    name = PREFIX + 'request_duration_ms'
+    documentation = "Request wall time in milliseconds per view."
+
+    def samples(self):
+        for (view_name, measurement), snapshot in REQUEST_HISTOGRAMS.snapshot().items():
+            if measurement != 'wall_ms':
+                continue
+            cumulative = 0
+            for bound, count in zip(snapshot['buckets'] + ('+Inf',), snapshot['counts']):
+                cumulative += count
+                yield self.name + "_bucket", {'view': view_name, 'le': bound}, cumulative
+            yield self.name + "_sum", {'view': view_name}, snapshot['sum']
+            yield self.name + "_count", {'view': view_name}, snapshot['count']
+
+
+def db_pool_stats():
+    for connection in connections.all():
+        pool = getattr(connection, 'pool', None)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        for state, key in (('size', 'pool_size'), ('available', 'pool_available'), ('waiting', 'requests_waiting')):
+            yield {'alias': connection.alias, 'state': state}, stats.get(key, 0)
+
+
+REGISTRY.register(RequestHistogramMetric())
+gauge('db_pool_connections', "Connections in the database connection pool of this process by state.", db_pool_stats)
@@ -0,0 +1,202 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from .routers import PIN_COOKIE, ReplicaState, _request_state
+
+logger = logging.getLogger('apps.core.performance')
+
+# Upper bounds of the histogram buckets, the last bucket catches everything above
+TIME_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+HISTOGRAM_BUCKETS = {
+    'wall_ms': TIME_BUCKETS_MS,
+    'db_ms': TIME_BUCKETS_MS,
+    'template_ms': TIME_BUCKETS_MS,
+    'tmdb_ms': TIME_BUCKETS_MS,
+    'queries': QUERY_BUCKETS,
+}
+
+_current_request = ContextVar('perf_request_stats', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    # Smallest bucket bound covering the given share of observations
+    def quantile(self, q):
+        with self.lock:
+            counts, total = list(self.counts), self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            seen += count
+            if total and seen >= q * total:
+                return bound
+        return None
+
+    def snapshot(self):
+        with self.lock:
+            return {'buckets': self.buckets, 'counts': list(self.counts), 'count': self.count, 'sum': self.sum}
+
+
+# Histograms per (view name, measurement), kept for the lifetime of the process
+class RequestHistograms:
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def get(self, view_name, measurement):
+        key = (view_name, measurement)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram(HISTOGRAM_BUCKETS[measurement]))
+        return histogram
+
+    def observe(self, view_name, measurements):
+        for measurement, value in measurements.items():
+            self.get(view_name, measurement).observe(value)
+
+    def snapshot(self):
+        with self.lock:
+            items = list(self.histograms.items())
+        return {key: histogram.snapshot() for key, histogram in sorted(items)}
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+
+REQUEST_HISTOGRAMS = RequestHistograms()
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.sql = {}
+        self.timings = {'template': 0.0, 'tmdb': 0.0}
+
+    # connection.execute_wrapper hook, counts every query run on any connection while the request is handled
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            count, total = self.sql.get(sql, (0, 0.0))
+            self.sql[sql] = (count + 1, total + duration)
+
+    def top_queries(self, limit):
+        return sorted(self.sql.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+
+
+# Adds the time spent in the block to the current request, e.g. `with timed('tmdb'): ...`
+@contextmanager
+def timed(name):
+    stats = _current_request.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timings[name] = stats.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+# Per request wall, DB, template and TMDb time as Server-Timing headers, histograms per view and slow request logs.
+# Template time is reported by the TimedDjangoTemplates backend. Removed from the middleware chain entirely unless
+# PERF_INSTRUMENTATION is enabled.
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        if not settings.PERF_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        wall = time.perf_counter() - start
+
+        view_name = request.resolver_match.view_name if request.resolver_match else 'unresolved'
+        measurements = {
+            'wall_ms': wall * 1000,
+            'db_ms': stats.db_time * 1000,
+            'template_ms': stats.timings['template'] * 1000,
+            'tmdb_ms': stats.timings['tmdb'] * 1000,
+            'queries': stats.queries,
+        }
+        REQUEST_HISTOGRAMS.observe(view_name, measurements)
+        response['Server-Timing'] = ", ".join([
+            f'db;dur={measurements["db_ms"]:.1f};desc="{stats.queries} queries"',
+            f'tpl;dur={measurements["template_ms"]:.1f}',
+            f'tmdb;dur={measurements["tmdb_ms"]:.1f}',
+            f'total;dur={measurements["wall_ms"]:.1f}',
+        ])
+
+        if measurements['wall_ms'] >= settings.PERF_SLOW_REQUEST_MS:
+            self.log_slow_request(request, view_name, measurements, stats)
+        return response
+
+    def log_slow_request(self, request, view_name, measurements, stats):
+        lines = [
+            f"Slow request {request.method} {request.path} ({view_name}): {measurements['wall_ms']:.0f} ms total, "
+            f"{stats.queries} queries in {measurements['db_ms']:.0f} ms, template {measurements['template_ms']:.0f} ms, "
+            f"TMDb {measurements['tmdb_ms']:.0f} ms"
+        ]
+        for sql, (count, total) in stats.top_queries(settings.PERF_TOP_QUERIES):
+            lines.append(f"  {total * 1000:8.1f} ms  x{count:<4} {sql[:300]}")
+        logger.warning("\n".join(lines))
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+# Read-your-writes for PrimaryReplicaRouter: unsafe requests read from the primary, and a request that wrote
+# sets a short-lived cookie that keeps the same browser on the primary until the replicas have caught up
+class ReplicaPinningMiddleware:
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = ReplicaState(pinned=request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        if state.wrote:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                                samesite='Lax', secure=request.is_secure())
+        return response
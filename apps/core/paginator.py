@@ -0,0 +1,40 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Below this many rows an exact COUNT(*) is cheap enough and page numbers stay exact
+ESTIMATE_THRESHOLD = 50_000
+
+
+# Row count from the PostgreSQL planner: pg_class.reltuples for a whole table, the EXPLAIN row estimate for a
+# filtered queryset. None on other databases, or when the table was never analyzed.
+def estimated_count(queryset):
+    query = getattr(queryset, 'query', None)
+    if query is None or connections[queryset.db].vendor != 'postgresql':
+        return None
+
+    with connections[queryset.db].cursor() as cursor:
+        if not query.where and not query.distinct and query.low_mark == 0 and query.high_mark is None:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)",
+                           [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            estimate = row[0] if row else -1
+        else:
+            sql, params = query.sql_with_params()
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+            estimate = plan[0]['Plan']['Plan Rows']
+    return int(estimate) if estimate >= 0 else None
+
+
+# Paginator for huge tables: trusts the planner estimate instead of running COUNT(*) once it is above the
+# threshold, so the last page number may be slightly off
+class EstimatedCountPaginator(Paginator):
+    estimate_threshold = ESTIMATE_THRESHOLD
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is None or estimate < self.estimate_threshold:
+            return super().count
+        return estimate
@@ -0,0 +1,124 @@
+import re
+from django.conf import settings
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+CSS_SPACE_RE = re.compile(r"\s+")
+CSS_PUNCTUATION_RE = re.compile(r"\s*([{};,>])\s*")
+# Last code character before a "/" that starts a regex literal rather than a division
+JS_REGEX_PRECEDERS = frozenset("(,=:[!&|?{};+-*%<>~^")
+
+
+def minify_css(source):
+    source = CSS_COMMENT_RE.sub("", source)
+    source = CSS_SPACE_RE.sub(" ", source)
+    source = CSS_PUNCTUATION_RE.sub(r"\1", source)
+    return source.replace(";}", "}").strip()
+
+
+# Scans one line of JavaScript, updating the stack of open constructs that span lines: '`' template literal
+# text, '{' braces (so a `${...}` knows where it ends) and '/*' block comments. Quoted strings and regex
+# literals end on their own line and are skipped so their quotes and slashes open nothing.
+def _scan_js_line(line, stack, previous):
+    i, length = 0, len(line)
+    while i < length:
+        top = stack[-1] if stack else None
+        char = line[i]
+        if top == '/*':
+            end = line.find('*/', i)
+            if end < 0:
+                break
+            stack.pop()
+            i = end + 2
+        elif top == '`':
+            if char == '\\':
+                i += 2
+            elif char == '`':
+                stack.pop()
+                previous = char
+                i += 1
+            elif line.startswith('${', i):
+                stack.append('{')
+                i += 2
+            else:
+                i += 1
+        elif char.isspace():
+            i += 1
+        elif line.startswith('//', i):
+            break
+        elif line.startswith('/*', i):
+            stack.append('/*')
+            i += 2
+        else:
+            if char in '\'"' or (char == '/' and (previous is None or previous in JS_REGEX_PRECEDERS)):
+                i += 1
+                in_class = False
+                while i < length and (line[i] != char or in_class):
+                    if line[i] == '\\':
+                        i += 1
+                    elif char == '/' and line[i] in '[]':
+                        in_class = line[i] == '['
+                    i += 1
+            elif char == '`':
+                stack.append('`')
+            elif char == '{':
+                stack.append('{')
+            elif char == '}' and top == '{':
+                stack.pop()
+            previous = char
+            i += 1
+    return previous
+
+
+# Drops comment-only lines, indentation and blank lines, never touches code. Lines that start or end inside a
+# template literal keep their whitespace, it is part of the string.
+def minify_js(source):
+    lines, stack, previous = [], [], None
+    for line in source.splitlines():
+        starts_in_template = bool(stack) and stack[-1] == '`'
+        previous = _scan_js_line(line, stack, previous)
+        ends_in_template = bool(stack) and stack[-1] == '`'
+        if not starts_in_template:
+            line = line.lstrip()
+            if not line or line.startswith('//'):
+                continue
+        if not ends_in_template:
+            line = line.rstrip()
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+MINIFIERS = {
+    '.css': minify_css,
+    '.js': minify_js,
+}
+
+
+# Concatenates and minifies settings.STATIC_BUNDLES, then hashes and gzip/brotli-compresses everything
+class BundledStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for bundle, sources in settings.STATIC_BUNDLES.items():
+                self.build_bundle(bundle, sources)
+                paths[bundle] = (self, bundle)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    # Templates reference a few files that are not checked in, keep rendering their unhashed URL
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def build_bundle(self, bundle, sources):
+        minify = MINIFIERS[bundle[bundle.rfind('.'):]]
+        parts = []
+        for source in sources:
+            with self.open(source) as handle:
+                parts.append(minify(handle.read().decode('utf-8')))
+        if self.exists(bundle):
+            self.delete(bundle)
+        self._save(bundle, ContentFile("\n".join(parts).encode('utf-8')))
@@ -0,0 +1,67 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+MOVIE_PATH_RE = re.compile(r"^/3/movie/(?P<id>\d+)(?P<credits>/credits)?$")
+GENRES = ["Drama", "Comedy", "Thriller", "Science Fiction", "Romance"]
+
+
+def movie_payload(tmdb_id):
+    return {
+        "id": tmdb_id,
+        "title": f"Stub Movie {tmdb_id}",
+        "release_date": f"{1950 + tmdb_id % 75}-01-01",
+        "overview": f"Synthetic TMDb entry {tmdb_id} served by the load test stub.",
+        "poster_path": None,
+        "vote_average": round(tmdb_id % 100 / 10, 1),
+        "genres": [{"id": i, "name": name} for i, name in enumerate(GENRES) if (tmdb_id >> i) & 1],
+    }
+
+
+def credits_payload(tmdb_id):
+    return {"id": tmdb_id, "crew": [
+        {"name": f"Stub Director {tmdb_id % 997}", "job": "Director"},
+        {"name": f"Stub Writer {tmdb_id % 991}", "job": "Screenplay"},
+    ]}
+
+
+# Answers the three TMDb endpoints the import views use, after an artificial network latency
+class StubTMDbHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlsplit(self.path)
+        match = MOVIE_PATH_RE.match(url.path)
+        if url.path == "/3/search/movie":
+            query = parse_qs(url.query).get("query", [""])[0]
+            start = abs(hash(query)) % 1_000_000
+            payload = {"page": 1, "results": [movie_payload(start + i) for i in range(10)]}
+        elif match:
+            tmdb_id = int(match["id"])
+            payload = credits_payload(tmdb_id) if match["credits"] else movie_payload(tmdb_id)
+        else:
+            self.send_error(404)
+            return
+
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serve the stub on a daemon thread, point the app at it with TMDB_API_URL=http://<host>:<port>/3
+def start_stub_tmdb(port, latency=0.05, host="127.0.0.1"):
+    handler = type("ConfiguredStubTMDbHandler", (StubTMDbHandler,), {"latency": latency})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
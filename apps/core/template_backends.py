@@ -0,0 +1,28 @@
+from contextvars import ContextVar
+from django.template.backends.django import DjangoTemplates, Template
+from .middleware import timed
+
+_rendering = ContextVar('template_rendering', default=False)
+
+
+# Every render through the engine counts as template time of the current request: TemplateResponses, render(),
+# render_to_string() and templates rendered from template tags. Nested renders are part of the outer one.
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        if _rendering.get():
+            return super().render(context, request)
+        token = _rendering.set(True)
+        try:
+            with timed('template'):
+                return super().render(context, request)
+        finally:
+            _rendering.reset(token)
+
+
+# DjangoTemplates whose templates report their render time to PerformanceMiddleware
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
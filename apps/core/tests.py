@@ -0,0 +1,297 @@
+import asyncio
+import json
+import random
+import tempfile
+import threading
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command, CommandError
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, LiveServerTestCase, Client, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from apps.core.loadgen import Stats, Targets, VirtualUser
+from apps.core.metrics import Counter, REGISTRY
+from apps.core.paginator import EstimatedCountPaginator, estimated_count
+from apps.core.middleware import REQUEST_HISTOGRAMS, ReplicaPinningMiddleware
+from apps.core.routers import PIN_COOKIE, PrimaryReplicaRouter
+from apps.core.storage import minify_css, minify_js
+from apps.movies import trending
+from apps.movies.models import Movie, Comment
+from apps.users.models import User, RoleEnum
+
+
+class MinifyTest(SimpleTestCase):
+    def test_minify_css(self):
+        """Test comments and whitespace are dropped without changing rules."""
+        source = "/* header */\nbody {\n    color: red;\n    margin: 0 auto;\n}\n\na > b ,\ni { top: calc(1px + 2px); }\n"
+        self.assertEqual(minify_css(source), "body{color: red;margin: 0 auto}a>b,i{top: calc(1px + 2px)}")
+
+    def test_minify_js_keeps_code(self):
+        """Test only comment lines and indentation are removed from scripts."""
+        source = "// setup\nfunction f() {\n    var url = 'http://x';  // keep\n\n    return url;\n}\n"
+        self.assertEqual(minify_js(source), "function f() {\nvar url = 'http://x';  // keep\nreturn url;\n}\n")
+
+
+    def test_minify_js_keeps_template_literals(self):
+        """Test whitespace, blank lines and // inside multi-line template literals are kept as written."""
+        source = (
+            "function row(item) {\n"
+            "    const html = `\n"
+            "        <li class=\"${item.done ? `done` : 'open'}\">\n"
+            "\n"
+            "            // ${item.name} \n"
+            "        </li>`;\n"
+            "    const re = /[`'\"]/g; // quotes\n"
+            "    return html.replace(re, '');\n"
+            "}\n"
+        )
+        self.assertEqual(minify_js(source), (
+            "function row(item) {\n"
+            "const html = `\n"
+            "        <li class=\"${item.done ? `done` : 'open'}\">\n"
+            "\n"
+            "            // ${item.name} \n"
+            "        </li>`;\n"
+            "const re = /[`'\"]/g; // quotes\n"
+            "return html.replace(re, '');\n"
+            "}\n"
+        ))
+
+
+class PerformanceMiddlewareTest(TestCase):
+    def setUp(self):
+        Movie.objects.create(title="Timed Movie", date="2023", body="Description")
+        REQUEST_HISTOGRAMS.reset()
+
+    @override_settings(PERF_INSTRUMENTATION=False)
+    def test_disabled_by_default(self):
+        """Test the middleware removes itself when instrumentation is off."""
+        response = Client().get(reverse('movies:list'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(REQUEST_HISTOGRAMS.snapshot(), {})
+
+    @override_settings(PERF_INSTRUMENTATION=True, PERF_SLOW_REQUEST_MS=100000)
+    def test_server_timing_and_histograms(self):
+        """Test DB, template and total time are reported and aggregated per view."""
+        response = Client().get(reverse('movies:list'))
+        self.assertIn('queries"', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+        snapshot = REQUEST_HISTOGRAMS.snapshot()
+        self.assertEqual(snapshot[('movies:list', 'wall_ms')]['count'], 1)
+        self.assertGreater(snapshot[('movies:list', 'queries')]['sum'], 0)
+
+    @override_settings(PERF_INSTRUMENTATION=True, PERF_SLOW_REQUEST_MS=0)
+    def test_slow_request_logs_top_queries(self):
+        """Test requests over the threshold are logged with their queries."""
+        with self.assertLogs('apps.core.performance', level='WARNING') as logs:
+            Client().get(reverse('movies:list'))
+        self.assertIn('Slow request GET', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    @override_settings(PERF_INSTRUMENTATION=True)
+    def test_tmdb_time_is_recorded(self):
+        """Test outbound TMDb calls are timed separately."""
+        User.objects.create_user(email="admin@example.com", name="Admin", password="password", role=RoleEnum.ADMIN)
+        client = Client()
+        client.login(email="admin@example.com", password="password")
+        with mock.patch('apps.movies.tmdb.requests.get') as get:
+            get.return_value.status_code = 200
+            get.return_value.json.return_value = {"results": []}
+            client.post(reverse('movies:find'), {'title': 'Alien'})
+        get.assert_called_once()
+        self.assertEqual(REQUEST_HISTOGRAMS.snapshot()[('movies:find', 'tmdb_ms')]['count'], 1)
+
+    @override_settings(PERF_INSTRUMENTATION=True)
+    def test_render_views_record_template_time(self):
+        """Test views rendering with render() report their template time like TemplateResponses."""
+        User.objects.create_user(email="admin@example.com", name="Admin", password="password", role=RoleEnum.ADMIN)
+        client = Client()
+        client.login(email="admin@example.com", password="password")
+        response = client.get(reverse('movies:find'))
+        self.assertNotIn('tpl;dur=0.0,', response['Server-Timing'])
+        self.assertGreater(REQUEST_HISTOGRAMS.snapshot()[('movies:find', 'template_ms')]['sum'], 0)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def handle(self, request, write=False):
+        routed = []
+
+        def view(request):
+            routed.append(self.router.db_for_read(Movie))
+            if write:
+                self.router.db_for_write(Comment)
+                routed.append(self.router.db_for_read(Movie))
+            return HttpResponse()
+
+        return ReplicaPinningMiddleware(view)(request), routed
+
+    def test_reads_outside_requests_use_primary(self):
+        """Test management commands and the shell never read from a replica."""
+        self.assertEqual(self.router.db_for_read(Movie), 'default')
+        self.assertEqual(self.router.db_for_write(Movie), 'default')
+
+    def test_get_reads_from_replica(self):
+        """Test plain page views read from a replica and set no pin cookie."""
+        response, routed = self.handle(self.factory.get('/'))
+        self.assertEqual(routed, ['replica1'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_pins_to_primary(self):
+        """Test a write moves later reads to the primary and pins the browser for a while."""
+        response, routed = self.handle(self.factory.post('/vote/'), write=True)
+        self.assertEqual(routed, ['default', 'default'])
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        _, routed = self.handle(request)
+        self.assertEqual(routed, ['default'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_disabled_without_replicas(self):
+        """Test the middleware removes itself when no replicas are configured."""
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaPinningMiddleware(lambda request: HttpResponse())
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    def setUp(self):
+        for number in range(3):
+            Movie.objects.create(title=f"Movie {number}", date="2023", body="Description")
+
+    def test_exact_count_without_estimate(self):
+        """Test databases without planner estimates fall back to COUNT(*)."""
+        self.assertIsNone(estimated_count(Movie.objects.all()))
+        self.assertEqual(EstimatedCountPaginator(Movie.objects.order_by('pk'), 2).num_pages, 2)
+
+    def test_large_estimate_skips_count(self):
+        """Test estimates above the threshold are used without counting."""
+        with mock.patch('apps.core.paginator.estimated_count', return_value=2_000_000):
+            paginator = EstimatedCountPaginator(Movie.objects.order_by('pk'), 100)
+            with self.assertNumQueries(0):
+                self.assertEqual(paginator.count, 2_000_000)
+
+        with mock.patch('apps.core.paginator.estimated_count', return_value=10):
+            self.assertEqual(EstimatedCountPaginator(Movie.objects.order_by('pk'), 100).count, 3)
+
+    def test_admin_changelist(self):
+        """Test admin changelists page with the estimating paginator."""
+        admin = User.objects.create_superuser(email="root@example.com", name="Root", password="password")
+        client = Client()
+        client.force_login(admin)
+        response = client.get(reverse('admin:movies_movie_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.context['cl'].paginator, EstimatedCountPaginator)
+        self.assertIsNone(response.context['cl'].full_result_count)
+
+
+class MetricsTest(TestCase):
+    def test_counter_sums_thread_shards(self):
+        """Test increments from many threads are all counted."""
+        counter = Counter('test_events', "Test events.", ['kind'])
+
+        def work():
+            for _ in range(1000):
+                counter.inc(kind='a')
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc(2, kind='b')
+        self.assertEqual(list(counter.samples()), [
+            ('myfilmsay_test_events_total', {'kind': 'a'}, 8000),
+            ('myfilmsay_test_events_total', {'kind': 'b'}, 2),
+        ])
+
+    @override_settings(DEBUG=True)
+    def test_endpoint_reports_votes(self):
+        """Test votes show up on /metrics in the text exposition format."""
+        user = User.objects.create_user(email="user@example.com", name="User", password="password")
+        movie = Movie.objects.create(title="Metrics Movie", date="2023", body="Description")
+        comment = Comment.objects.create(text="Comment", author=user, movie=movie, user_rating=7)
+        before = REGISTRY.render()
+        self.client.login(email="user@example.com", password="password")
+        self.client.post(reverse('movies:vote'), {'comment_id': comment.id, 'vote_type': 'like'},
+                         content_type='application/json')
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('# TYPE myfilmsay_votes_total counter', response.content.decode())
+        self.assertNotEqual(before, response.content.decode())
+
+    def test_hidden_without_token_outside_debug(self):
+        """Test the endpoint does not exist in production until a token is configured."""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_required_when_configured(self):
+        """Test the endpoint rejects scrapes without the configured token."""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+
+class BenchmarkViewsTest(TestCase):
+    def test_baseline_then_regression(self):
+        """Test a first run records a baseline and a later query count increase fails."""
+        call_command('seed_benchmark_data', movies=20, comments=60, votes=120, users=10, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = Path(directory) / 'views.json'
+            options = {'iterations': 2, 'baseline': str(baseline), 'only': ['movies:detail', 'users:avatar'],
+                       'stdout': StringIO()}
+            call_command('benchmark_views', **options)
+            recorded = json.loads(baseline.read_text())
+            self.assertEqual(recorded['views']['movies:detail']['status'], 200)
+
+            recorded['views']['movies:detail']['queries'] -= 1
+            baseline.write_text(json.dumps(recorded))
+            with self.assertRaisesMessage(CommandError, 'movies:detail'):
+                call_command('benchmark_views', **options)
+
+    def test_seeded_hot_scores_match_trending_scale(self):
+        """Test seeded hot scores sit on the trending log scale, within two windows of now."""
+        call_command('seed_benchmark_data', movies=50, comments=100, votes=0, users=5, stdout=StringIO())
+        lowest = trending.event_score(1.0, timezone.now() - 2 * trending.TRENDING_WINDOW)
+        highest = trending.event_score(20.0)
+        scores = [score for model in (Movie, Comment) for score in model.objects.values_list('hot_score', flat=True)
+                  if score]
+        self.assertTrue(scores)
+        for score in scores:
+            self.assertTrue(lowest <= score <= highest, score)
+
+
+class LoadgenTest(LiveServerTestCase):
+    def test_browse_comment_and_vote_scenarios(self):
+        """Test the load generator logs in, posts with CSRF tokens and reports no errors."""
+        user = User.objects.create_user(email="load@example.com", name="Load", password="password")
+        movie = Movie.objects.create(title="Load Movie", date="2023", body="Description")
+        comment = Comment.objects.create(text="Comment", author=user, movie=movie, user_rating=7)
+        targets = Targets([(movie.id, movie.slug)], {movie.id: [comment.id]}, [user.email], None, "password")
+
+        stats = Stats()
+
+        async def scenarios():
+            user = VirtualUser(0, self.live_server_url, targets, stats, random.Random(0), vote_burst=3, think=0)
+            await user.browse()
+            await user.comment()
+            await user.vote()
+            await user.close()
+
+        asyncio.run(scenarios())
+        self.assertEqual(dict(stats.errors), {})
+        self.assertEqual(len(stats.latencies["POST movies:vote"]), 3)
+        self.assertEqual(Comment.objects.filter(movie=movie).count(), 2)
+        self.assertIn("TOTAL", stats.report())
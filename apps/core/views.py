@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.http import HttpResponse, Http404
+from django.utils.crypto import constant_time_compare
+from django.views import View
+from .metrics import REGISTRY
+
+
+# Metrics of this process in the Prometheus text exposition format, behind a bearer token when METRICS_TOKEN is set.
+# Without a token it only exists in DEBUG.
+class MetricsView(View):
+    def get(self, request):
+        if not settings.METRICS_TOKEN and not settings.DEBUG:
+            raise Http404
+        if settings.METRICS_TOKEN:
+            expected = f"Bearer {settings.METRICS_TOKEN}"
+            if not constant_time_compare(request.headers.get('Authorization', ''), expected):
+                return HttpResponse(status=401)
+        response = HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+        response['Cache-Control'] = 'no-store'
+        return response
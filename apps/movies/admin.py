@@ -1,27 +1,93 @@
 from django.contrib import admin
 from django.contrib import admin
-from .models import Movie, Comment, Vote
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from apps.core.admin_filters import AutocompleteFilter, AutocompleteFilterMixin, DecadeFilter
+from apps.core.paginator import EstimatedCountPaginator
+from .models import Movie, Comment, Vote, Genre, Person
+
+
+# Likes and dislikes recounted from Vote rows, for a single UPDATE over many comments
+def vote_count(vote_type):
+    votes = Vote.objects.filter(comment=OuterRef('pk'), vote_type=vote_type).order_by().values('comment')
+    return Coalesce(Subquery(votes.annotate(total=Count('pk')).values('total')), 0)
+
 
 # Register your models here.
 @admin.register(Movie)
-class MovieAdmin(admin.ModelAdmin):
+class MovieAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['title', 'date', 'rating', 'director']
-    list_filter = ['date', 'genres']
+    list_filter = [DecadeFilter, ('genre_tags', AutocompleteFilter)]
     search_fields = ['title', 'director', 'writers']
+    ordering = ['title']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['reset_hot_score']
+
+    @admin.action(description="Reset trending score of selected movies")
+    def reset_hot_score(self, request, queryset):
+        updated = queryset.update(hot_score=0.0)
+        self.message_user(request, f"Reset the trending score of {updated} movies.")
+
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug']
+    search_fields = ['name']
+
+
+@admin.register(Person)
+class PersonAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug']
+    search_fields = ['name']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['author', 'movie', 'text_preview', 'timestamp', 'likes_count', 'dislikes_count']
-    list_filter = ['timestamp', 'movie']
+    list_filter = ['timestamp', ('movie', AutocompleteFilter), ('author', AutocompleteFilter)]
+    list_select_related = ['author', 'movie']
     search_fields = ['text', 'author__name']
     raw_id_fields = ['author', 'movie', 'parent']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['delete_comments', 'reset_votes']
 
     def text_preview(self, obj):
         return obj.text[:50]
 
+    # Replies and votes go with the comments, without the per-object confirmation page and log entries
+    @admin.action(description="Delete selected comments with their replies and votes", permissions=['delete'])
+    def delete_comments(self, request, queryset):
+        deleted = queryset.delete()[1].get(Comment._meta.label, 0)
+        self.message_user(request, f"Deleted {deleted} comments.")
+
+    @admin.action(description="Remove all votes from selected comments", permissions=['change'])
+    def reset_votes(self, request, queryset):
+        Vote.objects.filter(comment__in=queryset).delete()
+        updated = queryset.update(likes_count=0, dislikes_count=0, hot_score=0.0)
+        self.message_user(request, f"Removed the votes of {updated} comments.")
+
 
 @admin.register(Vote)
-class VoteAdmin(admin.ModelAdmin):
+class VoteAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['user', 'comment', 'vote_type', 'created_at']
-    list_filter = ['vote_type', 'created_at']
\ No newline at end of file
+    list_filter = ['vote_type', 'created_at', ('user', AutocompleteFilter)]
+    list_select_related = ['user', 'comment__author', 'comment__movie']
+    autocomplete_fields = ['user']
+    raw_id_fields = ['comment']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['delete_votes']
+
+    # Deletes in one statement and recounts the affected comments in another, instead of a save per vote
+    @admin.action(description="Delete selected votes and update comment counts", permissions=['delete'])
+    def delete_votes(self, request, queryset):
+        comment_ids = list(queryset.order_by().values_list('comment_id', flat=True).distinct())
+        deleted, _ = queryset.delete()
+        Comment.objects.filter(pk__in=comment_ids).update(
+            likes_count=vote_count('like'), dislikes_count=vote_count('dislike')
+        )
+        self.message_user(request, f"Deleted {deleted} votes.")
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class MoviesConfig(AppConfig):
     name = 'apps.movies'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,128 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from apps.core import metrics
+from .models import Movie
+
+CACHE_REQUESTS = metrics.counter('cache_requests', "Cache lookups by cache and result.", ['cache', 'result'])
+
+
+# Bounded in-process LRU with a per-entry TTL, shared by the threads of one worker
+class LocalLRU:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+LOCAL = LocalLRU(settings.MOVIE_CACHE_LOCAL_SIZE, settings.MOVIE_CACHE_LOCAL_TTL)
+
+
+def version_key(movie_id):
+    return f"movie-version:{movie_id}"
+
+
+def movie_key(movie_id, version):
+    return f"movie:{movie_id}:{version}"
+
+
+def slug_key(slug):
+    return f"movie-slug:{slug}"
+
+
+# Version of a movie's cached row, shared by all workers. A missing counter starts at the current time, so a
+# counter evicted from the shared cache never comes back at an old version with a stale row behind it.
+def get_version(movie_id):
+    version = cache.get(version_key(movie_id))
+    if version is None:
+        cache.add(version_key(movie_id), time.time_ns(), None)
+        version = cache.get(version_key(movie_id))
+    return version
+
+
+# Every worker sees the new version on its next lookup and misses both tiers for the old row
+def invalidate_movie(movie_id):
+    try:
+        cache.incr(version_key(movie_id))
+    except ValueError:
+        cache.add(version_key(movie_id), time.time_ns(), None)
+    LOCAL.delete(movie_id)
+
+
+# Read-through lookup: in-process LRU, then the shared cache, then the database. Entries are tagged with the
+# version counter, so one shared cache read per lookup keeps every worker coherent. Callers get their own copy.
+def get_movie(movie_id):
+    if not settings.MOVIE_CACHE:
+        return Movie.objects.filter(pk=movie_id).first()
+    version = get_version(movie_id)
+    entry = LOCAL.get(movie_id)
+    if entry is not None and entry[0] == version:
+        CACHE_REQUESTS.inc(cache='movie', result='local')
+        return copy.copy(entry[1])
+
+    movie = cache.get(movie_key(movie_id, version))
+    if movie is not None:
+        CACHE_REQUESTS.inc(cache='movie', result='shared')
+    else:
+        CACHE_REQUESTS.inc(cache='movie', result='miss')
+        movie = Movie.objects.filter(pk=movie_id).first()
+        if movie is None:
+            return None
+        cache.set(movie_key(movie_id, version), movie, settings.MOVIE_CACHE_TIMEOUT)
+    LOCAL.set(movie_id, (version, movie))
+    return copy.copy(movie)
+
+
+def get_movie_by_slug(slug):
+    if not settings.MOVIE_CACHE:
+        return Movie.objects.filter(slug=slug).first()
+    movie_id = cache.get(slug_key(slug))
+    if movie_id is None:
+        movie_id = Movie.objects.filter(slug=slug).values_list('pk', flat=True).first()
+        if movie_id is None:
+            return None
+        cache.set(slug_key(slug), movie_id, settings.MOVIE_CACHE_TIMEOUT)
+    movie = get_movie(movie_id)
+    # The slug may have moved to another movie since it was cached
+    if movie is None or movie.slug != slug:
+        cache.delete(slug_key(slug))
+        movie = Movie.objects.filter(slug=slug).first()
+    return movie
+
+
+def get_movie_or_404(movie_id=None, slug=None):
+    movie = get_movie(movie_id) if slug is None else get_movie_by_slug(slug)
+    if movie is None:
+        raise Http404("No movie found matching the query")
+    return movie
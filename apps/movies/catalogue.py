@@ -0,0 +1,276 @@
+import math
+import threading
+import time
+from array import array
+from itertools import islice
+from django.conf import settings
+from django.core.cache import cache
+from .models import Movie, MovieGenre, MovieCredit
+
+# Sort keys of MovieListView served from memory, with the column each one orders by. Titles compare casefolded,
+# close to the locale collation of PostgreSQL rather than the binary order of SQLite.
+SORT_COLUMNS = {'title': 'titles', 'rating': 'ratings', 'date': 'years'}
+NO_YEAR = -1
+
+CHANGE_COUNTER = "catalogue-changes"
+# Processes further behind than this, or whose log entries expired, reload the whole catalogue
+CHANGE_LOG_LIMIT = 500
+CHANGE_LOG_TIMEOUT = 60 * 60
+
+
+def change_key(number):
+    return f"catalogue-change:{number}"
+
+
+def current_change():
+    number = cache.get(CHANGE_COUNTER)
+    if number is None:
+        cache.add(CHANGE_COUNTER, time.time_ns(), None)
+        number = cache.get(CHANGE_COUNTER)
+    return number
+
+
+# Appends a movie id to the change log shared by all processes. A lost counter restarts at the current time,
+# far ahead of every process, so they all reload instead of missing changes.
+def record_change(movie_id):
+    try:
+        number = cache.incr(CHANGE_COUNTER)
+    except ValueError:
+        cache.add(CHANGE_COUNTER, time.time_ns(), None)
+        number = cache.incr(CHANGE_COUNTER)
+    cache.set(change_key(number), movie_id, CHANGE_LOG_TIMEOUT)
+
+
+# Row bitmap with the given (distinct) rows set
+def bitmap(rows):
+    if len(rows) < 64:
+        return sum(1 << row for row in rows)
+    flags = bytearray(max(rows) // 8 + 1)
+    for row in rows:
+        flags[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(flags, 'little')
+
+
+# Rows of (id, title, year, rating, genre bitset, director ids) for the given movies, or all of them, with the
+# {id: (slug, name)} of their genres and directors
+def load_rows(movie_ids=None):
+    movies = Movie.objects.order_by()
+    genres = MovieGenre.objects.order_by()
+    directors = MovieCredit.objects.filter(role='director').order_by()
+    if movie_ids is not None:
+        movies = movies.filter(pk__in=movie_ids)
+        genres = genres.filter(movie_id__in=movie_ids)
+        directors = directors.filter(movie_id__in=movie_ids)
+
+    genre_bits, genre_names = {}, {}
+    for movie_id, genre_id, slug, name in genres.values_list('movie_id', 'genre_id', 'genre__slug', 'genre__name'):
+        genre_bits[movie_id] = genre_bits.get(movie_id, 0) | 1 << genre_id
+        genre_names[genre_id] = (slug, name)
+    credits, director_names = {}, {}
+    for movie_id, person_id, slug, name in directors.values_list('movie_id', 'person_id', 'person__slug',
+                                                                 'person__name'):
+        credits.setdefault(movie_id, []).append(person_id)
+        director_names[person_id] = (slug, name)
+    rows = [
+        (pk, title, year, rating, genre_bits.get(pk, 0), tuple(credits.get(pk, ())))
+        for pk, title, year, rating in movies.values_list('pk', 'title', 'year', 'rating')
+    ]
+    return rows, genre_names, director_names
+
+
+# Immutable snapshot of the catalogue: one array or list per column indexed by row, presorted row
+# permutations for every sort key and direction, and row bitmaps (ints, bit n = row n) per year, genre
+# and director so filters are a few big-int ANDs. Refreshes build a new snapshot and swap it in.
+class Catalogue:
+    def __init__(self, rows, genre_names, director_names, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.ids = array('q', (row[0] for row in rows))
+        self.titles = [row[1].casefold() for row in rows]
+        self.years = array('h', (NO_YEAR if row[2] is None else row[2] for row in rows))
+        self.ratings = array('d', (math.nan if row[3] is None else row[3] for row in rows))
+        self.genres = [row[4] for row in rows]
+        self.directors = [row[5] for row in rows]
+        self.all_rows = (1 << len(self.ids)) - 1
+
+        year_rows, genre_rows, director_rows = {}, {}, {}
+        for row in range(len(self.ids)):
+            year_rows.setdefault(self.years[row], []).append(row)
+            genres = self.genres[row]
+            while genres:
+                genre_id = (genres & -genres).bit_length() - 1
+                genre_rows.setdefault(genre_id, []).append(row)
+                genres &= genres - 1
+            for person_id in self.directors[row]:
+                director_rows.setdefault(person_id, []).append(row)
+        self.year_rows = {year: bitmap(rows) for year, rows in year_rows.items()}
+        self.genre_rows = {pk: bitmap(rows) for pk, rows in genre_rows.items()}
+        self.director_rows = {pk: bitmap(rows) for pk, rows in director_rows.items()}
+        self.genre_names = {pk: genre_names[pk] for pk in self.genre_rows}
+        self.director_names = {pk: director_names[pk] for pk in self.director_rows}
+        self.genre_ids = {slug: pk for pk, (slug, _) in self.genre_names.items()}
+        self.director_ids = {slug: pk for pk, (slug, _) in self.director_names.items()}
+
+        # Ties are broken by id, rows without a year or rating go last in both directions
+        self.orders = {}
+        for sort, column in SORT_COLUMNS.items():
+            values = getattr(self, column)
+            missing = [row for row in range(len(values)) if self.is_missing(column, values[row])]
+            present = sorted((row for row in range(len(values)) if not self.is_missing(column, values[row])),
+                             key=lambda row: (values[row], self.ids[row]))
+            if column == 'titles':
+                descending = present[::-1]
+            else:
+                descending = sorted(present, key=lambda row: (-values[row], self.ids[row]))
+            self.orders[sort, 'asc'] = array('l', present + missing)
+            self.orders[sort, 'desc'] = array('l', descending + missing)
+        self.unfiltered_facets = None
+
+    @staticmethod
+    def is_missing(column, value):
+        return (column == 'years' and value == NO_YEAR) or (column == 'ratings' and math.isnan(value))
+
+    def rows(self):
+        return [
+            (self.ids[row], self.titles[row], None if self.years[row] == NO_YEAR else self.years[row],
+             None if math.isnan(self.ratings[row]) else self.ratings[row], self.genres[row], self.directors[row])
+            for row in range(len(self.ids))
+        ]
+
+    # New snapshot with the changed movies reloaded from the database and deleted ones dropped
+    def apply(self, movie_ids, version):
+        fresh, genre_names, director_names = load_rows(movie_ids)
+        rows = [row for row in self.rows() if row[0] not in movie_ids] + fresh
+        return Catalogue(rows, {**self.genre_names, **genre_names}, {**self.director_names, **director_names},
+                         version)
+
+    # Row bitmap of the movies passing the filters, None when nothing is filtered. Unknown slugs match nothing.
+    def mask(self, year_min=None, year_max=None, genre=None, director=None):
+        mask = None
+        if year_min is not None or year_max is not None:
+            low = 0 if year_min is None else year_min
+            high = math.inf if year_max is None else year_max
+            mask = 0
+            for year, rows in self.year_rows.items():
+                if year != NO_YEAR and low <= year <= high:
+                    mask |= rows
+        if genre:
+            rows = self.genre_rows.get(self.genre_ids.get(genre), 0)
+            mask = rows if mask is None else mask & rows
+        if director:
+            rows = self.director_rows.get(self.director_ids.get(director), 0)
+            mask = rows if mask is None else mask & rows
+        return mask
+
+    def query(self, sort, order='asc', **filters):
+        return CatalogueResult(self, self.orders[sort, 'desc' if order == 'desc' else 'asc'], self.mask(**filters))
+
+    # Genre and director counts in the shape of the ORM facet queries of MovieListView
+    def facets(self, mask):
+        if mask is None and self.unfiltered_facets is not None:
+            return self.unfiltered_facets
+        rows = self.all_rows if mask is None else mask
+        genre_facets = [
+            {'genre__slug': slug, 'genre__name': name, 'count': (rows & self.genre_rows[pk]).bit_count()}
+            for pk, (slug, name) in self.genre_names.items()
+        ]
+        director_facets = [
+            {'person__slug': slug, 'person__name': name, 'count': (rows & self.director_rows[pk]).bit_count()}
+            for pk, (slug, name) in self.director_names.items()
+        ]
+        facets = (
+            sorted((facet for facet in genre_facets if facet['count']),
+                   key=lambda facet: (-facet['count'], facet['genre__name'])),
+            sorted((facet for facet in director_facets if facet['count']),
+                   key=lambda facet: (-facet['count'], facet['person__name']))[:10],
+        )
+        if mask is None:
+            self.unfiltered_facets = facets
+        return facets
+
+
+# Lazily loaded, ordered movie list with the slicing and len() a paginator needs. Sorting, filtering and counting
+# run in memory, but the card fields of a page still come from one primary key query per page.
+class CatalogueResult:
+    def __init__(self, catalogue, order, mask):
+        self.catalogue = catalogue
+        self.order = order
+        self.mask = mask
+        # One '0'/'1' per row, lowest row first, for constant time membership tests while walking the order
+        self.flags = None if mask is None else format(mask, f"0{len(catalogue.ids)}b")[::-1]
+
+    def __len__(self):
+        return len(self.order) if self.mask is None else self.mask.bit_count()
+
+    def count(self):
+        return len(self)
+
+    def ids(self, start=0, stop=None):
+        rows = self.order if self.flags is None else (row for row in self.order if self.flags[row] == '1')
+        return [self.catalogue.ids[row] for row in islice(rows, start, stop)]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(self))
+            wanted = max(stop - start, 0)
+            # Movies deleted since the snapshot was built are skipped, the page is filled from the ids after it
+            movies = []
+            while len(movies) < wanted:
+                ids = self.ids(start, start + wanted - len(movies))
+                if not ids:
+                    break
+                start += len(ids)
+                found = Movie.objects.cards().in_bulk(ids)
+                movies.extend(found[pk] for pk in ids if pk in found)
+            return movies
+        movies = self[index:index + 1]
+        if not movies:
+            raise IndexError(index)
+        return movies[0]
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def facets(self):
+        return self.catalogue.facets(self.mask)
+
+
+# Holds this process's snapshot and brings it up to date with the shared change log on each request
+class CatalogueEngine:
+    def __init__(self):
+        self.catalogue = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        version = current_change()
+        catalogue = self.catalogue
+        if catalogue is not None and catalogue.version == version and not self.expired(catalogue):
+            return catalogue
+        with self.lock:
+            catalogue = self.catalogue
+            if catalogue is None or self.expired(catalogue) or not 0 <= version - catalogue.version <= CHANGE_LOG_LIMIT:
+                catalogue = Catalogue(*load_rows(), version)
+            elif version != catalogue.version:
+                keys = [change_key(number) for number in range(catalogue.version + 1, version + 1)]
+                changes = cache.get_many(keys)
+                if len(changes) < len(keys):
+                    catalogue = Catalogue(*load_rows(), version)
+                else:
+                    catalogue = catalogue.apply(set(changes.values()), version)
+            self.catalogue = catalogue
+        return catalogue
+
+    # Bulk updates skip the change log, so snapshots are rebuilt from scratch after MOVIE_CATALOGUE_MAX_AGE
+    @staticmethod
+    def expired(catalogue):
+        return time.monotonic() - catalogue.built_at > settings.MOVIE_CATALOGUE_MAX_AGE
+
+    def clear(self):
+        self.catalogue = None
+
+
+ENGINE = CatalogueEngine()
+
+
+def query(sort, order='asc', **filters):
+    return ENGINE.get().query(sort, order, **filters)
@@ -0,0 +1,43 @@
+import time
+import tracemalloc
+import numpy as np
+from django.core.management.base import BaseCommand
+from apps.movies.recommendations import rating_matrix_from_arrays, factorize_and_rank, FACTORS, TOP_N, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Measure recommendation build time and peak memory on synthetic ratings, without touching the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ratings', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                            help="Number of ratings for each run.")
+        parser.add_argument('--ratings-per-user', type=int, default=20)
+        parser.add_argument('--ratings-per-movie', type=int, default=50)
+        parser.add_argument('--factors', type=int, default=FACTORS)
+        parser.add_argument('--top-n', type=int, default=TOP_N)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        self.stdout.write(f"{'ratings':>10} {'users':>8} {'movies':>8} {'seconds':>9} {'peak MiB':>9}")
+
+        for count in options['ratings']:
+            users = max(2, count // options['ratings_per_user'])
+            movies = max(2, count // options['ratings_per_movie'])
+            rows = rng.integers(0, users, size=count, dtype=np.int32)
+            # Skewed popularity, like a real catalogue
+            cols = np.minimum(rng.zipf(1.3, size=count) - 1, movies - 1).astype(np.int32)
+            values = rng.integers(0, 21, size=count).astype(np.float32) / 2
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            matrix, means = rating_matrix_from_arrays(rows, cols, values, (users, movies))
+            for _ in factorize_and_rank(matrix, means, factors=options['factors'], top_n=options['top_n'],
+                                        batch_size=options['batch_size']):
+                pass
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            self.stdout.write(f"{count:>10} {users:>8} {movies:>8} {elapsed:>9.2f} {peak / 2 ** 20:>9.1f}")
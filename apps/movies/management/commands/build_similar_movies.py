@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.movies.recommendations import rebuild_similar_movies, TOP_K, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed 'similar movies' table used on the movie detail page."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K, help="Neighbours stored per movie.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Movies scored per batch.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stored = rebuild_similar_movies(k=options['top_k'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Stored {stored} similar movie pairs in {elapsed:.2f}s."))
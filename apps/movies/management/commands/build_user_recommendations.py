@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.movies.recommendations import rebuild_user_recommendations, FACTORS, TOP_N, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Rebuild per-user movie recommendations from comment ratings (truncated SVD)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--factors', type=int, default=FACTORS, help="Latent factors kept by the SVD.")
+        parser.add_argument('--top-n', type=int, default=TOP_N, help="Recommendations stored per user.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Users scored per batch.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stored = rebuild_user_recommendations(
+            factors=options['factors'],
+            top_n=options['top_n'],
+            batch_size=options['batch_size']
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Stored {stored} user recommendations in {elapsed:.2f}s."))
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connection
+from apps.movies.models import Movie
+from apps.movies.posters import poster_key, process_poster
+
+
+class Command(BaseCommand):
+    help = "Download TMDb posters once and store thumbnail, card and hero sizes locally in WebP and JPEG."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Reprocess posters that are already up to date.")
+        parser.add_argument('--workers', type=int, default=4, help="Parallel downloads.")
+        parser.add_argument('--limit', type=int, default=None, help="Process at most N movies.")
+
+    def handle(self, *args, **options):
+        movies = [
+            movie for movie in
+            Movie.objects.exclude(img_url__isnull=True).exclude(img_url='').only('id', 'title', 'img_url', 'poster_key')
+            if options['all'] or movie.poster_key != poster_key(movie.img_url)
+        ][:options['limit']]
+
+        processed = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {executor.submit(self.process, movie): movie for movie in movies}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    processed += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"Poster for '{futures[future].title}' failed: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} posters, {failed} failed."))
+
+    @staticmethod
+    def process(movie):
+        try:
+            process_poster(movie)
+        finally:
+            connection.close()
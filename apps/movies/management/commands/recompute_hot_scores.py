@@ -0,0 +1,55 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from apps.movies.models import Movie, Comment, Vote
+from apps.movies import trending
+
+
+class Command(BaseCommand):
+    help = ("Rebuild movie and comment hot scores from recent comments and votes. "
+            "Run periodically to drop withdrawn votes and deleted comments from the scores.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help="Only replay activity from the last N days, older events have decayed away.")
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+        movie_scores = defaultdict(lambda: None)
+        comment_scores = defaultdict(lambda: None)
+
+        def add(scores, key, weight, when):
+            score = trending.event_score(weight, when)
+            scores[key] = score if scores[key] is None else trending.log_add(scores[key], score)
+
+        comments = Comment.objects.filter(timestamp__gte=since).values_list('movie_id', 'parent_id', 'timestamp')
+        for movie_id, parent_id, timestamp in comments.iterator(chunk_size=5000):
+            add(movie_scores, movie_id, trending.REPLY_WEIGHT if parent_id else trending.COMMENT_WEIGHT, timestamp)
+            if parent_id:
+                add(comment_scores, parent_id, trending.REPLY_WEIGHT, timestamp)
+
+        votes = Vote.objects.filter(created_at__gte=since).values_list(
+            'comment_id', 'comment__movie_id', 'vote_type', 'created_at'
+        )
+        for comment_id, movie_id, vote_type, created_at in votes.iterator(chunk_size=5000):
+            add(movie_scores, movie_id, trending.VOTE_WEIGHT, created_at)
+            if vote_type == 'like':
+                add(comment_scores, comment_id, trending.LIKE_WEIGHT, created_at)
+
+        with transaction.atomic():
+            Movie.objects.exclude(hot_score=0.0).update(hot_score=0.0)
+            Comment.objects.exclude(hot_score=0.0).update(hot_score=0.0)
+            Movie.objects.bulk_update(
+                [Movie(id=key, hot_score=score) for key, score in movie_scores.items()],
+                ['hot_score'], batch_size=1000
+            )
+            Comment.objects.bulk_update(
+                [Comment(id=key, hot_score=score) for key, score in comment_scores.items()],
+                ['hot_score'], batch_size=1000
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed hot scores for {len(movie_scores)} movies and {len(comment_scores)} comments."
+        ))
@@ -0,0 +1,96 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q
+from apps.movies.models import Comment, Vote
+
+
+class Command(BaseCommand):
+    help = ("Recount Comment.likes_count and dislikes_count from Vote rows and fix the comments that drifted. "
+            "Works through comment id ranges in parallel, one grouped aggregate and one bulk_update per range.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Comment ids per range.")
+        parser.add_argument('--workers', type=int, default=4, help="Ranges reconciled in parallel.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report the drift.")
+
+    def handle(self, *args, **options):
+        for option in ('chunk_size', 'workers'):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be a positive number.")
+
+        started = time.perf_counter()
+        bounds = Comment.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            self.stdout.write("No comments to reconcile.")
+            return
+
+        size = options['chunk_size']
+        ranges = [(start, start + size) for start in range(bounds['first'], bounds['last'] + 1, size)]
+        # SQLite takes one writer at a time, so ranges only run in parallel on other databases
+        parallel = options['workers'] > 1 and connection.vendor != 'sqlite'
+
+        def reconcile(id_range):
+            return self.reconcile(*id_range, options['dry_run'], close=parallel)
+
+        # A single worker runs in this thread and connection, e.g. inside a test transaction
+        if parallel:
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                results = list(executor.map(reconcile, ranges))
+        else:
+            results = [reconcile(id_range) for id_range in ranges]
+
+        checked = sum(result['checked'] for result in results)
+        drifted = sum(result['drifted'] for result in results)
+        likes = sum(result['likes'] for result in results)
+        dislikes = sum(result['dislikes'] for result in results)
+        largest = max(result['largest'] for result in results)
+        self.stdout.write(
+            f"Checked {checked} comments in {len(ranges)} ranges, {drifted} drifted "
+            f"({checked and drifted / checked:.2%}): likes off by {likes} and dislikes by {dislikes} in total, "
+            f"{largest} at most on one comment."
+        )
+        verb = "Would fix" if options['dry_run'] else "Fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {drifted} comments in {time.perf_counter() - started:.1f}s."
+        ))
+
+    # Locks the range's comments before counting, so a vote saved meanwhile writes its own recount after ours
+    @staticmethod
+    def reconcile(start, end, dry_run, close=False):
+        try:
+            with transaction.atomic():
+                comments = Comment.objects.filter(pk__gte=start, pk__lt=end).order_by()
+                current = {
+                    pk: (likes, dislikes) for pk, likes, dislikes in
+                    comments.select_for_update().values_list('pk', 'likes_count', 'dislikes_count')
+                }
+                counted = {
+                    row['comment_id']: (row['likes'], row['dislikes']) for row in
+                    Vote.objects.filter(comment_id__gte=start, comment_id__lt=end).order_by().values(
+                        'comment_id'
+                    ).annotate(
+                        likes=Count('pk', filter=Q(vote_type='like')),
+                        dislikes=Count('pk', filter=Q(vote_type='dislike')),
+                    )
+                }
+
+                changed = []
+                result = {'checked': len(current), 'drifted': 0, 'likes': 0, 'dislikes': 0, 'largest': 0}
+                for pk, (likes, dislikes) in current.items():
+                    actual_likes, actual_dislikes = counted.get(pk, (0, 0))
+                    if (likes, dislikes) == (actual_likes, actual_dislikes):
+                        continue
+                    changed.append(Comment(pk=pk, likes_count=actual_likes, dislikes_count=actual_dislikes))
+                    result['drifted'] += 1
+                    result['likes'] += abs(actual_likes - likes)
+                    result['dislikes'] += abs(actual_dislikes - dislikes)
+                    result['largest'] = max(result['largest'], abs(actual_likes - likes),
+                                            abs(actual_dislikes - dislikes))
+                if changed and not dry_run:
+                    Comment.objects.bulk_update(changed, ['likes_count', 'dislikes_count'])
+            return result
+        finally:
+            if close:
+                connection.close()
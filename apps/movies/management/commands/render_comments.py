@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from apps.movies.models import Comment
+from apps.movies.rendering import render_comment_html
+
+
+class Command(BaseCommand):
+    help = ("Store sanitised HTML for comments that have none yet, e.g. after the text_html migration. "
+            "Use --all to re-render every comment after changing the allowed tags.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-render comments that already have HTML.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        comments = Comment.objects.order_by('pk')
+        if not options['all']:
+            comments = comments.filter(text_html="")
+
+        rendered, last_pk = 0, 0
+        while True:
+            chunk = list(comments.filter(pk__gt=last_pk).only('pk', 'text')[:options['chunk_size']])
+            if not chunk:
+                break
+            for comment in chunk:
+                comment.text_html = render_comment_html(comment.text)
+            Comment.objects.bulk_update(chunk, ['text_html'])
+            rendered += len(chunk)
+            last_pk = chunk[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} comments."))
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_movie_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarMovie',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Similarity Score')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Rank')),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_entries', to='movies.movie', verbose_name='Movie')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movies.movie', verbose_name='Similar Movie')),
+            ],
+            options={
+                'verbose_name': 'Similar Movie',
+                'verbose_name_plural': 'Similar Movies',
+                'ordering': ['movie', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('movie', 'rank'), name='unique_movie_similar_rank')],
+            },
+        ),
+    ]
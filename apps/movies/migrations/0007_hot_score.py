@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_userrecommendation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='hot_score',
+            field=models.FloatField(default=0.0, editable=False, verbose_name='Hot Score'),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='hot_score',
+            field=models.FloatField(default=0.0, editable=False, verbose_name='Hot Score'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['movie', '-hot_score'], name='movies_comm_movie_i_833e47_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-hot_score'], name='movies_movi_hot_sco_936737_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_hot_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Name')),
+                ('slug', models.SlugField(allow_unicode=True, max_length=100, unique=True, verbose_name='Slug')),
+            ],
+            options={
+                'verbose_name': 'Genre',
+                'verbose_name_plural': 'Genres',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Person',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=250, verbose_name='Name')),
+                ('slug', models.SlugField(allow_unicode=True, max_length=250, unique=True, verbose_name='Slug')),
+            ],
+            options={
+                'verbose_name': 'Person',
+                'verbose_name_plural': 'People',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovieGenre',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movie_genres', to='movies.genre', verbose_name='Genre')),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movie_genres', to='movies.movie', verbose_name='Movie')),
+            ],
+            options={
+                'verbose_name': 'Movie Genre',
+                'verbose_name_plural': 'Movie Genres',
+            },
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='genre_tags',
+            field=models.ManyToManyField(blank=True, related_name='movies', through='movies.MovieGenre', to='movies.genre', verbose_name='Genre Tags'),
+        ),
+        migrations.CreateModel(
+            name='MovieCredit',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('director', 'Director'), ('writer', 'Writer')], max_length=10, verbose_name='Role')),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credits', to='movies.movie', verbose_name='Movie')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credits', to='movies.person', verbose_name='Person')),
+            ],
+            options={
+                'verbose_name': 'Movie Credit',
+                'verbose_name_plural': 'Movie Credits',
+            },
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='people',
+            field=models.ManyToManyField(blank=True, related_name='movies', through='movies.MovieCredit', to='movies.person', verbose_name='People'),
+        ),
+        migrations.AddIndex(
+            model_name='moviegenre',
+            index=models.Index(fields=['genre', 'movie'], name='movies_movi_genre_i_decaf6_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='moviegenre',
+            constraint=models.UniqueConstraint(fields=('movie', 'genre'), name='unique_movie_genre'),
+        ),
+        migrations.AddIndex(
+            model_name='moviecredit',
+            index=models.Index(fields=['person', 'role', 'movie'], name='movies_movi_person__b65c21_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='moviecredit',
+            constraint=models.UniqueConstraint(fields=('movie', 'person', 'role'), name='unique_movie_person_role'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+import hashlib
+from django.db import migrations
+from django.utils.text import slugify
+
+
+def name_slug(name):
+    return slugify(name, allow_unicode=True) or hashlib.md5(name.encode()).hexdigest()[:12]
+
+
+def parse_names(value):
+    names = {}
+    for name in (value or "").split(","):
+        name = name.strip()
+        if name:
+            names.setdefault(name_slug(name), name)
+    return names
+
+
+def populate(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    Genre = apps.get_model('movies', 'Genre')
+    Person = apps.get_model('movies', 'Person')
+    MovieGenre = apps.get_model('movies', 'MovieGenre')
+    MovieCredit = apps.get_model('movies', 'MovieCredit')
+
+    movies = list(Movie.objects.values_list('id', 'genres', 'director', 'writers'))
+    genre_names, person_names = {}, {}
+    for _, genres, director, writers in movies:
+        genre_names.update({k: v for k, v in parse_names(genres).items() if k not in genre_names})
+        for value in (director, writers):
+            person_names.update({k: v for k, v in parse_names(value).items() if k not in person_names})
+
+    Genre.objects.bulk_create([Genre(name=name, slug=slug) for slug, name in genre_names.items()],
+                              batch_size=1000, ignore_conflicts=True)
+    Person.objects.bulk_create([Person(name=name, slug=slug) for slug, name in person_names.items()],
+                               batch_size=1000, ignore_conflicts=True)
+    genre_ids = dict(Genre.objects.values_list('slug', 'id'))
+    person_ids = dict(Person.objects.values_list('slug', 'id'))
+
+    movie_genres, credits = [], []
+    for movie_id, genres, director, writers in movies:
+        movie_genres.extend(MovieGenre(movie_id=movie_id, genre_id=genre_ids[slug]) for slug in parse_names(genres))
+        credits.extend(MovieCredit(movie_id=movie_id, person_id=person_ids[slug], role='director')
+                       for slug in parse_names(director))
+        credits.extend(MovieCredit(movie_id=movie_id, person_id=person_ids[slug], role='writer')
+                       for slug in parse_names(writers))
+
+    MovieGenre.objects.bulk_create(movie_genres, batch_size=1000, ignore_conflicts=True)
+    MovieCredit.objects.bulk_create(credits, batch_size=1000, ignore_conflicts=True)
+
+
+def clear(apps, schema_editor):
+    apps.get_model('movies', 'MovieGenre').objects.all().delete()
+    apps.get_model('movies', 'MovieCredit').objects.all().delete()
+    apps.get_model('movies', 'Genre').objects.all().delete()
+    apps.get_model('movies', 'Person').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_genre_person'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate, clear),
+    ]
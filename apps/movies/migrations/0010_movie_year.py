@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:08
+
+import re
+from django.db import migrations, models
+
+
+def backfill_year(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    year_re = re.compile(r"\b(\d{4})\b")
+    movies = []
+    for movie in Movie.objects.only('id', 'date').iterator(chunk_size=2000):
+        match = year_re.search(movie.date or "")
+        if match:
+            movie.year = int(match.group(1))
+            movies.append(movie)
+    Movie.objects.bulk_update(movies, ['year'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_populate_genres_people'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='year',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='Release Year'),
+        ),
+        migrations.RunPython(backfill_year, migrations.RunPython.noop),
+    ]
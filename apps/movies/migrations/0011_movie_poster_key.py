@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0010_movie_year'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='poster_key',
+            field=models.CharField(blank=True, editable=False, max_length=16, verbose_name='Local Poster Key'),
+        ),
+    ]
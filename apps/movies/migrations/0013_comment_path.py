@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Parents are resolved before their replies, walking up for the rare reply with a lower id than its parent
+def backfill_path(apps, schema_editor):
+    Comment = apps.get_model('movies', 'Comment')
+    parents = dict(Comment.objects.values_list('id', 'parent_id'))
+    paths = {}
+    for comment_id in sorted(parents):
+        chain = [comment_id]
+        while parents[chain[-1]] is not None and parents[chain[-1]] not in paths:
+            chain.append(parents[chain[-1]])
+        for pk in reversed(chain):
+            parent_path = paths.get(parents[pk])
+            segment = f"{pk:010d}"
+            paths[pk] = f"{parent_path}/{segment}" if parent_path else segment
+
+    batch = []
+    for pk, path in paths.items():
+        batch.append(Comment(id=pk, path=path))
+        if len(batch) == 1000:
+            Comment.objects.bulk_update(batch, ['path'])
+            batch = []
+    Comment.objects.bulk_update(batch, ['path'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0012_comment_text_html'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Thread Path'),
+        ),
+        migrations.RunPython(backfill_path, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['movie', 'path'], name='movies_comm_movie_i_b91b61_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['path'], name='comment_path_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-19 02:06
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+
+def backfill_teaser(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    movies = []
+    for movie in Movie.objects.only('id', 'body').iterator(chunk_size=2000):
+        movie.teaser = Truncator(strip_tags(movie.body or "")).chars(250).strip()
+        movies.append(movie)
+    Movie.objects.bulk_update(movies, ['teaser'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0013_comment_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='teaser',
+            field=models.CharField(blank=True, editable=False, max_length=250, verbose_name='Teaser'),
+        ),
+        migrations.RunPython(backfill_teaser, migrations.RunPython.noop),
+    ]
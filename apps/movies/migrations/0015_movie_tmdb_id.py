@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0014_movie_teaser'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='tmdb_id',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, unique=True, verbose_name='TMDb ID'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 03:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0015_movie_tmdb_id'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='movies_comm_movie_i_833e47_idx',
+        ),
+    ]
@@ -1,37 +1,174 @@
-from django.db import models
+import re
+from django.db import models, router, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.utils.text import slugify
+from django.utils.html import strip_tags
+from django.utils.text import Truncator, slugify
+from .rendering import render_comment_html
+
+
+YEAR_RE = re.compile(r"\b(\d{4})\b")
+# Comment.path segments are zero padded ids, so paths sort like the thread in any collation
+PATH_DIGITS = 10
+PATH_SEPARATOR = "/"
+# 20 levels keep the deepest path well inside the 255 character column
+COMMENT_MAX_DEPTH = 20
+TEASER_LENGTH = 250
+# Everything listing pages show for a movie card, see MovieQuerySet.cards()
+CARD_FIELDS = ('id', 'title', 'slug', 'date', 'year', 'rating', 'genres', 'img_url', 'poster_key', 'teaser')
+
+
+# First four digit year found in a release date string ("1999", "1999-03-31")
+def parse_year(value):
+    match = YEAR_RE.search(value or "")
+    return int(match.group(1)) if match else None
+
+
+# Plain text start of the description, the body may contain markup
+def make_teaser(body):
+    return Truncator(strip_tags(body or "")).chars(TEASER_LENGTH).strip()
+
+
+class Genre(models.Model):
+    name = models.CharField(max_length=100, verbose_name="Name")
+    slug = models.SlugField(max_length=100, unique=True, allow_unicode=True, verbose_name="Slug")
+
+    class Meta:
+        verbose_name = "Genre"
+        verbose_name_plural = "Genres"
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class Person(models.Model):
+    name = models.CharField(max_length=250, verbose_name="Name")
+    slug = models.SlugField(max_length=250, unique=True, allow_unicode=True, verbose_name="Slug")
+
+    class Meta:
+        verbose_name = "Person"
+        verbose_name_plural = "People"
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+# CARD_FIELDS of a related movie, for select_related(relation).only(...)
+def related_card_fields(relation):
+    return (relation, *(f"{relation}__{field}" for field in CARD_FIELDS))
+
+
+class MovieQuerySet(models.QuerySet):
+    # Narrow rows for listings: no description, writers or other unbounded text. Pass extra fields a page needs.
+    def cards(self, *fields):
+        return self.only(*CARD_FIELDS, *fields)
 
 
 class Movie(models.Model):
     title = models.CharField(max_length=250, unique=True, verbose_name="Movie Title")
     date = models.CharField(max_length=10, verbose_name="Release Date")
+    year = models.PositiveSmallIntegerField(blank=True, null=True, editable=False, db_index=True,
+                                            verbose_name="Release Year")
     body = models.TextField(verbose_name="Description")
+    teaser = models.CharField(max_length=TEASER_LENGTH, blank=True, editable=False, verbose_name="Teaser")
     img_url = models.URLField(max_length=500, blank=True, null=True, verbose_name="Image URL")
+    poster_key = models.CharField(max_length=16, blank=True, editable=False, verbose_name="Local Poster Key")
     rating = models.FloatField(blank=True, null=True, verbose_name="Average Rating",validators=[MinValueValidator(0.0),
                                                                                                 MaxValueValidator(10.0)])
     director = models.CharField(max_length=250, blank=True, null=True, verbose_name="Director")
     writers = models.TextField(blank=True, null=True, verbose_name="Writers")
     genres = models.CharField(max_length=250, blank=True, null=True, verbose_name="Genres")
     slug = models.SlugField(unique=True, blank=True, verbose_name="Slug")
+    hot_score = models.FloatField(default=0.0, editable=False, verbose_name="Hot Score")
+    tmdb_id = models.PositiveIntegerField(unique=True, blank=True, null=True, editable=False, verbose_name="TMDb ID")
+    genre_tags = models.ManyToManyField(Genre, through='MovieGenre', related_name="movies", blank=True,
+                                        verbose_name="Genre Tags")
+    people = models.ManyToManyField(Person, through='MovieCredit', related_name="movies", blank=True,
+                                    verbose_name="People")
+
+    objects = MovieQuerySet.as_manager()
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        # Derived columns only follow their source, so saving a card projection does not load the body
+        update_fields = kwargs.get('update_fields')
+        derived = set()
+        if update_fields is None or 'date' in update_fields:
+            self.year = parse_year(self.date)
+            derived.add('year')
+        if update_fields is None or 'body' in update_fields:
+            self.teaser = make_teaser(self.body)
+            derived.add('teaser')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *derived}
         super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = "Movie"
         verbose_name_plural = "Movies"
+        indexes = [
+            models.Index(fields=['-hot_score']),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class MovieGenre(models.Model):
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="movie_genres", verbose_name="Movie")
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name="movie_genres", verbose_name="Genre")
+
+    class Meta:
+        verbose_name = "Movie Genre"
+        verbose_name_plural = "Movie Genres"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['movie', 'genre'],
+                name='unique_movie_genre'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['genre', 'movie']),
+        ]
+
+    def __str__(self):
+        return f"{self.movie_id} - {self.genre_id}"
+
+
+class MovieCredit(models.Model):
+    ROLE_CHOICES = [
+        ("director", "Director"),
+        ("writer", "Writer"),
+    ]
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="credits", verbose_name="Movie")
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="credits", verbose_name="Person")
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES, verbose_name="Role")
+
+    class Meta:
+        verbose_name = "Movie Credit"
+        verbose_name_plural = "Movie Credits"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['movie', 'person', 'role'],
+                name='unique_movie_person_role'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['person', 'role', 'movie']),
+        ]
+
+    def __str__(self):
+        return f"{self.person_id} ({self.role}) on {self.movie_id}"
+
+
 class Comment(models.Model):
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="comments", verbose_name="Movie")
     author = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name="comments", verbose_name="Author")
     text = models.TextField(verbose_name="Comment Text")
+    text_html = models.TextField(blank=True, editable=False, verbose_name="Rendered Text")
     user_rating = models.FloatField(blank=True, null=True, verbose_name="User Rating", validators=[MinValueValidator(0.0),
                                                                                                    MaxValueValidator(10.0)])
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name="replies",
@@ -40,6 +177,32 @@ class Comment(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At")
     likes_count = models.IntegerField(default=0, verbose_name="Likes Count")
     dislikes_count = models.IntegerField(default=0, verbose_name="Dislikes Count")
+    hot_score = models.FloatField(default=0.0, editable=False, verbose_name="Hot Score")
+    # Ancestor ids down to this comment, e.g. "0000000012/0000000040", a subtree is one prefix range
+    path = models.CharField(max_length=255, blank=True, editable=False, verbose_name="Thread Path")
+
+    # Sanitise and render once on write, templates output text_html as is.
+    # The path needs the new id, so it is written right after the insert, in the same transaction.
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            self.text_html = render_comment_html(self.text)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'text_html'}
+        if self._state.adding and self.parent_id and self.parent.depth >= COMMENT_MAX_DEPTH:
+            self.parent = self.parent.parent
+        using = kwargs.get('using') or router.db_for_write(Comment, instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if not self.path:
+                path = self.build_path(self.pk, self.parent.path if self.parent_id else "")
+                Comment.objects.using(using).filter(pk=self.pk).update(path=path)
+                self.path = path
+
+    @staticmethod
+    def build_path(pk, parent_path=""):
+        segment = f"{pk:0{PATH_DIGITS}d}"
+        return f"{parent_path}{PATH_SEPARATOR}{segment}" if parent_path else segment
 
     class Meta:
         verbose_name = "Comment"
@@ -48,6 +211,9 @@ class Comment(models.Model):
         indexes = [
             models.Index(fields=['movie', 'timestamp']),
             models.Index(fields=['author']),
+            models.Index(fields=['movie', 'path']),
+            # LIKE 'prefix%' can only use a PostgreSQL index with pattern ops, other databases ignore opclasses
+            models.Index(fields=['path'], name='comment_path_prefix_idx', opclasses=['varchar_pattern_ops']),
         ]
 
     def __str__(self):
@@ -57,6 +223,14 @@ class Comment(models.Model):
     def is_reply(self):
         return self.parent is not None
 
+    @property
+    def depth(self):
+        return self.path.count(PATH_SEPARATOR)
+
+    # All replies below this comment at any depth, in thread order
+    def subtree(self):
+        return Comment.objects.filter(path__startswith=self.path + PATH_SEPARATOR).order_by('path')
+
 
 class Vote(models.Model):
     VOTE_CHOICES = [
@@ -83,4 +257,45 @@ class Vote(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.user.email} voted {self.vote_type} on comment {self.comment.id}"
\ No newline at end of file
+        return f"{self.user.email} voted {self.vote_type} on comment {self.comment_id}"
+
+class SimilarMovie(models.Model):
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="similar_entries", verbose_name="Movie")
+    similar = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="+", verbose_name="Similar Movie")
+    score = models.FloatField(verbose_name="Similarity Score")
+    rank = models.PositiveSmallIntegerField(verbose_name="Rank")
+
+    class Meta:
+        verbose_name = "Similar Movie"
+        verbose_name_plural = "Similar Movies"
+        ordering = ['movie', 'rank']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['movie', 'rank'],
+                name='unique_movie_similar_rank'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.similar_id} similar to {self.movie_id} ({self.score:.3f})"
+
+
+class UserRecommendation(models.Model):
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name="recommendations", verbose_name="User")
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="+", verbose_name="Movie")
+    score = models.FloatField(verbose_name="Predicted Rating")
+    rank = models.PositiveSmallIntegerField(verbose_name="Rank")
+
+    class Meta:
+        verbose_name = "User Recommendation"
+        verbose_name_plural = "User Recommendations"
+        ordering = ['user', 'rank']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'rank'],
+                name='unique_user_recommendation_rank'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Movie {self.movie_id} for user {self.user_id} ({self.score:.2f})"
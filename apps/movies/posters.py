@@ -0,0 +1,88 @@
+import hashlib
+import io
+import re
+import requests
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.urls import reverse
+from .cache import invalidate_movie
+
+# Width in pixels of every generated size, posters are never upscaled
+POSTER_SIZES = {
+    'thumb': 154,
+    'card': 342,
+    'hero': 780,
+}
+POSTER_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+CONTENT_TYPES = {
+    'webp': 'image/webp',
+    'jpg': 'image/jpeg',
+}
+DOWNLOAD_TIMEOUT = 10
+POSTER_FILENAME_RE = re.compile(
+    rf"(?P<key>[0-9a-f]{{16}})-(?P<size>{'|'.join(POSTER_SIZES)})\.(?P<fmt>{'|'.join(POSTER_FORMATS)})"
+)
+
+
+def poster_key(img_url):
+    return hashlib.sha1(img_url.encode()).hexdigest()[:16] if img_url else ""
+
+
+def poster_name(movie_id, key, size, fmt):
+    return f"posters/{movie_id}/{key}-{size}.{fmt}"
+
+
+# Local URL for a generated size, or None while the poster has not been processed yet
+def local_poster_url(movie, size='card', fmt='jpg'):
+    if not movie.poster_key or movie.poster_key != poster_key(movie.img_url):
+        return None
+    return reverse('movies:poster', kwargs={'movie_id': movie.id, 'filename': f"{movie.poster_key}-{size}.{fmt}"})
+
+
+def poster_srcset(movie, fmt='jpg'):
+    urls = [(local_poster_url(movie, size, fmt), width) for size, width in POSTER_SIZES.items()]
+    return ", ".join(f"{url} {width}w" for url, width in urls if url)
+
+
+def render_sizes(image):
+    image = image.convert('RGB')
+    for size, width in POSTER_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((width, width * 3), Image.LANCZOS)
+        for fmt, (pillow_format, options) in POSTER_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pillow_format, **options)
+            yield size, fmt, buffer.getvalue()
+
+
+# Download the remote poster once and store every size/format, returns the new key
+def process_poster(movie, session=requests):
+    key = poster_key(movie.img_url)
+    if not key:
+        return ""
+
+    response = session.get(movie.img_url, timeout=DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
+    with Image.open(io.BytesIO(response.content)) as image:
+        for size, fmt, data in render_sizes(image):
+            name = poster_name(movie.id, key, size, fmt)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(data))
+
+    # Sizes of a previous poster are no longer referenced by any URL
+    _, files = default_storage.listdir(f"posters/{movie.id}")
+    for filename in files:
+        if not filename.startswith(f"{key}-"):
+            default_storage.delete(f"posters/{movie.id}/{filename}")
+
+    type(movie).objects.filter(pk=movie.pk).update(poster_key=key)
+    # update() sends no post_save, so cached copies are invalidated here
+    transaction.on_commit(lambda: invalidate_movie(movie.pk))
+    movie.poster_key = key
+    return key
@@ -0,0 +1,220 @@
+import re
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import svds
+from django.db import transaction
+from django.db.models import Avg
+from .models import Movie, Comment, SimilarMovie, UserRecommendation
+
+TOP_K = 6
+BATCH_SIZE = 512
+TOP_N = 10
+FACTORS = 20
+
+# Relative weight of every feature block in the combined movie vector
+FEATURE_WEIGHTS = {
+    'genre': 1.0,
+    'director': 0.8,
+    'writer': 0.5,
+    'body': 1.0,
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]{3,}")
+STOP_WORDS = frozenset("""
+    the and for with that this from his her their they them who whom into after before when while
+    about over under one two three but not are was were has have had its it's will can out all
+    off him she you your our more most than then also just only very been being what which where
+""".split())
+
+
+def split_names(value):
+    return [name.strip().lower() for name in (value or "").split(",") if name.strip()]
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall((text or "").lower()) if token not in STOP_WORDS]
+
+
+def _normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+def _one_hot_block(rows, prefix_values):
+    vocabulary = {}
+    row_ids, col_ids = [], []
+    for row, values in enumerate(prefix_values):
+        for value in set(values):
+            row_ids.append(row)
+            col_ids.append(vocabulary.setdefault(value, len(vocabulary)))
+    data = np.ones(len(row_ids), dtype=np.float32)
+    return sparse.csr_matrix((data, (row_ids, col_ids)), shape=(rows, max(len(vocabulary), 1)))
+
+
+def _tfidf_block(rows, documents):
+    vocabulary = {}
+    row_ids, col_ids, counts = [], [], []
+    for row, tokens in enumerate(documents):
+        term_counts = {}
+        for token in tokens:
+            column = vocabulary.setdefault(token, len(vocabulary))
+            term_counts[column] = term_counts.get(column, 0) + 1
+        row_ids.extend([row] * len(term_counts))
+        col_ids.extend(term_counts.keys())
+        counts.extend(term_counts.values())
+
+    shape = (rows, max(len(vocabulary), 1))
+    tf = sparse.csr_matrix((np.asarray(counts, dtype=np.float32), (row_ids, col_ids)), shape=shape)
+    tf.data = 1.0 + np.log(tf.data)
+    document_frequency = np.bincount(tf.indices, minlength=shape[1])
+    idf = np.log((1.0 + rows) / (1.0 + document_frequency)) + 1.0
+    # Terms found in a single description cannot link two movies, drop them
+    idf[document_frequency < 2] = 0.0
+    tf = tf @ sparse.diags(idf.astype(np.float32))
+    tf.eliminate_zeros()
+    return tf
+
+
+# Sparse matrix with one L2-normalised row per movie: genres, people and TF-IDF over the description
+def build_feature_matrix(rows):
+    count = len(rows)
+    blocks = [
+        (_one_hot_block(count, [split_names(row['genres']) for row in rows]), FEATURE_WEIGHTS['genre']),
+        (_one_hot_block(count, [split_names(row['director']) for row in rows]), FEATURE_WEIGHTS['director']),
+        (_one_hot_block(count, [split_names(row['writers']) for row in rows]), FEATURE_WEIGHTS['writer']),
+        (_tfidf_block(count, [tokenize(row['body']) for row in rows]), FEATURE_WEIGHTS['body']),
+    ]
+    matrix = sparse.hstack([_normalize_rows(block) * weight for block, weight in blocks], format='csr')
+    return _normalize_rows(matrix).tocsr().astype(np.float32)
+
+
+# Top-k cosine neighbours, scored batch by batch so memory stays at batch_size x movies
+def top_k_neighbours(matrix, k=TOP_K, batch_size=BATCH_SIZE):
+    count = matrix.shape[0]
+    k = min(k, count - 1)
+    if k <= 0:
+        return
+    transposed = matrix.T.tocsc()
+    for start in range(0, count, batch_size):
+        stop = min(start + batch_size, count)
+        scores = (matrix[start:stop] @ transposed).toarray()
+        scores[np.arange(stop - start), np.arange(start, stop)] = -1.0
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        for offset in range(stop - start):
+            yield start + offset, candidates[offset], candidate_scores[offset]
+
+
+# Recompute the whole similar-movies table, returns the number of stored pairs
+def rebuild_similar_movies(k=TOP_K, batch_size=BATCH_SIZE):
+    rows = list(Movie.objects.order_by('id').values('id', 'genres', 'director', 'writers', 'body'))
+    ids = [row['id'] for row in rows]
+    entries = []
+
+    if len(rows) > 1:
+        matrix = build_feature_matrix(rows)
+        for row, neighbours, scores in top_k_neighbours(matrix, k=k, batch_size=batch_size):
+            rank = 0
+            for neighbour, score in zip(neighbours, scores):
+                if score <= 0:
+                    break
+                rank += 1
+                entries.append(SimilarMovie(
+                    movie_id=ids[row],
+                    similar_id=ids[neighbour],
+                    score=float(score),
+                    rank=rank
+                ))
+
+    with transaction.atomic():
+        SimilarMovie.objects.all().delete()
+        SimilarMovie.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+# User x movie matrix of top-level comment ratings, centred on each user's mean rating
+def build_rating_matrix(user_ids, movie_ids, ratings):
+    user_index = {user_id: index for index, user_id in enumerate(user_ids)}
+    movie_index = {movie_id: index for index, movie_id in enumerate(movie_ids)}
+    rows = np.fromiter((user_index[user_id] for user_id, _, _ in ratings), dtype=np.int32, count=len(ratings))
+    cols = np.fromiter((movie_index[movie_id] for _, movie_id, _ in ratings), dtype=np.int32, count=len(ratings))
+    values = np.fromiter((rating for _, _, rating in ratings), dtype=np.float32, count=len(ratings))
+    return rating_matrix_from_arrays(rows, cols, values, (len(user_ids), len(movie_ids)))
+
+
+def rating_matrix_from_arrays(rows, cols, values, shape):
+    matrix = sparse.csr_matrix((values, (rows, cols)), shape=shape, dtype=np.float32)
+    rated = np.diff(matrix.indptr)
+    means = np.divide(np.asarray(matrix.sum(axis=1)).ravel(), rated, out=np.zeros(shape[0], dtype=np.float32),
+                      where=rated > 0).astype(np.float32)
+    # Keep centred values that land on exactly zero, they still mark the movie as rated
+    matrix.data = matrix.data - np.repeat(means, rated)
+    matrix.data[matrix.data == 0] = np.float32(1e-6)
+    return matrix, means
+
+
+# Truncated SVD on the sparse matrix, then top-n unrated movies per user scored batch by batch
+def factorize_and_rank(matrix, means, factors=FACTORS, top_n=TOP_N, batch_size=BATCH_SIZE):
+    users, movies = matrix.shape
+    factors = min(factors, min(users, movies) - 1)
+    top_n = min(top_n, movies)
+    if factors < 1 or top_n < 1:
+        return
+
+    u, s, vt = svds(matrix, k=factors)
+    user_factors = (u * s).astype(np.float32)
+    vt = vt.astype(np.float32)
+
+    for start in range(0, users, batch_size):
+        stop = min(start + batch_size, users)
+        scores = user_factors[start:stop] @ vt
+        batch = matrix[start:stop]
+        # Movies the user already rated are never recommended back
+        scores[np.repeat(np.arange(stop - start), np.diff(batch.indptr)), batch.indices] = -np.inf
+        candidates = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        for offset in range(stop - start):
+            yield start + offset, candidates[offset], candidate_scores[offset] + means[start + offset]
+
+
+# Recompute every user's recommendations from comment ratings, returns the number of stored rows
+def rebuild_user_recommendations(factors=FACTORS, top_n=TOP_N, batch_size=BATCH_SIZE):
+    ratings = list(
+        Comment.objects.filter(parent__isnull=True, user_rating__isnull=False)
+        .values('author_id', 'movie_id')
+        .annotate(rating=Avg('user_rating'))
+        .order_by()
+        .values_list('author_id', 'movie_id', 'rating')
+    )
+    entries = []
+
+    if ratings:
+        user_ids = sorted({user_id for user_id, _, _ in ratings})
+        # Only rated movies get columns, an unrated one has zero factors and would score exactly the user's mean
+        movie_ids = sorted({movie_id for _, movie_id, _ in ratings})
+        matrix, means = build_rating_matrix(user_ids, movie_ids, ratings)
+        ranked = factorize_and_rank(matrix, means, factors=factors, top_n=top_n, batch_size=batch_size)
+        for row, candidates, scores in ranked:
+            rank = 0
+            for candidate, score in zip(candidates, scores):
+                if not np.isfinite(score):
+                    break
+                rank += 1
+                entries.append(UserRecommendation(
+                    user_id=user_ids[row],
+                    movie_id=movie_ids[candidate],
+                    score=float(min(max(score, 0.0), 10.0)),
+                    rank=rank
+                ))
+
+    with transaction.atomic():
+        UserRecommendation.objects.all().delete()
+        UserRecommendation.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
@@ -0,0 +1,19 @@
+import nh3
+
+# Inline formatting only, comments are shown inside a <p>
+COMMENT_TAGS = {"a", "b", "br", "code", "em", "i", "s", "strong", "u"}
+COMMENT_ATTRIBUTES = {"a": {"href", "title"}}
+COMMENT_URL_SCHEMES = {"http", "https", "mailto"}
+COMMENT_LINK_REL = "nofollow noopener ugc"
+
+
+# Sanitised HTML for a comment: allowlisted inline tags, line breaks kept, everything else escaped or dropped
+def render_comment_html(text):
+    text = (text or "").replace("\r\n", "\n").replace("\n", "<br>\n")
+    return nh3.clean(
+        text,
+        tags=COMMENT_TAGS,
+        attributes=COMMENT_ATTRIBUTES,
+        url_schemes=COMMENT_URL_SCHEMES,
+        link_rel=COMMENT_LINK_REL,
+    )
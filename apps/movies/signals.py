@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import invalidate_movie
+from .catalogue import record_change
+from .models import Movie
+from .taxonomy import sync_movie_taxonomy, TAXONOMY_FIELDS
+
+
+@receiver(post_save, sender=Movie)
+def sync_taxonomy(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not TAXONOMY_FIELDS & set(update_fields)):
+        return
+    sync_movie_taxonomy(instance)
+
+
+# Cached copies go stale once the row changes; bumped after commit so no worker re-caches the old row meanwhile
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def invalidate_cached_movie(sender, instance, raw=False, **kwargs):
+    if raw or not settings.MOVIE_CACHE:
+        return
+    movie_id = instance.pk
+    transaction.on_commit(lambda: invalidate_movie(movie_id))
+
+
+# Genres and directors only change through Movie saves (sync_taxonomy), so the Movie signals cover them too
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def log_catalogue_change(sender, instance, raw=False, **kwargs):
+    if raw or not settings.MOVIE_CATALOGUE:
+        return
+    movie_id = instance.pk
+    transaction.on_commit(lambda: record_change(movie_id))
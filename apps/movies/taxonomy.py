@@ -0,0 +1,52 @@
+import hashlib
+from django.utils.text import slugify
+from .models import Genre, Person, MovieGenre, MovieCredit
+
+TAXONOMY_FIELDS = {'genres', 'director', 'writers'}
+
+
+def name_slug(name):
+    return slugify(name, allow_unicode=True) or hashlib.md5(name.encode()).hexdigest()[:12]
+
+
+# Comma separated names to {slug: name}, keeping the first spelling of duplicates
+def parse_names(value):
+    names = {}
+    for name in (value or "").split(","):
+        name = name.strip()
+        if name:
+            names.setdefault(name_slug(name), name)
+    return names
+
+
+def _get_or_create(model, names):
+    found = {obj.slug: obj for obj in model.objects.filter(slug__in=names)}
+    missing = [model(name=name, slug=slug) for slug, name in names.items() if slug not in found]
+    if missing:
+        model.objects.bulk_create(missing, ignore_conflicts=True)
+        found = {obj.slug: obj for obj in model.objects.filter(slug__in=names)}
+    return found
+
+
+def _sync_links(links, wanted_ids, field, build):
+    existing = set(links.values_list(field, flat=True))
+    if existing - wanted_ids:
+        links.filter(**{f"{field}__in": existing - wanted_ids}).delete()
+    if wanted_ids - existing:
+        links.model.objects.bulk_create([build(pk) for pk in wanted_ids - existing], ignore_conflicts=True)
+
+
+# Mirror the free-text genres/director/writers columns into the normalised tables
+def sync_movie_taxonomy(movie):
+    genres = _get_or_create(Genre, parse_names(movie.genres))
+    _sync_links(
+        MovieGenre.objects.filter(movie=movie), {genre.id for genre in genres.values()}, 'genre_id',
+        lambda pk: MovieGenre(movie=movie, genre_id=pk)
+    )
+
+    for role, value in (("director", movie.director), ("writer", movie.writers)):
+        people = _get_or_create(Person, parse_names(value))
+        _sync_links(
+            MovieCredit.objects.filter(movie=movie, role=role), {person.id for person in people.values()}, 'person_id',
+            lambda pk, role=role: MovieCredit(movie=movie, person_id=pk, role=role)
+        )
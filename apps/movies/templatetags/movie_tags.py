@@ -0,0 +1,25 @@
+from django import template
+from django.templatetags.static import static
+from apps.movies.posters import POSTER_SIZES, local_poster_url, poster_srcset
+
+register = template.Library()
+
+
+# Single poster URL, e.g. for CSS backgrounds: local copy, then TMDb, then the placeholder
+@register.simple_tag
+def poster_url(movie, size='card'):
+    return local_poster_url(movie, size) or movie.img_url or static('assets/img/placeholder.jpg')
+
+
+# Responsive <picture> with WebP and JPEG srcsets once the poster has been processed locally
+@register.inclusion_tag('movies/partials/poster.html')
+def poster(movie, size='card', css_class='', sizes='', loading='lazy'):
+    return {
+        'movie': movie,
+        'src': poster_url(movie, size),
+        'srcset_webp': poster_srcset(movie, 'webp'),
+        'srcset_jpg': poster_srcset(movie, 'jpg'),
+        'sizes': sizes or f"{POSTER_SIZES[size]}px",
+        'css_class': css_class,
+        'loading': loading,
+    }
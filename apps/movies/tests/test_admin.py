@@ -0,0 +1,91 @@
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from apps.movies.models import Movie, Comment, Vote
+from apps.users.models import User
+
+
+class AdminTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="root@example.com", name="Root", password="password")
+        self.user = User.objects.create_user(email="user@example.com", name="User", password="password")
+        self.movie = Movie.objects.create(title="Old Movie", date="1968", body="Description")
+        self.other = Movie.objects.create(title="New Movie", date="2021-05-01", body="Description")
+        self.comment = Comment.objects.create(movie=self.movie, author=self.user, text="Classic", user_rating=9.0)
+        Comment.objects.create(movie=self.other, author=self.admin, text="Fresh", user_rating=7.0)
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, name):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse(f'admin:movies_{name}_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def test_changelists_do_not_query_per_row(self):
+        """Test comment and vote changelists load authors, movies and users with the rows."""
+        Vote.objects.create(user=self.user, comment=self.comment, vote_type='like')
+        comments, votes = self.changelist_queries('comment'), self.changelist_queries('vote')
+
+        for number in range(5):
+            voter = User.objects.create_user(email=f"voter{number}@example.com", name=f"Voter {number}",
+                                             password="password")
+            reply = Comment.objects.create(movie=self.other, author=voter, text="Reply", parent=self.comment)
+            Vote.objects.create(user=voter, comment=reply, vote_type='dislike')
+        self.assertEqual(self.changelist_queries('comment'), comments)
+        self.assertEqual(self.changelist_queries('vote'), votes)
+
+    def test_autocomplete_filter(self):
+        """Test the movie filter renders an autocomplete and filters by foreign key."""
+        url = reverse('admin:movies_comment_changelist')
+        response = self.client.get(url)
+        self.assertContains(response, 'class="autocomplete-filter admin-autocomplete"')
+        self.assertNotContains(response, f"?movie__id__exact={self.other.id}")
+
+        response = self.client.get(url, {'movie__id__exact': self.movie.id})
+        self.assertEqual(list(response.context['cl'].result_list), [self.comment])
+
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'movies', 'model_name': 'comment', 'field_name': 'movie', 'term': "Old",
+        })
+        self.assertEqual([result['id'] for result in response.json()['results']], [str(self.movie.id)])
+
+    def test_decade_filter(self):
+        """Test movies are filtered by release decade."""
+        url = reverse('admin:movies_movie_changelist')
+        response = self.client.get(url)
+        self.assertContains(response, "?decade=1960")
+        self.assertContains(response, "2020s")
+
+        response = self.client.get(url, {'decade': '1960'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.movie])
+
+    def test_delete_votes_recounts_comments(self):
+        """Test bulk vote deletion updates the like and dislike counts."""
+        voter = User.objects.create_user(email="voter@example.com", name="Voter", password="password")
+        like = Vote.objects.create(user=self.user, comment=self.comment, vote_type='like')
+        Vote.objects.create(user=voter, comment=self.comment, vote_type='dislike')
+        Comment.objects.filter(pk=self.comment.pk).update(likes_count=1, dislikes_count=1)
+
+        self.client.post(reverse('admin:movies_vote_changelist'),
+                         {'action': 'delete_votes', '_selected_action': [like.pk]})
+        self.comment.refresh_from_db()
+        self.assertEqual((self.comment.likes_count, self.comment.dislikes_count), (0, 1))
+
+    def test_reset_votes(self):
+        """Test votes are removed from selected comments and counts cleared."""
+        Vote.objects.create(user=self.user, comment=self.comment, vote_type='like')
+        Comment.objects.filter(pk=self.comment.pk).update(likes_count=1)
+
+        self.client.post(reverse('admin:movies_comment_changelist'),
+                         {'action': 'reset_votes', '_selected_action': [self.comment.pk]})
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.likes_count, 0)
+        self.assertFalse(Vote.objects.exists())
+
+    def test_delete_comments(self):
+        """Test bulk comment deletion removes replies too."""
+        Comment.objects.create(movie=self.movie, author=self.admin, text="Reply", parent=self.comment)
+        self.client.post(reverse('admin:movies_comment_changelist'),
+                         {'action': 'delete_comments', '_selected_action': [self.comment.pk]})
+        self.assertEqual(list(Comment.objects.values_list('text', flat=True)), ["Fresh"])
@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.http import Http404
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from apps.movies import cache as movie_cache, trending
+from apps.movies.models import Movie
+from apps.users.models import User, RoleEnum
+
+
+@override_settings(MOVIE_CACHE=True)
+class MovieCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        movie_cache.LOCAL.clear()
+        self.movie = Movie.objects.create(title="Cached Movie", date="2023", body="Description")
+
+    def test_lookups_hit_the_local_tier(self):
+        """Repeated lookups by id and slug are served without queries"""
+        movie_cache.get_movie_by_slug(self.movie.slug)
+        with self.assertNumQueries(0):
+            self.assertEqual(movie_cache.get_movie(self.movie.pk).title, "Cached Movie")
+            self.assertEqual(movie_cache.get_movie_by_slug(self.movie.slug).pk, self.movie.pk)
+
+    def test_shared_tier_after_local_eviction(self):
+        """Another worker with an empty local tier reads the row from the shared cache"""
+        movie_cache.get_movie(self.movie.pk)
+        movie_cache.LOCAL.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(movie_cache.get_movie(self.movie.pk).pk, self.movie.pk)
+
+    def test_callers_get_copies(self):
+        """Changing a returned movie does not change the cached one"""
+        movie_cache.get_movie(self.movie.pk).title = "Changed"
+        self.assertEqual(movie_cache.get_movie(self.movie.pk).title, "Cached Movie")
+
+    def test_save_invalidates_every_tier(self):
+        """A save bumps the version, so both tiers miss and the new row is loaded"""
+        movie_cache.get_movie(self.movie.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movie.title = "Renamed"
+            self.movie.save()
+        self.assertEqual(movie_cache.get_movie(self.movie.pk).title, "Renamed")
+
+    def test_version_change_seen_by_other_workers(self):
+        """A local entry from an old version is ignored once the shared version moves on"""
+        movie_cache.get_movie(self.movie.pk)
+        Movie.objects.filter(pk=self.movie.pk).update(title="Renamed elsewhere")
+        cache.incr(movie_cache.version_key(self.movie.pk))
+        self.assertEqual(movie_cache.get_movie(self.movie.pk).title, "Renamed elsewhere")
+
+    def test_delete_invalidates(self):
+        """Deleted movies are not served from the cache"""
+        movie_id, slug = self.movie.pk, self.movie.slug
+        movie_cache.get_movie_by_slug(slug)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movie.delete()
+        self.assertIsNone(movie_cache.get_movie(movie_id))
+        with self.assertRaises(Http404):
+            movie_cache.get_movie_or_404(slug=slug)
+
+    def test_local_tier_is_bounded(self):
+        """The oldest entry is evicted once the LRU is full"""
+        lru = movie_cache.LocalLRU(maxsize=2, ttl=60)
+        lru.set(1, 'a')
+        lru.set(2, 'b')
+        lru.get(1)
+        lru.set(3, 'c')
+        self.assertIsNone(lru.get(2))
+        self.assertEqual(lru.get(1), 'a')
+
+    def test_local_tier_expires(self):
+        """Entries older than the TTL are dropped"""
+        lru = movie_cache.LocalLRU(maxsize=2, ttl=-1)
+        lru.set(1, 'a')
+        self.assertIsNone(lru.get(1))
+
+    def test_detail_view_after_save(self):
+        """The detail page shows a saved edit instead of the cached row"""
+        self.client.get(reverse('movies:detail', kwargs={'slug': self.movie.slug}))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movie.title = "Edited Title"
+            self.movie.save()
+        response = self.client.get(reverse('movies:detail', kwargs={'slug': self.movie.slug}))
+        self.assertContains(response, "Edited Title")
+
+    def test_edit_keeps_columns_updated_behind_the_cache(self):
+        """Saving the edit form does not write back a cached hot score or poster key"""
+        movie_cache.get_movie_by_slug(self.movie.slug)
+        trending.bump(Movie.objects.filter(pk=self.movie.pk))
+        Movie.objects.filter(pk=self.movie.pk).update(poster_key="abc123")
+        admin = User.objects.create_user(email="admin@example.com", name="Admin", password="password",
+                                         role=RoleEnum.ADMIN)
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('movies:update', args=[self.movie.slug]),
+                             {'title': "Cached Movie", 'date': "2023", 'body': "Edited"})
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.body, "Edited")
+        self.assertEqual(self.movie.poster_key, "abc123")
+        self.assertGreater(self.movie.hot_score, 0)
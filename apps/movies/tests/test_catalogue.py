@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from apps.movies import catalogue
+from apps.movies.models import Movie
+
+
+@override_settings(MOVIE_CATALOGUE=True)
+class CatalogueTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalogue.ENGINE.clear()
+        self.movies = [
+            Movie.objects.create(title="Alpha", date="1994", body="A", rating=8.1, genres="Drama, Crime",
+                                 director="Jane Doe"),
+            Movie.objects.create(title="Bravo", date="2001", body="B", rating=6.5, genres="Comedy",
+                                 director="John Roe"),
+            Movie.objects.create(title="Charlie", date="1999", body="C", rating=None, genres="Drama",
+                                 director="Jane Doe"),
+            Movie.objects.create(title="Delta", date="Unknown", body="D", rating=7.2, genres="Crime, Comedy"),
+        ]
+
+    def listed(self, **params):
+        response = self.client.get(reverse('movies:list'), params)
+        return [movie.title for movie in response.context['all_movies']], response
+
+    def test_matches_database_results(self):
+        """Every sort, order and filter combination lists the same movies as the ORM path"""
+        combinations = [
+            {}, {'sort': 'title', 'order': 'desc'}, {'sort': 'rating', 'order': 'desc'}, {'sort': 'rating'},
+            {'sort': 'date', 'order': 'desc'}, {'sort': 'date'}, {'genre': 'drama', 'sort': 'date'},
+            {'genre': 'crime', 'director': 'jane-doe'}, {'decade': '1990', 'sort': 'rating', 'order': 'desc'},
+            {'year_min': '2000'}, {'genre': 'missing'},
+        ]
+        for params in combinations:
+            with self.subTest(params=params):
+                from_memory, memory_response = self.listed(**params)
+                with self.settings(MOVIE_CATALOGUE=False):
+                    from_database, database_response = self.listed(**params)
+                self.assertEqual(from_memory, from_database)
+                self.assertEqual(list(memory_response.context['genre_facets']),
+                                 list(database_response.context['genre_facets']))
+                self.assertEqual(list(memory_response.context['director_facets']),
+                                 list(database_response.context['director_facets']))
+
+    def test_missing_values_sort_last(self):
+        """Movies without a rating or year go last in both directions"""
+        self.assertEqual(self.listed(sort='rating')[0][-1], "Charlie")
+        self.assertEqual(self.listed(sort='rating', order='desc')[0][-1], "Charlie")
+        self.assertEqual(self.listed(sort='date', order='desc')[0][-1], "Delta")
+
+    def test_browsing_reads_only_the_page(self):
+        """Once loaded, sorting and filtering only query the card rows of the page"""
+        catalogue.ENGINE.get()
+        with self.assertNumQueries(1):
+            result = catalogue.query('rating', 'desc', genre='crime')
+            self.assertEqual(len(result), 2)
+            self.assertEqual([movie.title for movie in result[:1]], ["Alpha"])
+
+    def test_saves_are_applied_incrementally(self):
+        """Saved and deleted movies show up after the change log is replayed"""
+        first = catalogue.ENGINE.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movies[1].rating = 9.5
+            self.movies[1].save()
+            self.movies[3].delete()
+            Movie.objects.create(title="Echo", date="2010", body="E", rating=5.0, genres="Drama")
+        refreshed = catalogue.ENGINE.get()
+        self.assertEqual(refreshed.version, first.version + 3)
+        self.assertEqual([movie.title for movie in catalogue.query('rating', 'desc')],
+                         ["Bravo", "Alpha", "Echo", "Charlie"])
+        self.assertEqual(len(catalogue.query('title', genre='drama')), 3)
+
+    def test_lost_change_log_reloads(self):
+        """A gap in the change log rebuilds the catalogue from the database"""
+        catalogue.ENGINE.get()
+        Movie.objects.filter(pk=self.movies[0].pk).update(rating=1.0)
+        catalogue.record_change(self.movies[1].pk)
+        catalogue.record_change(self.movies[1].pk)
+        cache.delete(catalogue.change_key(cache.get(catalogue.CHANGE_COUNTER) - 1))
+        self.assertEqual([movie.title for movie in catalogue.query('rating')][0], "Alpha")
+
+    @override_settings(MOVIE_LIST_PAGE_SIZE=2)
+    def test_pagination(self):
+        """Pages are sliced from the presorted order"""
+        titles, response = self.listed(sort='title', page=2)
+        self.assertEqual(titles, ["Charlie", "Delta"])
+        self.assertEqual(response.context['paginator'].count, 4)
+        self.assertContains(response, "Page 2 of 2")
+
+    def test_pages_skip_deleted_movies(self):
+        """Movies deleted since the snapshot are replaced by the next ones in order, so pages stay full"""
+        catalogue.ENGINE.get()
+        Movie.objects.filter(pk__in=[self.movies[0].pk, self.movies[2].pk]).delete()
+        with self.assertNumQueries(3):
+            self.assertEqual([movie.title for movie in catalogue.query('title')[:2]], ["Bravo", "Delta"])
+
+    def test_search_uses_database(self):
+        """Free text search is not served from memory"""
+        titles, _ = self.listed(search="alp")
+        self.assertEqual(titles, ["Alpha"])
@@ -1,7 +1,11 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
 from django.core.exceptions import ValidationError
 from django.db.utils import IntegrityError
-from apps.movies.models import Movie, Comment, Vote
+from apps.movies.models import Movie, Comment, Vote, Genre, MovieCredit, COMMENT_MAX_DEPTH
 from apps.users.models import User
 
 class MovieModelTest(TestCase):
@@ -19,6 +23,31 @@ class MovieModelTest(TestCase):
         self.assertEqual(self.movie.date, "2023")
         self.assertEqual(self.movie.rating, 8.5)
 
+    def test_year_parsed_from_date(self):
+        """Test the indexed release year follows the date string."""
+        self.assertEqual(self.movie.year, 2023)
+        self.movie.date = "1999-03-31"
+        self.movie.save(update_fields=['date'])
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.year, 1999)
+
+    def test_teaser_from_body(self):
+        """Test the stored teaser is plain text cut to the card length."""
+        self.assertEqual(self.movie.teaser, "Test Description")
+        self.movie.body = "<p>" + "word " * 100 + "</p>"
+        self.movie.save(update_fields=['body'])
+        self.movie.refresh_from_db()
+        self.assertLessEqual(len(self.movie.teaser), 250)
+        self.assertTrue(self.movie.teaser.startswith("word word"))
+        self.assertNotIn("<p>", self.movie.teaser)
+
+    def test_card_projection(self):
+        """Test cards() skips the description and other long text."""
+        card = Movie.objects.cards().get(pk=self.movie.pk)
+        self.assertEqual(card.get_deferred_fields(), {'body', 'writers', 'director', 'hot_score', 'tmdb_id'})
+        with self.assertNumQueries(1):
+            card.save(update_fields=['rating'])
+
     def test_slug_generation(self):
         """Test that slug is automatically generated from title."""
         self.assertEqual(self.movie.slug, "test-movie")
@@ -39,6 +68,33 @@ class MovieModelTest(TestCase):
         with self.assertRaises(ValidationError):
             movie.full_clean()
 
+class MovieTaxonomyTest(TestCase):
+    def setUp(self):
+        self.movie = Movie.objects.create(
+            title="Tagged Movie",
+            date="2023",
+            body="Description",
+            director="Jane Doe",
+            writers="Jane Doe, John Roe",
+            genres="Action, Drama, action"
+        )
+
+    def test_genres_are_normalised(self):
+        """Test comma separated genres are linked once per genre."""
+        self.assertEqual(sorted(self.movie.genre_tags.values_list('slug', flat=True)), ['action', 'drama'])
+
+    def test_credits_are_normalised(self):
+        """Test director and writers become person credits."""
+        credits = set(MovieCredit.objects.filter(movie=self.movie).values_list('person__name', 'role'))
+        self.assertEqual(credits, {('Jane Doe', 'director'), ('Jane Doe', 'writer'), ('John Roe', 'writer')})
+
+    def test_changes_are_synced(self):
+        """Test editing the genre string updates the links and reuses genres."""
+        self.movie.genres = "Drama, Comedy"
+        self.movie.save()
+        self.assertEqual(sorted(self.movie.genre_tags.values_list('slug', flat=True)), ['comedy', 'drama'])
+        self.assertEqual(Genre.objects.filter(slug='drama').count(), 1)
+
 class CommentModelTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -82,6 +138,52 @@ class CommentModelTest(TestCase):
         expected_str = f"Comment by {self.user.name} on {self.movie.title}"
         self.assertEqual(str(self.comment), expected_str)
 
+    def test_text_html_sanitised_on_save(self):
+        """Test comment HTML is rendered and sanitised when the text is saved."""
+        self.comment.text = '<b>Bold</b> <script>alert(1)</script><a href="javascript:x()">link</a>\nnext line'
+        self.comment.save(update_fields=['text'])
+        self.comment.refresh_from_db()
+        self.assertIn("<b>Bold</b>", self.comment.text_html)
+        self.assertIn("<br>", self.comment.text_html)
+        self.assertNotIn("<script", self.comment.text_html)
+        self.assertNotIn("javascript:", self.comment.text_html)
+
+    def test_thread_path(self):
+        """Test replies at any depth get a materialised path below their parent."""
+        reply = Comment.objects.create(movie=self.movie, author=self.user, text="Reply", parent=self.comment)
+        nested = Comment.objects.create(movie=self.movie, author=self.user, text="Nested", parent=reply)
+        other = Comment.objects.create(movie=self.movie, author=self.user, text="Other", user_rating=5.0)
+
+        self.assertEqual(self.comment.path, f"{self.comment.pk:010d}")
+        self.assertEqual(nested.path, f"{self.comment.pk:010d}/{reply.pk:010d}/{nested.pk:010d}")
+        self.assertEqual(nested.depth, 2)
+        self.assertEqual(list(self.comment.subtree()), [reply, nested])
+        self.assertEqual(list(other.subtree()), [])
+
+    def test_failed_path_update_rolls_back_insert(self):
+        """Test a comment is never stored without its thread path."""
+        with mock.patch.object(Comment, 'build_path', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                Comment.objects.create(movie=self.movie, author=self.user, text="Lost", user_rating=5.0)
+        self.assertFalse(Comment.objects.filter(path="").exists())
+        self.assertFalse(Comment.objects.filter(text="Lost").exists())
+
+    def test_thread_depth_is_capped(self):
+        """Test replies below the maximum depth attach to the deepest allowed comment."""
+        parent = self.comment
+        for _ in range(COMMENT_MAX_DEPTH):
+            parent = Comment.objects.create(movie=self.movie, author=self.user, text="Deeper", parent=parent)
+        reply = Comment.objects.create(movie=self.movie, author=self.user, text="Too deep", parent=parent)
+        self.assertEqual(reply.depth, COMMENT_MAX_DEPTH)
+        self.assertEqual(reply.parent_id, parent.parent_id)
+
+    def test_render_comments_backfill(self):
+        """Test render_comments fills text_html for comments stored without it."""
+        Comment.objects.filter(pk=self.comment.pk).update(text_html="")
+        call_command('render_comments', stdout=StringIO())
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.text_html, "Great movie!")
+
 class VoteModelTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -119,3 +221,30 @@ class VoteModelTest(TestCase):
                 comment=self.comment,
                 vote_type="dislike"
             )
+
+    def test_reconcile_counters(self):
+        """Test reconcile_counters recounts drifted comments from their votes."""
+        other = User.objects.create_user(email="other@example.com", name="Other", password="password")
+        Vote.objects.create(user=self.user, comment=self.comment, vote_type="like")
+        Vote.objects.create(user=other, comment=self.comment, vote_type="dislike")
+        drifted = Comment.objects.create(movie=self.movie, author=self.user, text="No votes", user_rating=3.0)
+        Comment.objects.filter(pk=self.comment.pk).update(likes_count=5, dislikes_count=0)
+        Comment.objects.filter(pk=drifted.pk).update(likes_count=2)
+
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', '--workers', '1', stdout=out)
+        self.assertIn("Would fix 2 comments", out.getvalue())
+        self.assertEqual(Comment.objects.get(pk=drifted.pk).likes_count, 2)
+
+        out = StringIO()
+        call_command('reconcile_counters', '--workers', '1', '--chunk-size', '1', stdout=out)
+        self.assertIn("likes off by 6 and dislikes by 1", out.getvalue())
+        self.comment.refresh_from_db()
+        self.assertEqual((self.comment.likes_count, self.comment.dislikes_count), (1, 1))
+        self.assertEqual(Comment.objects.get(pk=drifted.pk).likes_count, 0)
+
+    def test_reconcile_counters_options(self):
+        """Test reconcile_counters rejects non-positive chunk sizes and worker counts."""
+        for option in ('--chunk-size', '--workers'):
+            with self.assertRaises(CommandError):
+                call_command('reconcile_counters', option, '0', stdout=StringIO())
@@ -0,0 +1,80 @@
+import io
+import shutil
+import tempfile
+from PIL import Image
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from apps.movies.models import Movie
+from apps.movies.posters import process_poster, local_poster_url
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (500, 750), 'red').save(buffer, 'JPEG')
+        self.content = buffer.getvalue()
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        return FakeResponse(self.content)
+
+
+class PosterPipelineTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.movie = Movie.objects.create(
+            title="Poster Movie", date="2023", body="Description",
+            img_url="https://image.tmdb.org/t/p/w500/poster.jpg"
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_remote_url_until_processed(self):
+        """Test templates keep the TMDb URL until the poster is processed."""
+        self.assertIsNone(local_poster_url(self.movie))
+        response = self.client.get(reverse('movies:detail', args=[self.movie.slug]))
+        self.assertContains(response, self.movie.img_url)
+
+    def test_processed_sizes_are_served_with_cache_headers(self):
+        """Test generated sizes are served locally and cached for a year."""
+        process_poster(self.movie, session=FakeSession())
+        self.movie.refresh_from_db()
+
+        url = local_poster_url(self.movie, 'card', 'webp')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        image = Image.open(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(image.width, 342)
+
+        response = self.client.get(reverse('movies:detail', args=[self.movie.slug]))
+        self.assertContains(response, 'srcset=')
+        self.assertNotContains(response, self.movie.img_url)
+
+    def test_changed_url_invalidates_local_poster(self):
+        """Test a new remote URL falls back until reprocessed."""
+        process_poster(self.movie, session=FakeSession())
+        self.movie.img_url = "https://image.tmdb.org/t/p/w500/other.jpg"
+        self.movie.save()
+        self.assertIsNone(local_poster_url(self.movie))
+
+    def test_unknown_file_is_404(self):
+        """Test malformed or missing poster names are rejected."""
+        url = reverse('movies:poster', kwargs={'movie_id': self.movie.id, 'filename': 'settings.py'})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        url = reverse('movies:poster', kwargs={'movie_id': self.movie.id, 'filename': f"{'0' * 16}-card.jpg"})
+        self.assertEqual(self.client.get(url).status_code, 404)
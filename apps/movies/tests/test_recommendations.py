@@ -0,0 +1,107 @@
+from django.test import TestCase
+from django.urls import reverse
+from apps.movies.models import Movie, Comment, SimilarMovie, UserRecommendation
+from apps.movies.recommendations import rebuild_similar_movies, rebuild_user_recommendations, split_names
+from apps.users.models import User
+
+
+class SimilarMoviesTest(TestCase):
+    def setUp(self):
+        self.alien = Movie.objects.create(
+            title="Alien", date="1979", body="A crew aboard a spaceship hunted by a deadly alien creature.",
+            director="Ridley Scott", writers="Dan O'Bannon", genres="Horror, Science Fiction"
+        )
+        self.aliens = Movie.objects.create(
+            title="Aliens", date="1986", body="Marines return to the planet to fight the alien creature.",
+            director="James Cameron", writers="James Cameron", genres="Action, Science Fiction"
+        )
+        self.prometheus = Movie.objects.create(
+            title="Prometheus", date="2012", body="Explorers aboard a spaceship search for the origins of mankind.",
+            director="Ridley Scott", writers="Jon Spaihts", genres="Science Fiction"
+        )
+        self.notebook = Movie.objects.create(
+            title="The Notebook", date="2004", body="A poor young man falls in love with a rich young woman.",
+            director="Nick Cassavetes", writers="Jeremy Leven", genres="Romance, Drama"
+        )
+
+    def test_split_names(self):
+        """Test comma separated names are normalised."""
+        self.assertEqual(split_names(" Action,  Science Fiction ,"), ["action", "science fiction"])
+        self.assertEqual(split_names(None), [])
+
+    def test_rebuild_ranks_neighbours(self):
+        """Test neighbours are stored ranked by similarity."""
+        stored = rebuild_similar_movies(k=2)
+        self.assertEqual(stored, SimilarMovie.objects.count())
+
+        neighbours = list(SimilarMovie.objects.filter(movie=self.alien).values_list('similar', flat=True))
+        self.assertEqual(neighbours[0], self.prometheus.id)
+        self.assertNotIn(self.alien.id, neighbours)
+        self.assertNotIn(self.notebook.id, neighbours)
+
+    def test_rebuild_replaces_previous_entries(self):
+        """Test rebuilding twice does not duplicate entries."""
+        first = rebuild_similar_movies(k=2)
+        second = rebuild_similar_movies(k=2)
+        self.assertEqual(first, second)
+        self.assertEqual(SimilarMovie.objects.count(), second)
+
+    def test_detail_view_shows_similar_movies(self):
+        """Test the detail page lists precomputed similar movies."""
+        rebuild_similar_movies(k=2)
+        response = self.client.get(reverse('movies:detail', args=[self.alien.slug]))
+        self.assertContains(response, "Similar Movies")
+        self.assertIn(self.prometheus, response.context['similar_movies'])
+
+
+class UserRecommendationsTest(TestCase):
+    def setUp(self):
+        self.movies = [
+            Movie.objects.create(title=f"Movie {index}", date="2020", body="Description")
+            for index in range(5)
+        ]
+        self.users = [
+            User.objects.create_user(email=f"user{index}@example.com", name=f"User {index}", password="password")
+            for index in range(4)
+        ]
+        ratings = [
+            (0, 0, 9.0), (0, 1, 8.0), (0, 2, 2.0),
+            (1, 0, 9.0), (1, 1, 9.0), (1, 3, 8.0),
+            (2, 2, 8.0), (2, 4, 9.0),
+            (3, 0, 8.0),
+        ]
+        for user, movie, rating in ratings:
+            Comment.objects.create(movie=self.movies[movie], author=self.users[user], text="Review", user_rating=rating)
+
+    def test_rated_movies_are_not_recommended(self):
+        """Test recommendations skip movies the user already rated."""
+        rebuild_user_recommendations(factors=2, top_n=3)
+        recommended = set(UserRecommendation.objects.filter(user=self.users[0]).values_list('movie', flat=True))
+        self.assertTrue(recommended)
+        self.assertFalse(recommended & {self.movies[0].id, self.movies[1].id, self.movies[2].id})
+
+    def test_unrated_movies_are_not_recommended(self):
+        """Test movies nobody rated never fill the list with the user's mean score."""
+        unrated = Movie.objects.create(title="Unrated Movie", date="2020", body="Description")
+        rebuild_user_recommendations(factors=2, top_n=5)
+        self.assertTrue(UserRecommendation.objects.exists())
+        self.assertFalse(UserRecommendation.objects.filter(movie=unrated).exists())
+
+    def test_replies_are_ignored(self):
+        """Test only top-level rated comments feed the rating matrix."""
+        parent = Comment.objects.filter(author=self.users[3]).first()
+        Comment.objects.create(movie=self.movies[4], author=self.users[3], text="Reply", parent=parent)
+        rebuild_user_recommendations(factors=2, top_n=5)
+        recommended = UserRecommendation.objects.filter(user=self.users[3]).values_list('movie', flat=True)
+        self.assertIn(self.movies[4].id, recommended)
+
+    def test_profile_shows_own_recommendations_only(self):
+        """Test recommendations are listed only on the user's own profile."""
+        rebuild_user_recommendations(factors=2, top_n=2)
+        self.client.login(email="user0@example.com", password="password")
+
+        response = self.client.get(reverse('users:profile', args=[self.users[0].id]))
+        self.assertEqual(len(response.context['recommended_movies']), 2)
+
+        response = self.client.get(reverse('users:profile', args=[self.users[1].id]))
+        self.assertNotIn('recommended_movies', response.context)
@@ -1,6 +1,12 @@
 import json
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from apps.movies import tmdb
 from apps.movies.models import Movie, Comment, Vote
 from apps.users.models import User, RoleEnum
 
@@ -40,6 +46,20 @@ class MovieViewTest(BaseViewTest):
         self.assertContains(response, "Test Movie")
         self.assertTemplateUsed(response, 'movies/movie_list.html')
 
+    def test_listing_pages_load_cards(self):
+        """Test listing pages load the card projection without per-movie queries."""
+        def list_queries():
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(reverse('movies:list'))
+            self.assertIn('body', response.context['all_movies'][0].get_deferred_fields())
+            self.assertIn('body', response.context['random_movies'][0].get_deferred_fields())
+            return len(captured)
+
+        queries = list_queries()
+        for number in range(3):
+            Movie.objects.create(title=f"Movie {number}", date="2024", body="Description", genres="Drama")
+        self.assertEqual(list_queries(), queries)
+
     def test_movie_search(self):
         """Test movie search functionality."""
         response = self.client.get(reverse('movies:search'), {'query': 'Test'})
@@ -104,6 +124,51 @@ class MovieViewTest(BaseViewTest):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
+    def test_genre_facet_filter(self):
+        """Test filtering the list by a genre facet."""
+        Movie.objects.create(title="Drama Movie", date="2020", body="Description", genres="Drama", director="Director")
+        response = self.client.get(reverse('movies:list'), {'genre': 'drama'})
+        self.assertEqual([movie.title for movie in response.context['all_movies']], ["Drama Movie"])
+
+        response = self.client.get(reverse('movies:list'), {'director': 'director'})
+        self.assertEqual(len(response.context['all_movies']), 2)
+        facets = {facet['genre__slug']: facet['count'] for facet in response.context['genre_facets']}
+        self.assertEqual(facets, {'action': 1, 'drama': 1})
+
+    def test_year_filters_and_sort(self):
+        """Test year range, decade filters and numeric date sorting."""
+        Movie.objects.create(title="Old Movie", date="1985", body="Description")
+        Movie.objects.create(title="Older Movie", date="978", body="Description")
+        response = self.client.get(reverse('movies:list'), {'decade': '1980'})
+        self.assertEqual([movie.title for movie in response.context['all_movies']], ["Old Movie"])
+
+        response = self.client.get(reverse('movies:list'), {'year_min': '1990', 'year_max': '2030'})
+        self.assertEqual([movie.title for movie in response.context['all_movies']], ["Test Movie"])
+
+        response = self.client.get(reverse('movies:list'), {'sort': 'date', 'order': 'desc'})
+        self.assertEqual([movie.title for movie in response.context['all_movies']][:2], ["Test Movie", "Old Movie"])
+
+    def test_search_by_year(self):
+        """Test a year search matches the year and other digits do not break the list."""
+        Movie.objects.create(title="Old Movie", date="1985", body="Description")
+        response = self.client.get(reverse('movies:list'), {'search': ' 1985 '})
+        self.assertEqual([movie.title for movie in response.context['all_movies']], ["Old Movie"])
+
+        for query in ['²', '١٩٨٥']:
+            response = self.client.get(reverse('movies:list'), {'search': query})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.context['all_movies']), [])
+
+    def test_trending_sort(self):
+        """Test commenting moves a movie to the top of the trending sort."""
+        other = Movie.objects.create(title="Other Movie", date="2020", body="Description")
+        self.client.login(email="user@example.com", password="password")
+        self.client.post(reverse('movies:comment_create', args=[other.id]), {'text': 'Hot', 'user_rating': 7.0})
+
+        response = self.client.get(reverse('movies:list'), {'sort': 'trending'})
+        self.assertEqual(list(response.context['all_movies'])[0], other)
+        self.assertIn(other, response.context['trending_movies'])
+
     def test_delete_movie(self):
         """Test deleting a movie."""
         self.client.login(email="admin@example.com", password="password")
@@ -111,6 +176,83 @@ class MovieViewTest(BaseViewTest):
         self.assertRedirects(response, reverse('movies:list'))
         self.assertEqual(Movie.objects.count(), 0)
 
+    def tmdb_movie(self, tmdb_id, title):
+        details = {"id": tmdb_id, "title": title, "release_date": "1999-03-31", "overview": "Overview",
+                   "vote_average": 8.2, "genres": [{"name": "Action"}], "poster_path": None}
+        credits = {"crew": [{"name": "Lana Wachowski", "job": "Director"}]}
+        return mock.patch.multiple('apps.movies.tmdb', movie_details=mock.Mock(return_value=details),
+                                   movie_credits=mock.Mock(return_value=credits))
+
+    def test_tmdb_search_marks_imported_movies(self):
+        """Test search results already in the catalogue link to the movie instead of importing it."""
+        self.movie.tmdb_id = 603
+        self.movie.save()
+        self.client.login(email="admin@example.com", password="password")
+        results = [{"id": 603, "title": "Test Movie"}, {"id": 604, "title": "New Movie"}]
+        with mock.patch('apps.movies.tmdb.search_movies', return_value=results):
+            with self.assertNumQueries(4):
+                response = self.client.post(reverse('movies:find'), {'title': 'movie'})
+        self.assertEqual([option["imported_slug"] for option in response.context['options']], [self.movie.slug, None])
+        self.assertContains(response, "Already imported")
+        self.assertContains(response, reverse('movies:import', args=[604]))
+
+    def test_tmdb_search_links_catalogue_movies(self):
+        """Test a result matching a catalogue movie without a TMDb id is linked and imports without TMDb calls."""
+        self.client.login(email="admin@example.com", password="password")
+        results = [{"id": 700, "title": "Test Movie", "release_date": "2023-05-01"},
+                   {"id": 701, "title": "Test Movie", "release_date": "1980-01-01"}]
+        with mock.patch('apps.movies.tmdb.search_movies', return_value=results):
+            response = self.client.post(reverse('movies:find'), {'title': 'test movie'})
+        self.assertEqual([option["imported_slug"] for option in response.context['options']], [self.movie.slug, None])
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.tmdb_id, 700)
+
+        with self.tmdb_movie(700, "Test Movie"):
+            response = self.client.get(reverse('movies:import', args=[700]))
+            self.assertEqual(tmdb.movie_details.call_count, 0)
+        self.assertRedirects(response, reverse('movies:update', args=[self.movie.slug]))
+
+    def test_tmdb_import_links_catalogue_movie(self):
+        """Test importing a film already in the catalogue links it instead of reporting a clash."""
+        movie = Movie.objects.create(title="The Matrix", date="1999", body="Description")
+        self.client.login(email="admin@example.com", password="password")
+        with self.tmdb_movie(603, "The Matrix"):
+            response = self.client.get(reverse('movies:import', args=[603]))
+            self.assertEqual(tmdb.movie_credits.call_count, 0)
+        self.assertRedirects(response, reverse('movies:update', args=[movie.slug]))
+        movie.refresh_from_db()
+        self.assertEqual(movie.tmdb_id, 603)
+        self.assertEqual(Movie.objects.filter(title="The Matrix").count(), 1)
+
+    def test_tmdb_import_is_idempotent(self):
+        """Test importing a movie twice calls TMDb once and keeps one row."""
+        self.client.login(email="admin@example.com", password="password")
+        with self.tmdb_movie(603, "The Matrix"):
+            first = self.client.get(reverse('movies:import', args=[603]))
+            second = self.client.get(reverse('movies:import', args=[603]))
+            self.assertEqual(tmdb.movie_details.call_count, 1)
+        movie = Movie.objects.get(tmdb_id=603)
+        self.assertEqual(movie.director, "Lana Wachowski")
+        self.assertRedirects(first, reverse('movies:update', args=[movie.slug]))
+        self.assertRedirects(second, reverse('movies:update', args=[movie.slug]))
+
+    def test_tmdb_import_title_clash(self):
+        """Test importing a different movie with an existing title reports the clash."""
+        self.client.login(email="admin@example.com", password="password")
+        with self.tmdb_movie(999, "Test Movie"):
+            response = self.client.get(reverse('movies:import', args=[999]), follow=True)
+        self.assertContains(response, "already in the catalogue")
+        self.assertFalse(Movie.objects.filter(tmdb_id=999).exists())
+
+    def test_tmdb_import_slug_clash(self):
+        """Test a title that only collides on its slug gets the generic conflict message."""
+        self.client.login(email="admin@example.com", password="password")
+        with self.tmdb_movie(998, "Test Movie!"):
+            response = self.client.get(reverse('movies:import', args=[998]), follow=True)
+        self.assertContains(response, "a conflicting movie already exists")
+        self.assertNotContains(response, "already in the catalogue")
+        self.assertFalse(Movie.objects.filter(tmdb_id=998).exists())
+
 class CommentViewTest(BaseViewTest):
     def test_add_comment(self):
         """Test adding a comment."""
@@ -148,6 +290,70 @@ class CommentViewTest(BaseViewTest):
         self.assertTrue(reply.is_reply)
         self.assertEqual(reply.parent, self.comment)
 
+    def test_add_comment_fragment(self):
+        """Test scripts get the new comment rendered as JSON instead of a redirect."""
+        self.client.login(email="user@example.com", password="password")
+        url = reverse('movies:comment_create', args=[self.movie.id])
+
+        response = self.client.post(url, {'text': 'Fragment comment', 'user_rating': 7.0},
+                                    headers={'X-Requested-With': 'XMLHttpRequest'})
+        data = response.json()
+        comment = Comment.objects.get(text='Fragment comment')
+        self.assertTrue(data['success'])
+        self.assertEqual((data['comment_id'], data['path']), (comment.id, comment.path))
+        self.assertIn(f'id="comment-{comment.id}"', data['html'])
+        self.assertIn('class="media my-4 comment-box"', data['html'])
+        self.assertNotIn(f'id="comment-{self.comment.id}"', data['html'])
+
+        response = self.client.post(url, {'text': 'No Rating'}, headers={'Accept': 'application/json'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], "Rating is required for main comments.")
+
+    def test_add_reply_fragment(self):
+        """Test a reply is checked against its movie with the parent and rendered alone."""
+        self.client.login(email="user@example.com", password="password")
+        url = reverse('movies:comment_create', args=[self.movie.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'text': 'Fragment reply', 'parent_id': self.comment.id},
+                                        headers={'Accept': 'application/json'})
+        reply = Comment.objects.get(text='Fragment reply')
+        self.assertEqual(reply.parent, self.comment)
+        self.assertIn('class="media my-4 reply"', response.json()['html'])
+        self.assertIn(f'data-path="{reply.path}"', response.json()['html'])
+        self.assertEqual(sum('movies_movie' in query['sql'] and 'movies_comment' in query['sql']
+                             and query['sql'].startswith('SELECT') for query in queries.captured_queries), 1)
+
+        other = Movie.objects.create(title="Other Movie", date="2020", body="Description")
+        response = self.client.post(reverse('movies:comment_create', args=[other.id]),
+                                    {'text': 'Wrong movie', 'parent_id': self.comment.id},
+                                    headers={'Accept': 'application/json'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_top_comments_order(self):
+        """Test liked comments come first when ordering by top."""
+        second = Comment.objects.create(movie=self.movie, author=self.user2, text="Second comment", user_rating=7.0)
+        self.client.login(email="user@example.com", password="password")
+        self.client.post(reverse('movies:vote'), json.dumps({'comment_id': second.id, 'vote_type': 'like'}),
+                         content_type='application/json')
+
+        response = self.client.get(reverse('movies:detail', args=[self.movie.slug]), {'comments': 'top'})
+        self.assertEqual(list(response.context['comments']), [second, self.comment])
+
+        response = self.client.get(reverse('movies:detail', args=[self.movie.slug]))
+        self.assertEqual(list(response.context['comments']), [self.comment, second])
+
+    def test_nested_replies_rendered(self):
+        """Test replies of any depth are fetched in one query and shown after their parent."""
+        reply = Comment.objects.create(movie=self.movie, author=self.user2, text="Reply", parent=self.comment)
+        nested = Comment.objects.create(movie=self.movie, author=self.user, text="Nested reply", parent=reply)
+
+        response = self.client.get(reverse('movies:detail', args=[self.movie.slug]))
+        self.assertEqual(list(response.context['comments']), [self.comment])
+        self.assertEqual(response.context['comments'][0].thread, [reply, nested])
+        self.assertContains(response, f'id="comment-{nested.id}"')
+        self.assertContains(response, "Nested reply")
+
     def test_comment_edit_permission(self):
         """Test comment editing permissions."""
         url = reverse('movies:comment_edit', args=[self.comment.id])
@@ -164,6 +370,12 @@ class CommentViewTest(BaseViewTest):
         self.assertEqual(response.status_code, 200)
         self.comment.refresh_from_db()
         self.assertEqual(self.comment.text, 'Edited Text')
+        self.assertEqual(response.json()['html'], self.comment.text_html)
+
+        # Markup outside the allowlist is escaped in the rendered HTML
+        data = json.dumps({'text': '<img src=x onerror=alert(1)>Hi'})
+        response = self.client.post(url, data, content_type='application/json')
+        self.assertNotIn("<img", response.json()['html'])
 
     def test_comment_delete_permission(self):
         """Test comment deletion permissions."""
@@ -238,3 +450,20 @@ class VoteViewTest(BaseViewTest):
 
         vote = Vote.objects.get(user=self.user2, comment=self.comment)
         self.assertEqual(vote.vote_type, 'dislike')
+
+    def test_recompute_hot_scores(self):
+        """Test rebuilding hot scores drops withdrawn likes."""
+        self.client.login(email="user2@example.com", password="password")
+        url = reverse('movies:vote')
+        data = json.dumps({'comment_id': self.comment.id, 'vote_type': 'like'})
+        self.client.post(url, data, content_type='application/json')
+        self.client.post(url, data, content_type='application/json')
+
+        self.comment.refresh_from_db()
+        self.assertGreater(self.comment.hot_score, 0)
+
+        call_command('recompute_hot_scores', stdout=StringIO())
+        self.comment.refresh_from_db()
+        self.movie.refresh_from_db()
+        self.assertEqual(self.comment.hot_score, 0)
+        self.assertGreater(self.movie.hot_score, 0)
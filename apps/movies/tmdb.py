@@ -0,0 +1,45 @@
+import os
+import time
+import requests
+from apps.core import metrics
+from apps.core.middleware import timed
+
+API_KEY = os.getenv("API_KEY_TMDb")
+# Overridable so load tests and local development can point at a stub server
+API_URL = os.getenv("TMDB_API_URL", "https://api.themoviedb.org/3").rstrip("/")
+API_IMG_URL = os.getenv("TMDB_IMG_URL", "https://image.tmdb.org/t/p/w500").rstrip("/")
+TIMEOUT = 10
+
+TMDB_REQUESTS = metrics.counter('tmdb_requests', "TMDb API requests.", ['endpoint'])
+TMDB_ERRORS = metrics.counter('tmdb_errors', "TMDb API requests that failed or returned an error status.", ['endpoint'])
+TMDB_SECONDS = metrics.counter('tmdb_request_seconds', "Time spent waiting for the TMDb API.", ['endpoint'])
+
+
+# GET a TMDb API path and return the decoded JSON, timed as outbound TMDb time of the current request.
+# `endpoint` is the low cardinality metrics label, e.g. "movie" rather than "/movie/603".
+def get(path, endpoint, **params):
+    TMDB_REQUESTS.inc(endpoint=endpoint)
+    start = time.perf_counter()
+    try:
+        with timed('tmdb'):
+            response = requests.get(f"{API_URL}{path}", params={"api_key": API_KEY, **params}, timeout=TIMEOUT)
+            if response.status_code >= 400:
+                TMDB_ERRORS.inc(endpoint=endpoint)
+            return response.json()
+    except Exception:
+        TMDB_ERRORS.inc(endpoint=endpoint)
+        raise
+    finally:
+        TMDB_SECONDS.inc(time.perf_counter() - start, endpoint=endpoint)
+
+
+def search_movies(title):
+    return get("/search/movie", "search", query=title).get("results", [])
+
+
+def movie_details(movie_id):
+    return get(f"/movie/{movie_id}", "movie")
+
+
+def movie_credits(movie_id):
+    return get(f"/movie/{movie_id}/credits", "credits")
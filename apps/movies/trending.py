@@ -0,0 +1,43 @@
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db.models import F, Value, FloatField
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+# Hot scores are stored as log(sum(weight * exp((event_time - HOT_EPOCH) / HOT_DECAY))).
+# Comparing two scores at any moment compares their exponentially decayed activity, adding an
+# event is one atomic UPDATE, and the log keeps values small so the counters never overflow.
+HOT_EPOCH = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+HOT_DECAY = timedelta(days=3)
+TRENDING_WINDOW = timedelta(days=7)
+
+COMMENT_WEIGHT = 1.0
+REPLY_WEIGHT = 0.5
+VOTE_WEIGHT = 0.25
+LIKE_WEIGHT = 1.0
+
+
+def event_score(weight=1.0, when=None):
+    when = when or timezone.now()
+    return math.log(weight) + (when - HOT_EPOCH) / HOT_DECAY
+
+
+def log_add(first, second):
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def _log_add_expression(score):
+    current = F('hot_score')
+    score = Value(score, output_field=FloatField())
+    return Greatest(current, score) + Ln(Value(1.0) + Exp(-Abs(current - score)))
+
+
+# Add one weighted event to the hot score of every row in the queryset
+def bump(queryset, weight=1.0, when=None):
+    return queryset.update(hot_score=_log_add_expression(event_score(weight, when)))
+
+
+# Lowest score a movie can have and still count as trending: one comment inside the window
+def trending_threshold():
+    return event_score(COMMENT_WEIGHT, timezone.now() - TRENDING_WINDOW)
@@ -12,6 +12,7 @@ urlpatterns = [
     path('comment/<int:comment_id>/delete/', views.CommentDeleteView.as_view(), name='comment_delete'),
     path('comment/<int:comment_id>/edit/', views.CommentEditView.as_view(), name='comment_edit'),
     path('vote/', views.VoteView.as_view(), name='vote'),
+    path('posters/<int:movie_id>/<str:filename>', views.PosterView.as_view(), name='poster'),
     path('<int:movie_id>/comment/', views.CommentCreateView.as_view(), name='comment_create'),
     path('<slug:slug>/', views.MovieDetailView.as_view(), name='detail'),
     path('<slug:slug>/edit/', views.MovieUpdateView.as_view(), name='update'),
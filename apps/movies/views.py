@@ -1,33 +1,43 @@
 import re
+from django.conf import settings
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.shortcuts import redirect, get_object_or_404, render
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy, reverse
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, Http404
 from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
-from django.db.models import Q, Prefetch
+from django.db import IntegrityError
+from django.db.models import Q, F, Count
 from django.views import View
-import requests
+from django.core.files.storage import default_storage
+from django.utils import timezone
 import json
 import random
-import os
-from dotenv import load_dotenv
-from .models import Movie, Comment, Vote
+from .models import (Movie, Comment, Vote, SimilarMovie, UserRecommendation, MovieGenre, MovieCredit, PATH_SEPARATOR,
+                     related_card_fields, parse_year)
 from .forms import MovieForm, CommentForm, FindMovieForm
+from apps.core import metrics
+from apps.users.permissions import get_capabilities
+from . import catalogue, trending, tmdb
+from .cache import get_movie_or_404
+from .posters import POSTER_FILENAME_RE, CONTENT_TYPES, poster_name
 
-load_dotenv()
+COMMENTS_CREATED = metrics.counter('comments_created', "Comments and replies posted.", ['kind'])
+VOTES = metrics.counter('votes', "Comment votes by type and what happened to the user's vote.", ['vote_type', 'action'])
+
+# Requests from our scripts, which take JSON with a rendered fragment instead of a redirect
+def wants_fragment(request):
+    return (request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+            or request.get_preferred_type(['text/html', 'application/json']) == 'application/json')
 
-API_KEY = os.getenv("API_KEY_TMDb")
-API_URL = "https://api.themoviedb.org/3/search/movie"
-API_IMG_URL = "https://image.tmdb.org/t/p/w500"
-MOVIE_DB_INFO_URL = "https://api.themoviedb.org/3/movie"
 
 # Check if user has permissions
 class PermissionMixin(UserPassesTestMixin):
     def test_func(self):
-        return self.request.user.is_authenticated and (self.request.user.is_admin or self.request.user.is_moderator)
+        return get_capabilities(self.request).can_manage_movies
 
     def handle_no_permission(self):
         messages.error(self.request, "You don't have permission to access this page.")
@@ -38,37 +48,107 @@ class MovieListView(ListView):
     model = Movie
     template_name = 'movies/movie_list.html'
     context_object_name = 'all_movies'
+    allowed_sorts = {'title': 'title', 'rating': 'rating', 'date': 'year'}
+
     # Sorting
     def get_queryset(self):
-        queryset = super().get_queryset()
-
         search_query = self.request.GET.get('search')
-        # Sort by title, rating, date
-        if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(rating__icontains=search_query) |
-                Q(date__icontains=search_query)
-            )
-
+        year_min, year_max = self.get_year_range()
+        genre = self.request.GET.get('genre')
+        director = self.request.GET.get('director')
         sort = self.request.GET.get('sort', 'title')
         order = self.request.GET.get('order', 'asc')
-        allowed_sorts = {'title', 'rating', 'date'}
 
-        if sort in allowed_sorts:
-            if order == 'desc':
-                sort = f'-{sort}'
-            queryset = queryset.order_by(sort)
+        # Plain browsing is served by the in-memory catalogue, free text search and trending stay on the database
+        if settings.MOVIE_CATALOGUE and not search_query and sort in self.allowed_sorts:
+            return catalogue.query(sort, order, year_min=year_min, year_max=year_max, genre=genre, director=director)
+
+        queryset = super().get_queryset().cards()
+
+        # Sort by title, rating, date
+        if search_query:
+            search_filter = Q(title__icontains=search_query) | Q(rating__icontains=search_query)
+            # ASCII digits only: str.isdigit() also accepts characters like '²' that int() rejects
+            year = re.fullmatch(r'\s*(\d{1,4})\s*', search_query, re.ASCII)
+            if year:
+                search_filter |= Q(year=int(year.group(1)))
+            queryset = queryset.filter(search_filter)
+
+        # Year range and decade filters are range scans on the indexed year column
+        if year_min is not None:
+            queryset = queryset.filter(year__gte=year_min)
+        if year_max is not None:
+            queryset = queryset.filter(year__lte=year_max)
+
+        # Facets resolved through the indexed genre/credit tables
+        if genre:
+            queryset = queryset.filter(movie_genres__genre__slug=genre)
+        if director:
+            queryset = queryset.filter(credits__role='director', credits__person__slug=director)
+
+        if sort == 'trending':
+            queryset = queryset.order_by('-hot_score', 'title')
+        elif sort in self.allowed_sorts:
+            field = F(self.allowed_sorts[sort])
+            # Movies without a year or rating go last in both directions
+            queryset = queryset.order_by(field.desc(nulls_last=True) if order == 'desc' else field.asc(nulls_last=True))
 
         queryset = queryset.select_related()
         return queryset
 
-    # Carousel with random movies
+    def get_year_range(self):
+        year_min = self.get_int_param('year_min')
+        year_max = self.get_int_param('year_max')
+        decade = self.get_int_param('decade')
+        if decade is not None:
+            decade -= decade % 10
+            year_min = max(year_min or decade, decade)
+            year_max = min(year_max or decade + 9, decade + 9)
+        return year_min, year_max
+
+    def get_int_param(self, name):
+        try:
+            return int(self.request.GET[name])
+        except (KeyError, ValueError):
+            return None
+
+    def get_paginate_by(self, queryset):
+        return settings.MOVIE_LIST_PAGE_SIZE
+
+    # Carousel with random movies, sampled by id so only the three picked rows are loaded
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        all_movies = list(self.get_queryset())
-        context['random_movies'] = random.sample(all_movies, min(3, len(all_movies)))
+        if isinstance(self.object_list, catalogue.CatalogueResult):
+            candidate_ids = self.object_list.ids()
+            context['genre_facets'], context['director_facets'] = self.object_list.facets()
+        else:
+            candidate_ids = list(self.object_list.order_by().values_list('pk', flat=True))
+            movie_ids = self.object_list.order_by().values('pk')
+            context['genre_facets'] = MovieGenre.objects.filter(movie__in=movie_ids).values(
+                'genre__slug', 'genre__name'
+            ).annotate(count=Count('movie')).order_by('-count', 'genre__name')
+            context['director_facets'] = MovieCredit.objects.filter(movie__in=movie_ids, role='director').values(
+                'person__slug', 'person__name'
+            ).annotate(count=Count('movie')).order_by('-count', 'person__name')[:10]
+        picked_ids = random.sample(candidate_ids, min(3, len(candidate_ids)))
+        context['random_movies'] = list(Movie.objects.cards('director', 'writers').filter(pk__in=picked_ids))
         context['current_sort'] = self.request.GET.get('sort_by', 'title')
+        context['active_genre'] = self.request.GET.get('genre', '')
+        context['active_director'] = self.request.GET.get('director', '')
+        context['year_min'] = self.request.GET.get('year_min', '')
+        context['year_max'] = self.request.GET.get('year_max', '')
+        context['active_decade'] = self.request.GET.get('decade', '')
+        context['decades'] = range(1920, timezone.now().year + 1, 10)
+        context['trending_movies'] = Movie.objects.cards().filter(
+            hot_score__gte=trending.trending_threshold()
+        ).order_by('-hot_score')[:5]
+        if self.request.user.is_authenticated:
+            context['recommended_movies'] = [
+                entry.movie for entry in
+                UserRecommendation.objects.filter(user=self.request.user).select_related('movie').only(
+                    *related_card_fields('movie')
+                ).order_by('rank')[:4]
+            ]
         return context
 
 # Movie subpage view with a comment section
@@ -79,28 +159,49 @@ class MovieDetailView(DetailView):
     slug_field = 'slug'
     slug_url_kwarg = 'slug'
 
+    def get_object(self, queryset=None):
+        return get_movie_or_404(slug=self.kwargs['slug'])
+
     # Get comments and other context data
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        comments = Comment.objects.filter(
-            movie=self.object,
-            parent__isnull=True
-        ).prefetch_related(
-            'author',
-            Prefetch('replies', queryset=Comment.objects.select_related('author').order_by('timestamp'))
-        )
+        comment_order = 'top' if self.request.GET.get('comments') == 'top' else 'oldest'
+        comments = self.get_comment_threads()
+        if comment_order == 'top':
+            comments.sort(key=lambda comment: (-comment.hot_score, comment.timestamp))
 
         context.update({
             'form': CommentForm(),
             'comments': comments,
-            'total_comments': Comment.objects.filter(movie=self.object, parent__isnull=True).count(),
+            'comment_order': comment_order,
+            'total_comments': len(comments),
             'current_user_id': self.request.user.id if self.request.user.is_authenticated else None,
             'rating_percentage': self.object.rating * 10 if self.object.rating else 0,
             'star_range': range(1, 11),
+            'similar_movies': [
+                entry.similar for entry in
+                SimilarMovie.objects.filter(movie=self.object).select_related('similar').only(
+                    *related_card_fields('similar')
+                ).order_by('rank')
+            ],
         })
         return context
 
+    # All comments of the movie in one query ordered by path, so every reply follows its parent at any depth.
+    # Top level comments come back oldest first with their replies flattened into `thread`.
+    def get_comment_threads(self):
+        roots = {}
+        for comment in Comment.objects.filter(movie=self.object).select_related('author').order_by('path'):
+            if comment.parent_id is None:
+                comment.thread = []
+                roots[comment.path] = comment
+            else:
+                root = roots.get(comment.path.partition(PATH_SEPARATOR)[0])
+                if root is not None:
+                    root.thread.append(comment)
+        return list(roots.values())
+
 # Movie search view, search by title, director, genre
 class MovieSearchView(ListView):
     model = Movie
@@ -110,10 +211,10 @@ class MovieSearchView(ListView):
     def get_queryset(self):
         query = self.request.GET.get('query', '')
         if query:
-            return Movie.objects.filter(
+            return Movie.objects.cards().filter(
                 Q(title__icontains=query) |
-                Q(director__icontains=query) |
-                Q(genres__icontains=query)
+                Q(pk__in=MovieCredit.objects.filter(role='director', person__name__icontains=query).values('movie')) |
+                Q(pk__in=MovieGenre.objects.filter(genre__name__icontains=query).values('movie'))
             )
         return Movie.objects.none()
 
@@ -156,6 +257,36 @@ class MovieDeleteView(PermissionMixin, DeleteView):
         messages.success(request, "Movie deleted successfully!")
         return super().delete(request, *args, **kwargs)
 
+# Locally generated poster sizes, the key in the URL changes with the poster so it can be cached forever
+class PosterView(View):
+    def get(self, request, movie_id, filename):
+        match = POSTER_FILENAME_RE.fullmatch(filename)
+        if not match:
+            raise Http404
+        name = poster_name(movie_id, match['key'], match['size'], match['fmt'])
+        if not default_storage.exists(name):
+            raise Http404
+
+        response = FileResponse(default_storage.open(name), content_type=CONTENT_TYPES[match['fmt']])
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+# Movies added to the catalogue by hand have no tmdb_id. The TMDb result with the same title and release year (or
+# the only one with that title when either year is unknown) is the same film, so the row gets its TMDb id instead
+# of being imported again. Returns {tmdb_id: slug} of the linked movies.
+def link_catalogue_movies(options):
+    by_title = {}
+    for option in options:
+        by_title.setdefault(option["title"], []).append(option)
+    linked = {}
+    untagged = Movie.objects.filter(tmdb_id__isnull=True, title__in=by_title).values_list('pk', 'title', 'year', 'slug')
+    for pk, title, year, slug in untagged:
+        matches = [option for option in by_title[title]
+                   if year is None or parse_year(option.get("release_date")) in (None, year)]
+        if len(matches) == 1 and Movie.objects.filter(pk=pk, tmdb_id__isnull=True).update(tmdb_id=matches[0]["id"]):
+            linked[matches[0]["id"]] = slug
+    return linked
+
 # Find and import movies from TMDb
 class FindMovieView(PermissionMixin, View):
     template_name = 'movies/tmdb_search.html'
@@ -167,23 +298,35 @@ class FindMovieView(PermissionMixin, View):
         form = FindMovieForm(request.POST)
         if form.is_valid():
             movie_title = form.cleaned_data["title"]
-            response = requests.get(API_URL, params={"api_key": API_KEY, "query": movie_title})
-            data = response.json().get("results", [])
+            data = tmdb.search_movies(movie_title)
+            # Mark results already in the catalogue with one lookup for the whole page
+            imported = dict(Movie.objects.filter(tmdb_id__in=[option["id"] for option in data]).values_list(
+                'tmdb_id', 'slug'
+            ))
+            imported.update(link_catalogue_movies([option for option in data if option["id"] not in imported]))
+            for option in data:
+                option["imported_slug"] = imported.get(option["id"])
             return render(request, self.template_name, {'form': form, 'options': data})
         return render(request, self.template_name, {'form': form})
 
 # Import selected movie from TMDb into local database
 class ImportMovieFromTMDBView(PermissionMixin, View):
     def get(self, request, movie_id):
+        # Repeated imports go straight to the existing movie without calling TMDb
+        existing = Movie.objects.filter(tmdb_id=movie_id).only('title', 'slug').first()
+        if existing:
+            messages.info(request, f"Movie '{existing.title}' is already imported.")
+            return redirect("movies:update", slug=existing.slug)
+
         try:
-            response = requests.get(f"{MOVIE_DB_INFO_URL}/{movie_id}", params={"api_key": API_KEY})
-            data = response.json()
+            data = tmdb.movie_details(movie_id)
+            linked = link_catalogue_movies([{**data, "id": movie_id}])
+            if linked:
+                messages.info(request, f"Movie '{data['title']}' is already in the catalogue.")
+                return redirect("movies:update", slug=linked[movie_id])
+
             # Fetch credits to get director and writers
-            credits_response = requests.get(
-                f"{MOVIE_DB_INFO_URL}/{movie_id}/credits",
-                params={"api_key": API_KEY}
-            )
-            credits_data = credits_response.json()
+            credits_data = tmdb.movie_credits(movie_id)
 
             director = ", ".join([
                 crew["name"] for crew in credits_data.get("crew", [])
@@ -194,22 +337,29 @@ class ImportMovieFromTMDBView(PermissionMixin, View):
                 if crew["job"] in ["Writer", "Screenplay"]
             ])
             genres = ", ".join([g["name"] for g in data.get("genres", [])])
-            img_url = f"{API_IMG_URL}{data['poster_path']}" if data.get("poster_path") else None
-            # Create and save the new movie
-            new_movie = Movie.objects.create(
-                title=data["title"],
-                date=data["release_date"].split("-")[0] if data.get("release_date") else "",
-                img_url=img_url,
-                body=data.get("overview", ""),
-                rating=data.get("vote_average"),
-                director=director,
-                writers=writers,
-                genres=genres
-            )
+            img_url = f"{tmdb.API_IMG_URL}{data['poster_path']}" if data.get("poster_path") else None
+            # Upsert on the TMDb id, so an import racing this one updates the same row instead of failing
+            new_movie, _ = Movie.objects.update_or_create(tmdb_id=movie_id, defaults={
+                'title': data["title"],
+                'date': data["release_date"].split("-")[0] if data.get("release_date") else "",
+                'img_url': img_url,
+                'body': data.get("overview", ""),
+                'rating': data.get("vote_average"),
+                'director': director,
+                'writers': writers,
+                'genres': genres,
+            })
 
             messages.success(request, f"Movie '{new_movie.title}' imported successfully!")
             return redirect("movies:update", slug=new_movie.slug)
 
+        # The title, the slug derived from it, or a racing import of the same id can collide
+        except IntegrityError:
+            if Movie.objects.filter(title=data["title"]).exclude(tmdb_id=movie_id).exists():
+                messages.error(request, f"A different movie titled '{data['title']}' is already in the catalogue.")
+            else:
+                messages.error(request, f"Could not import '{data['title']}', a conflicting movie already exists.")
+            return redirect("movies:find")
         except Exception as e:
             messages.error(request, f"Error importing movie: {str(e)}")
             return redirect("movies:find")
@@ -217,23 +367,28 @@ class ImportMovieFromTMDBView(PermissionMixin, View):
 # Comment views: create, edit, delete, vote, normal View classes for JSON responses
 class CommentCreateView(LoginRequiredMixin, View):
     def post(self, request, movie_id):
-        movie = get_object_or_404(Movie, id=movie_id)
-
         text = request.POST.get('text')
         user_rating = request.POST.get('user_rating')
         parent_id = request.POST.get('parent_id')
 
+        # A reply is checked against its movie in the same query that loads the parent
+        if parent_id:
+            parent = get_object_or_404(
+                Comment.objects.select_related('movie').only('path', 'parent', 'movie__slug'),
+                id=parent_id, movie_id=movie_id
+            )
+            movie = parent.movie
+        else:
+            parent = None
+            movie = get_movie_or_404(movie_id)
+
         if not text:
-            messages.error(request, "Comment text is required.")
-            return redirect('movies:detail', slug=movie.slug)
+            return self.error(request, movie, "Comment text is required.")
 
         if not parent_id and not user_rating:
-            messages.error(request, "Rating is required for main comments.")
-            return redirect('movies:detail', slug=movie.slug)
-
-        parent = get_object_or_404(Comment, id=parent_id) if parent_id else None
+            return self.error(request, movie, "Rating is required for main comments.")
 
-        Comment.objects.create(
+        comment = Comment.objects.create(
             text=text,
             author=request.user,
             movie=movie,
@@ -241,9 +396,34 @@ class CommentCreateView(LoginRequiredMixin, View):
             parent=parent
         )
 
+        COMMENTS_CREATED.inc(kind='reply' if parent else 'comment')
+        trending.bump(Movie.objects.filter(pk=movie.pk), trending.REPLY_WEIGHT if parent else trending.COMMENT_WEIGHT)
+        if parent:
+            trending.bump(Comment.objects.filter(pk=parent.pk), trending.REPLY_WEIGHT)
+
+        # Scripts get only the new comment rendered, instead of following the redirect to the whole page
+        if wants_fragment(request):
+            if parent:
+                template, context = 'movies/partials/comment_reply.html', {'reply': comment}
+            else:
+                template, context = 'movies/partials/comment_list.html', {'comments': [comment]}
+            return JsonResponse({
+                'success': True,
+                'comment_id': comment.id,
+                'path': comment.path,
+                'html': render_to_string(template, {**context, 'star_range': range(1, 11)}, request=request),
+            })
+
         messages.success(request, "Comment added successfully!")
         return redirect('movies:detail', slug=movie.slug)
 
+    @staticmethod
+    def error(request, movie, message):
+        if wants_fragment(request):
+            return JsonResponse({'success': False, 'error': message}, status=400)
+        messages.error(request, message)
+        return redirect('movies:detail', slug=movie.slug)
+
 
 class CommentEditView(LoginRequiredMixin, View):
     @method_decorator(require_POST)
@@ -253,7 +433,7 @@ class CommentEditView(LoginRequiredMixin, View):
     def post(self, request, comment_id):
         comment = get_object_or_404(Comment, id=comment_id)
 
-        if request.user.id != comment.author.id:
+        if not get_capabilities(request).can_edit_comment(comment):
             return JsonResponse({"success": False, "message": "Permission denied"}, status=403)
 
         try:
@@ -264,9 +444,9 @@ class CommentEditView(LoginRequiredMixin, View):
                 return JsonResponse({"success": False, "message": "Empty text"}, status=400)
 
             comment.text = new_text
-            comment.save()
+            comment.save(update_fields=['text', 'updated_at'])
 
-            return JsonResponse({"success": True, "text": comment.text})
+            return JsonResponse({"success": True, "text": comment.text, "html": comment.text_html})
 
         except Exception as e:
             return JsonResponse({"success": False, "message": str(e)}, status=500)
@@ -281,9 +461,7 @@ class CommentDeleteView(LoginRequiredMixin, View):
         comment = get_object_or_404(Comment, id=comment_id)
 
         # Check for permissions
-        if not (request.user.id == comment.author.id or
-                request.user.is_admin or
-                request.user.is_moderator):
+        if not get_capabilities(request).can_delete_comment(comment):
             return JsonResponse({
                 "success": False,
                 "message": "You don't have permission to delete this comment."
@@ -307,23 +485,34 @@ class VoteView(LoginRequiredMixin, View):
 
             comment = get_object_or_404(Comment, id=comment_id)
             vote = Vote.objects.filter(user=request.user, comment=comment).first()
+            vote_added = True
 
             if vote:
                 if vote.vote_type == vote_type:
                     vote.delete()
+                    vote_added = False
+                    VOTES.inc(vote_type=vote_type, action='removed')
                 else:
                     vote.vote_type = vote_type
                     vote.save()
+                    VOTES.inc(vote_type=vote_type, action='changed')
             else:
                 Vote.objects.create(
                     user=request.user,
                     comment=comment,
                     vote_type=vote_type
                 )
+                VOTES.inc(vote_type=vote_type, action='added')
+
+            # Withdrawn votes are not subtracted, they only stop counting as recent activity
+            if vote_added:
+                trending.bump(Movie.objects.filter(pk=comment.movie_id), trending.VOTE_WEIGHT)
+                if vote_type == 'like':
+                    trending.bump(Comment.objects.filter(pk=comment.pk), trending.LIKE_WEIGHT)
 
             comment.likes_count = Vote.objects.filter(comment=comment, vote_type='like').count()
             comment.dislikes_count = Vote.objects.filter(comment=comment, vote_type='dislike').count()
-            comment.save()
+            comment.save(update_fields=['likes_count', 'dislikes_count'])
 
             return JsonResponse({
                 'success': True,
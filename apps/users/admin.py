@@ -1,5 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.cache import cache
+from apps.core.paginator import EstimatedCountPaginator
+from .backends import user_cache_key
 from .models import User
 
 
@@ -8,6 +11,9 @@ class UserAdmin(BaseUserAdmin):
     list_display = ['email', 'name', 'role', 'is_active', 'date_joined']
     list_filter = ['role', 'is_active', 'date_joined']
     search_fields = ['email', 'name']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['deactivate_users', 'activate_users']
 
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
@@ -23,4 +29,21 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
-    ordering = ['-date_joined']
\ No newline at end of file
+    ordering = ['-date_joined']
+
+    # update() skips the post_save signal, so cached users are dropped here (see backends.py)
+    def set_active(self, request, queryset, is_active):
+        user_ids = list(queryset.values_list('pk', flat=True))
+        updated = User.objects.filter(pk__in=user_ids).update(is_active=is_active)
+        cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
+        return updated
+
+    @admin.action(description="Deactivate selected users", permissions=['change'])
+    def deactivate_users(self, request, queryset):
+        updated = self.set_active(request, queryset.exclude(pk=request.user.pk), False)
+        self.message_user(request, f"Deactivated {updated} users.")
+
+    @admin.action(description="Activate selected users", permissions=['change'])
+    def activate_users(self, request, queryset):
+        updated = self.set_active(request, queryset, True)
+        self.message_user(request, f"Activated {updated} users.")
@@ -0,0 +1,6 @@
+from django.utils.functional import SimpleLazyObject
+from .permissions import get_capabilities
+
+
+def capabilities(request):
+    return {'caps': SimpleLazyObject(lambda: get_capabilities(request))}
@@ -56,6 +56,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f"{self.name} ({self.email})"
 
+    # Users from the auth cache carry no password hash, only the session hash computed from it (see backends.py)
+    def get_session_auth_hash(self):
+        return self.__dict__.get('cached_session_auth_hash') or super().get_session_auth_hash()
+
     @property
     def is_admin(self):
         return self.role == RoleEnum.ADMIN
@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+from .models import RoleEnum
+
+REQUEST_ATTRIBUTE = '_capabilities'
+
+
+# Everything the current user may do, resolved once per request from their role
+@dataclass(frozen=True, slots=True)
+class Capabilities:
+    user_id: int | None = None
+    is_authenticated: bool = False
+    is_admin: bool = False
+    is_moderator: bool = False
+    can_manage_movies: bool = False
+    can_moderate_comments: bool = False
+    can_view_users: bool = False
+    can_assign_roles: bool = False
+    can_grant_admin: bool = False
+    can_delete_users: bool = False
+
+    @classmethod
+    def for_user(cls, user):
+        if not user.is_authenticated:
+            return ANONYMOUS
+        is_admin = user.role == RoleEnum.ADMIN
+        is_moderator = is_admin or user.role == RoleEnum.MODERATOR
+        return cls(
+            user_id=user.pk,
+            is_authenticated=True,
+            is_admin=is_admin,
+            is_moderator=is_moderator,
+            can_manage_movies=is_moderator,
+            can_moderate_comments=is_moderator,
+            can_view_users=is_moderator,
+            can_assign_roles=is_moderator,
+            can_grant_admin=is_admin,
+            can_delete_users=is_admin,
+        )
+
+    def can_edit_comment(self, comment):
+        return self.is_authenticated and comment.author_id == self.user_id
+
+    def can_delete_comment(self, comment):
+        return self.can_moderate_comments or self.can_edit_comment(comment)
+
+
+ANONYMOUS = Capabilities()
+
+
+def get_capabilities(request):
+    capabilities = getattr(request, REQUEST_ATTRIBUTE, None)
+    if capabilities is None:
+        capabilities = Capabilities.for_user(request.user)
+        setattr(request, REQUEST_ATTRIBUTE, capabilities)
+    return capabilities
+
+
+# Drop the resolved capabilities after the current user's own role changed mid-request
+def invalidate_capabilities(request):
+    if hasattr(request, REQUEST_ATTRIBUTE):
+        delattr(request, REQUEST_ATTRIBUTE)
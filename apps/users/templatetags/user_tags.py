@@ -0,0 +1,11 @@
+from django import template
+from django.urls import reverse
+from apps.users.avatars import avatar_digest
+
+register = template.Library()
+
+
+# Content-addressed avatar URL, needs no query beyond the already loaded user
+@register.simple_tag
+def avatar_url(user):
+    return reverse('users:avatar', kwargs={'user_id': user.id, 'digest': avatar_digest(user.name)})
@@ -1,3 +1,187 @@
-from django.test import TestCase
+import pickle
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from apps.movies.models import Movie, Comment
+from apps.users.avatars import avatar_digest, get_avatar, initials
+from apps.users.backends import user_cache_key
+from apps.users.models import User, RoleEnum
+from apps.users.permissions import Capabilities, ANONYMOUS
 
-# Create your tests here.
+
+class AvatarViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="user@example.com", name="Jane Doe", password="password")
+
+    def test_initials(self):
+        """Test initials are built from the first two words."""
+        self.assertEqual(initials("jane mary doe"), "JM")
+        self.assertEqual(initials(""), "?")
+
+    def test_avatar_is_cached_and_immutable(self):
+        """Test the avatar renders once and is served with immutable caching."""
+        url = reverse('users:avatar', args=[self.user.id, avatar_digest(self.user.name)])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertContains(response, 'JD')
+
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_cache_is_keyed_by_size(self):
+        """Test avatars rendered at one size are not served for another."""
+        digest = avatar_digest(self.user.name)
+        self.assertIn('width="100"', get_avatar(digest, lambda: self.user.name))
+        self.assertIn('width="48"', get_avatar(digest, lambda: self.user.name, size=48))
+
+    def test_stale_digest_is_404(self):
+        """Test renaming a user retires the old avatar URL."""
+        old_url = reverse('users:avatar', args=[self.user.id, avatar_digest(self.user.name)])
+        self.user.name = "John Roe"
+        self.user.save()
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+
+    def test_comment_list_uses_local_avatars(self):
+        """Test comments link to local avatars instead of a third-party service."""
+        movie = Movie.objects.create(title="Movie", date="2023", body="Description")
+        Comment.objects.create(movie=movie, author=self.user, text="Comment", user_rating=5.0)
+        response = self.client.get(reverse('movies:detail', args=[movie.slug]))
+        self.assertContains(response, reverse('users:avatar', args=[self.user.id, avatar_digest(self.user.name)]))
+        self.assertNotContains(response, 'ui-avatars.com')
+
+    def test_profile_replies_use_rendered_html(self):
+        """Test replies on the profile show the stored sanitised HTML."""
+        movie = Movie.objects.create(title="Movie", date="2023", body="Description")
+        comment = Comment.objects.create(movie=movie, author=self.user, text="Comment", user_rating=5.0)
+        Comment.objects.create(movie=movie, author=self.user, text="<b>bold</b><script>x</script>", parent=comment)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('users:profile', args=[self.user.id]))
+        self.assertContains(response, "<b>bold</b>")
+        self.assertNotContains(response, "<script>x</script>")
+
+
+@override_settings(CACHE_AUTH=True, SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class CachedAuthTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(email="admin@example.com", name="Admin", password="password",
+                                              role=RoleEnum.ADMIN)
+        self.user = User.objects.create_user(email="user@example.com", name="User", password="password")
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(url)
+        return [query['sql'] for query in captured if 'django_session' in query['sql']
+                or 'FROM "users_user"' in query['sql']]
+
+    def test_logged_in_requests_skip_session_and_user_queries(self):
+        """Test repeat page views read the session and user from the cache."""
+        self.client.login(email="user@example.com", password="password")
+        self.client.get(reverse('movies:list'))
+        self.assertEqual(self.auth_queries(reverse('movies:list')), [])
+
+    def test_flash_messages_do_not_touch_the_session(self):
+        """Test flashed messages are stored in a cookie."""
+        self.client.login(email="user@example.com", password="password")
+        response = self.client.post(reverse('users:assign_role', args=[self.admin.id, 'user']))
+        self.assertIn('messages', response.cookies)
+
+    def test_role_change_invalidates_cached_user(self):
+        """Test a promoted user gets moderator access on the next request."""
+        self.client.login(email="user@example.com", password="password")
+        self.assertRedirects(self.client.get(reverse('users:list')), reverse('movies:list'))
+
+        admin_client = self.client_class()
+        admin_client.login(email="admin@example.com", password="password")
+        admin_client.post(reverse('users:assign_role', args=[self.user.id, RoleEnum.MODERATOR.value]))
+
+        self.assertEqual(self.client.get(reverse('users:list')).status_code, 200)
+
+    def test_admin_deactivation_invalidates_cached_user(self):
+        """Test users deactivated with the bulk admin action are logged out on their next request."""
+        self.client.login(email="user@example.com", password="password")
+        self.client.get(reverse('movies:list'))
+
+        root = User.objects.create_superuser(email="root@example.com", name="Root", password="password")
+        admin_client = self.client_class()
+        admin_client.force_login(root)
+        admin_client.post(reverse('admin:users_user_changelist'),
+                          {'action': 'deactivate_users', '_selected_action': [self.user.pk, root.pk]})
+
+        self.assertTrue(User.objects.get(pk=root.pk).is_active)
+        self.assertFalse(self.client.get(reverse('movies:list')).context['user'].is_authenticated)
+
+    def test_cached_user_has_no_password_hash(self):
+        """Test the cached copy leaves the password hash out but keeps the session valid and saves safely."""
+        self.client.login(email="user@example.com", password="password")
+        self.client.get(reverse('movies:list'))
+        cached = cache.get(user_cache_key(self.user.pk))
+        self.assertNotIn('password', cached.__dict__)
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(cached))
+        self.assertTrue(self.client.get(reverse('movies:list')).context['user'].is_authenticated)
+
+        cached.name = "Renamed"
+        cached.save()
+        self.assertTrue(User.objects.get(pk=self.user.pk).check_password("password"))
+
+    def test_toggling_cache_auth_keeps_sessions(self):
+        """Test switching CACHE_AUTH off and back on does not log anybody out."""
+        self.client.login(email="user@example.com", password="password")
+        with self.settings(CACHE_AUTH=False):
+            self.assertTrue(self.client.get(reverse('movies:list')).context['user'].is_authenticated)
+        self.assertTrue(self.client.get(reverse('movies:list')).context['user'].is_authenticated)
+
+    def test_register_logs_in_with_configured_backend(self):
+        """Test a new account stays logged in after registering."""
+        self.client.post(reverse('users:register'), {
+            'name': "New User", 'email': "new@example.com",
+            'password1': "a-Strong-pass-123", 'password2': "a-Strong-pass-123",
+        })
+        response = self.client.get(reverse('users:profile', args=[User.objects.get(email="new@example.com").id]))
+        self.assertEqual(response.status_code, 200)
+
+
+class CapabilitiesTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", name="Admin", password="password",
+                                              role=RoleEnum.ADMIN)
+        self.moderator = User.objects.create_user(email="mod@example.com", name="Mod", password="password",
+                                                  role=RoleEnum.MODERATOR)
+        self.user = User.objects.create_user(email="user@example.com", name="User", password="password")
+
+    def test_roles_resolve_to_capabilities(self):
+        """Test each role maps to the expected capabilities."""
+        admin, moderator, user = (Capabilities.for_user(u) for u in (self.admin, self.moderator, self.user))
+        self.assertTrue(admin.can_delete_users and admin.can_grant_admin and admin.can_manage_movies)
+        self.assertTrue(moderator.can_manage_movies and moderator.can_assign_roles)
+        self.assertFalse(moderator.can_delete_users or moderator.can_grant_admin)
+        self.assertFalse(user.can_manage_movies or user.can_view_users or user.can_moderate_comments)
+        self.assertFalse(ANONYMOUS.is_authenticated)
+
+    def test_resolved_once_per_request(self):
+        """Test the capabilities are computed once and shared by the view and templates."""
+        self.client.login(email="mod@example.com", password="password")
+        response = self.client.get(reverse('users:list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(response.context['caps']._wrapped, response.wsgi_request._capabilities)
+        self.assertContains(response, 'Make Moderator')
+        self.assertNotContains(response, 'Make Admin')
+
+    def test_moderator_cannot_grant_admin(self):
+        """Test only admins can promote users to admin."""
+        self.client.login(email="mod@example.com", password="password")
+        self.client.post(reverse('users:assign_role', args=[self.user.id, RoleEnum.ADMIN.value]))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.role, RoleEnum.USER)
+
+    def test_own_role_change_refreshes_capabilities(self):
+        """Test a moderator who revokes their own role loses access immediately."""
+        self.client.login(email="mod@example.com", password="password")
+        response = self.client.post(reverse('users:assign_role', args=[self.moderator.id, RoleEnum.USER.value]),
+                                    follow=True)
+        self.assertFalse(response.context['caps'].can_view_users)
@@ -11,4 +11,5 @@ urlpatterns = [
     path('<int:user_id>/', views.UserProfileView.as_view(), name='profile'),
     path('<int:user_id>/assign-role/<str:role>/', views.AssignRoleView.as_view(), name='assign_role'),
     path('<int:user_id>/delete/', views.UserDeleteView.as_view(), name='delete'),
+    path('<int:user_id>/avatar/<str:digest>.svg', views.AvatarView.as_view(), name='avatar'),
 ]
\ No newline at end of file
@@ -4,12 +4,18 @@ from django.contrib.auth.views import LoginView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.shortcuts import redirect, get_object_or_404
+from django.http import HttpResponse, Http404
 from django.urls import reverse_lazy
 from django.views import View
 from django.db.models import Prefetch
 from .models import User, RoleEnum
 from .forms import RegisterForm, LoginForm
-from apps.movies.models import Comment
+from .avatars import get_avatar
+from .permissions import get_capabilities, invalidate_capabilities
+from apps.core import metrics
+from apps.movies.models import Comment, UserRecommendation
+
+LOGINS = metrics.counter('logins', "Login attempts by result.", ['result'])
 
 
 class RegisterView(CreateView):
@@ -20,7 +26,7 @@ class RegisterView(CreateView):
 
     def form_valid(self, form):
         user = form.save()
-        login(self.request, user, backend='django.contrib.auth.backends.ModelBackend')
+        login(self.request, user)
         messages.success(self.request, f"Welcome, {user.name}!")
         return redirect(self.success_url)
 
@@ -34,10 +40,12 @@ class CustomLoginView(LoginView):
         return reverse_lazy('movies:list')
 
     def form_valid(self, form):
+        LOGINS.inc(result='success')
         messages.success(self.request, f"Welcome, {form.get_user().name}!")
         return super().form_valid(form)
 
     def form_invalid(self, form):
+        LOGINS.inc(result='failure')
         messages.error(self.request, "Invalid email or password.")
         return super().form_invalid(form)
 
@@ -54,7 +62,7 @@ class UserListView(LoginRequiredMixin, ListView):
     context_object_name = 'all_users'
 
     def dispatch(self, request, *args, **kwargs):
-        if not (request.user.is_admin or request.user.is_moderator):
+        if not get_capabilities(request).can_view_users:
             messages.error(request, "You don't have permission to view this page.")
             return redirect('movies:list')
         return super().dispatch(request, *args, **kwargs)
@@ -93,12 +101,18 @@ class UserProfileView(LoginRequiredMixin, DetailView):
                 user_comments[movie]['replies'][parent_id].append(comment)
 
         context['user_comments'] = user_comments
+        if self.request.user.pk == self.object.pk:
+            context['recommended_movies'] = [
+                entry.movie for entry in
+                UserRecommendation.objects.filter(user=self.object).select_related('movie').order_by('rank')
+            ]
         return context
 
 
 class AssignRoleView(LoginRequiredMixin, View):
     def post(self, request, user_id, role):
-        if not (request.user.is_admin or request.user.is_moderator):
+        capabilities = get_capabilities(request)
+        if not capabilities.can_assign_roles:
             messages.error(request, "You don't have permission to assign roles.")
             return redirect('movies:list')
 
@@ -113,12 +127,19 @@ class AssignRoleView(LoginRequiredMixin, View):
             messages.error(request, "Invalid role.")
             return redirect('users:list')
 
+        if role == RoleEnum.ADMIN.value and not capabilities.can_grant_admin:
+            messages.error(request, "Only admins can assign the admin role.")
+            return redirect('users:list')
+
         if role == RoleEnum.ADMIN.value and request.user.id == user.id:
             messages.error(request, "You cannot assign the admin role to yourself.")
             return redirect('users:list')
 
         user.role = role
         user.save()
+        if user.pk == request.user.pk:
+            request.user.role = role
+            invalidate_capabilities(request)
         messages.success(request, f"Role '{role}' assigned to {user.name}.")
         return redirect('users:list')
 
@@ -126,7 +147,7 @@ class AssignRoleView(LoginRequiredMixin, View):
 class UserDeleteView(LoginRequiredMixin, View):
 
     def post(self, request, user_id):
-        if not request.user.is_admin:
+        if not get_capabilities(request).can_delete_users:
             messages.error(request, "You don't have permission to delete users.")
             return redirect('users:list')
 
@@ -142,4 +163,16 @@ class UserDeleteView(LoginRequiredMixin, View):
 
         user.delete()
         messages.success(request, f"User {user.name} has been deleted.")
-        return redirect('users:list')
\ No newline at end of file
+        return redirect('users:list')
+
+
+# Initials avatar rendered once per name, the digest in the URL changes with the name
+class AvatarView(View):
+    def get(self, request, user_id, digest):
+        svg = get_avatar(digest, lambda: User.objects.filter(pk=user_id).values_list('name', flat=True).first())
+        if svg is None:
+            raise Http404
+
+        response = HttpResponse(svg, content_type='image/svg+xml')
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
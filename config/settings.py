@@ -46,12 +46,15 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django_bootstrap5',
+    'apps.core',
     'apps.movies',
     'apps.users',
     'apps.pages',
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.PerformanceMiddleware',
+    'apps.core.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,7 +68,7 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'apps.core.template_backends.TimedDjangoTemplates',
         'DIRS': [
             BASE_DIR / 'templates',
         ],
@@ -75,6 +78,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'apps.core.context_processors.static_bundles',
+                'apps.users.context_processors.capabilities',
             ],
         },
     },
@@ -97,12 +102,79 @@ DATABASES = {
     }
 }
 
+# psycopg connection pool per process, needs the psycopg_pool package
+if os.getenv("PGPOOL", "False").lower() == "true":
+    DATABASES['default']["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("PGPOOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("PGPOOL_MAX_SIZE", "10")),
+        },
+    }
+
+# Local SQLite database instead of PostgreSQL, e.g. for benchmark_views runs
+if os.getenv("SQLITE_PATH"):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv("SQLITE_PATH"),
+    }
+
+# Read replicas of the primary: PGREPLICA_HOSTS=host[:port],... sharing the PG* database and credentials, or
+# SQLITE_REPLICA_PATHS=a.sqlite3,... next to SQLITE_PATH to try it locally with copies of the primary file
+if os.getenv("SQLITE_PATH"):
+    replicas = [{'ENGINE': 'django.db.backends.sqlite3', 'NAME': path.strip()}
+                for path in os.getenv("SQLITE_REPLICA_PATHS", "").split(",") if path.strip()]
+else:
+    replicas = []
+    for address in filter(None, (value.strip() for value in os.getenv("PGREPLICA_HOSTS", "").split(","))):
+        host, _, port = address.partition(":")
+        replicas.append({**DATABASES['default'], "HOST": host, "PORT": port or DATABASES['default']["PORT"]})
+for number, replica in enumerate(replicas, 1):
+    DATABASES[f"replica{number}"] = {**replica, "TEST": {"MIRROR": "default"}}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['apps.core.routers.PrimaryReplicaRouter']
+# Seconds a browser keeps reading from the primary after a request that wrote, should exceed the replication lag
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+
 if 'test' in sys.argv:
     DATABASES['default'] = {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 
+# Cache: per-process memory by default, Redis shared by every worker when REDIS_URL is set (needs redis)
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Sessions and logged-in users read from the cache instead of two SELECTs per request. Only safe when all
+# processes share the cache, otherwise a logout or role change in one worker goes unseen by the others,
+# so it defaults to on with Redis only. SESSION_ENGINE may also be set to ...signed_cookies.
+CACHE_AUTH = os.getenv("CACHE_AUTH", str(bool(REDIS_URL))).lower() == "true"
+SESSION_ENGINE = os.getenv(
+    "SESSION_ENGINE",
+    "django.contrib.sessions.backends.cached_db" if CACHE_AUTH else "django.contrib.sessions.backends.db"
+)
+# Always installed, it only reads the cache when CACHE_AUTH is on (sessions store the backend path)
+AUTHENTICATION_BACKENDS = ['apps.users.backends.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = 60 * 15
+# Movie lookups by slug and id go through a small per-process LRU in front of the cache (apps.movies.cache).
+# Saves bump a version kept in the cache, so like CACHE_AUTH it needs a cache shared by all processes.
+MOVIE_CACHE = os.getenv("MOVIE_CACHE", str(bool(REDIS_URL))).lower() == "true"
+MOVIE_CACHE_TIMEOUT = int(os.getenv("MOVIE_CACHE_TIMEOUT", "300"))
+MOVIE_CACHE_LOCAL_SIZE = int(os.getenv("MOVIE_CACHE_LOCAL_SIZE", "1024"))
+MOVIE_CACHE_LOCAL_TTL = int(os.getenv("MOVIE_CACHE_LOCAL_TTL", "60"))
+# Sorting, filtering and paging of the movie list from an in-process copy of the catalogue (apps.movies.catalogue)
+# instead of a query per combination. Other processes learn about changes through the cache, so it needs a shared
+# cache with several processes. Bulk updates are picked up by the full reload after MOVIE_CATALOGUE_MAX_AGE seconds.
+MOVIE_CATALOGUE = os.getenv("MOVIE_CATALOGUE", "false").lower() == "true"
+MOVIE_CATALOGUE_MAX_AGE = int(os.getenv("MOVIE_CATALOGUE_MAX_AGE", "600"))
+# Movies per list page, unset shows the whole catalogue on one page
+MOVIE_LIST_PAGE_SIZE = int(os.getenv("MOVIE_LIST_PAGE_SIZE", "0")) or None
+# Flash messages travel in a cookie and never load or save the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -140,6 +212,48 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Static build mode: bundled, minified, manifest-hashed and gzip/brotli pre-compressed assets
+# served by WhiteNoise with far-future cache headers. Requires `manage.py collectstatic`.
+STATIC_BUILD = os.getenv("STATIC_BUILD", "False").lower() == "true"
+STATIC_BUNDLES = {
+    'css/bundle.css': [
+        'css/styles.css',
+        'css/main.css',
+        'css/cards.css',
+        'css/user.css',
+        'css/movie.css',
+        'css/comment.css',
+        'css/carousel.css',
+    ],
+    'js/bundle.js': [
+        'js/scripts.js',
+    ],
+}
+
+if STATIC_BUILD:
+    STORAGES = {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "apps.core.storage.BundledStaticFilesStorage"},
+    }
+    # Only the built STATIC_ROOT is served by WhiteNoise, right after SecurityMiddleware as its docs ask.
+    # Without the build there is nothing collected to serve and runserver serves the source files.
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                      'whitenoise.middleware.WhiteNoiseMiddleware')
+
+# Request instrumentation: Server-Timing headers, per view histograms and slow request logging
+PERF_INSTRUMENTATION = os.getenv("PERF_INSTRUMENTATION", "False").lower() == "true"
+PERF_SLOW_REQUEST_MS = int(os.getenv("PERF_SLOW_REQUEST_MS", "500"))
+PERF_TOP_QUERIES = 5
+
+# METRICS_TOKEN: bearer token Prometheus sends to scrape /metrics (Authorization: Bearer <token>). Without it the
+# endpoint is only served when DEBUG is on, so production never exposes latencies and vote rates by accident.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Locally processed media (poster sizes)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", BASE_DIR / 'media'))
 
 AUTH_USER_MODEL = 'users.User'
 
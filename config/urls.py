@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
+from apps.core.views import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('users/', include('apps.users.urls')),
     path('pages/', include('apps.pages.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('', include('apps.movies.urls')),
 ]
\ No newline at end of file
@@ -0,0 +1,11 @@
+'use strict';
+// Autocomplete list filters: picking or clearing a value reloads the changelist with the new filter
+(function($) {
+    $(document).on('change', 'select.autocomplete-filter', function() {
+        const params = new URLSearchParams(this.closest('li').dataset.queryString);
+        if (this.value) {
+            params.set(this.name, this.value);
+        }
+        window.location.search = params.toString();
+    });
+})(django.jQuery);
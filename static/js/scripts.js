@@ -6,11 +6,12 @@ document.addEventListener("DOMContentLoaded", function () {
     initializeScrollListener();
     initializeProgressCircles();
     initializeSortMenu();
+    initializeCommentForms();
 });
 
 // Reply Comment Toggle
-function initializeReplyToggle() {
-    document.querySelectorAll('.reply-comment').forEach(button => {
+function initializeReplyToggle(root = document) {
+    root.querySelectorAll('.reply-comment').forEach(button => {
         button.addEventListener('click', function (event) {
             event.preventDefault();
             const container = this.closest('.commentText');
@@ -23,8 +24,8 @@ function initializeReplyToggle() {
 }
 
 // Vote Comment handlers
-function initializeVoteButtons() {
-    document.querySelectorAll('.vote-button').forEach(button => {
+function initializeVoteButtons(root = document) {
+    root.querySelectorAll('.vote-button').forEach(button => {
         button.addEventListener('click', function () {
             const btn = this;
             const wrapper = btn.parentElement;
@@ -68,8 +69,8 @@ function initializeVoteButtons() {
 }
 
 // Delete Comment handlers
-function initializeDeleteButtons() {
-    document.querySelectorAll('.delete-comment').forEach(button => {
+function initializeDeleteButtons(root = document) {
+    root.querySelectorAll('.delete-comment').forEach(button => {
         button.addEventListener('click', function () {
             const commentId = this.dataset.commentId;
             const url = this.dataset.url;
@@ -87,12 +88,98 @@ function initializeDeleteButtons() {
                 if (!data.success) return;
 
                 const el = document.getElementById(`comment-${commentId}`);
-                if (el) el.remove();
+                if (!el) return;
+                // Replies below the deleted comment are removed with it
+                document.querySelectorAll(`[data-path^="${el.dataset.path}/"]`).forEach(reply => reply.remove());
+                el.remove();
             });
         });
     });
 }
 
+// Post comments and replies without reloading the page, the server answers with the new comment rendered
+function initializeCommentForms() {
+    document.addEventListener('submit', function (event) {
+        const form = event.target.closest('.comment-form');
+        if (!form) return;
+        event.preventDefault();
+
+        fetch(form.action, {
+            method: 'POST',
+            headers: {
+                'Accept': 'application/json',
+                'X-Requested-With': 'XMLHttpRequest',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: new FormData(form)
+        })
+        .then(res => {
+            if ((res.headers.get('Content-Type') || '').includes('application/json')) {
+                return res.json();
+            }
+            // Login redirects and auth errors never saved the comment, post the form the normal way to log in
+            if (res.redirected || (res.status >= 300 && res.status < 400) || res.status === 401 || res.status === 403) {
+                form.submit();
+                return null;
+            }
+            // Anything else may have saved it already, so it is not posted again
+            throw new Error(`HTTP error! status: ${res.status}`);
+        })
+        .then(data => {
+            if (!data) return;
+            if (!data.success) {
+                alert(data.error || 'Failed to post comment');
+                return;
+            }
+            insertComment(data);
+            form.reset();
+            const replyForm = form.closest('.reply-form');
+            if (replyForm) replyForm.style.display = 'none';
+        })
+        .catch(err => {
+            console.error('Comment error:', err);
+            alert('Error posting comment: ' + err.message);
+        });
+    });
+}
+
+// Place a new comment by its path: top level comments at the end of the list, replies after the
+// last reply below their parent
+function insertComment(data) {
+    const template = document.createElement('template');
+    template.innerHTML = data.html.trim();
+    const element = template.content.firstElementChild;
+    const segments = data.path.split('/');
+
+    if (segments.length === 1) {
+        document.getElementById('commentList').append(element);
+        const count = document.getElementById('commentCount');
+        if (count) count.textContent = parseInt(count.textContent, 10) + 1;
+    } else {
+        const parentPath = segments.slice(0, -1).join('/');
+        const parent = document.querySelector(`[data-path="${parentPath}"]`);
+        const below = document.querySelectorAll(`[data-path^="${parentPath}/"]`);
+        if (below.length) {
+            below[below.length - 1].after(element);
+        } else if (parent.classList.contains('reply')) {
+            parent.after(element);
+        } else {
+            const body = parent.querySelector(':scope > .commentText');
+            let thread = body.querySelector(':scope > ul');
+            if (!thread) {
+                thread = document.createElement('ul');
+                thread.className = 'list-unstyled ml-4';
+                body.append(thread);
+            }
+            thread.append(element);
+        }
+    }
+
+    initializeReplyToggle(element);
+    initializeVoteButtons(element);
+    initializeDeleteButtons(element);
+}
+
 // Edit Comment handlers
 document.addEventListener('click', function(e) {
     // Show edit form
@@ -140,7 +227,8 @@ document.addEventListener('click', function(e) {
             console.log('Response data:', data);
             if (data.success) {
                 const displayElement = document.querySelector(`.comment-display-${commentId}`);
-                displayElement.textContent = newText;
+                // Sanitised and rendered by the server
+                displayElement.innerHTML = data.html;
                 displayElement.style.display = 'block';
                 document.querySelector(`.edit-form-${commentId}`).style.display = 'none';
             } else {